@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import numpy as np
+
+from Source.Graphics.Icosahedron import Icosahedron
+
+def measure(function, level, repeat):
+    """Returns the best wall time in milliseconds out of repeat runs"""
+    best = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function(level)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0, result
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Compare icosphere subdivision implementations")
+    parser.add_argument("--levels", type=int, default=7, help="highest subdivision level to measure")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs per level")
+    parser.add_argument("--radius", type=float, default=1.0, help="sphere radius")
+
+    args = parser.parse_args()
+
+    print("{:>5} {:>10} {:>10} {:>12} {:>12} {:>8} {:>6}".format(
+        "level", "vertices", "triangles", "loop (ms)", "batched (ms)", "speedup", "same"))
+
+    for level in range(args.levels + 1):
+
+        ## current per-edge implementation against the batched one
+        loop_time, (loop_vertices, loop_indices) = measure(lambda l: Icosahedron.tessellateLoop(l, args.radius), level, args.repeat)
+        batched_time, (vertices, indices) = measure(lambda l: Icosahedron.tessellate(l, args.radius), level, args.repeat)
+
+        ## both must produce the same layout once converted for upload
+        same = np.array_equal(loop_indices, indices) and \
+            np.array_equal(loop_vertices.astype(np.float32), vertices.astype(np.float32))
+
+        print("{:>5} {:>10} {:>10} {:>12.2f} {:>12.2f} {:>7.1f}x {:>6}".format(
+            level, len(vertices), len(indices), loop_time, batched_time,
+            loop_time / batched_time if batched_time > 0.0 else float("inf"), str(same)))
+
+
+if __name__ == '__main__':
+
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import time
+import argparse
+
+from Source.Graphics.Cube import Cube
+from Source.Graphics.Cone import Cone
+from Source.Graphics.Cylinder import Cylinder
+from Source.Graphics.Icosahedron import Icosahedron
+from Source.Graphics.MeshLoader import MeshLoader
+from Source.Graphics.MeshOptimizer import MeshOptimizer
+
+def primitives(args):
+    """Yields name and geometry as drawn before optimization of each primitive and mesh"""
+
+    ## cubes, cones and cylinders were drawn as arrays, one vertex per corner
+    for name, geometry in (("cube", Cube.buildGeometry()),
+            ("cone", Cone.buildGeometry(args.resolution, 1.0, 2.0)),
+            ("cylinder", Cylinder.buildGeometry(args.resolution, 1.0, 2.0))):
+        corners = geometry['indices'].reshape(-1)
+        yield name, {'vertices': geometry['vertices'][corners], 'normals': geometry['normals'][corners]}
+
+    for level in range(args.levels + 1):
+        vertices, indices = Icosahedron.tessellate(level)
+        yield "icosahedron {}".format(level), {'vertices': vertices, 'normals': vertices, 'indices': indices}
+
+    for filename in args.meshes:
+        yield filename, MeshLoader.load(filename, cache=False, optimize=False)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Report vertex cache efficiency of primitives and meshes before and after optimization")
+    parser.add_argument("meshes", nargs="*", help="OBJ, PLY or STL files to optimize as well")
+    parser.add_argument("--levels", type=int, default=5, help="highest icosahedron subdivision level")
+    parser.add_argument("--resolution", type=int, default=24, help="resolution of cones and cylinders")
+    parser.add_argument("--cache-size", type=int, default=MeshOptimizer.CacheSize, help="entries of the simulated FIFO vertex cache")
+
+    args = parser.parse_args()
+
+    print("{:>24} {:>10} {:>10} {:>10} {:>12} {:>12} {:>10}".format(
+        "mesh", "triangles", "vertices", "welded", "ACMR before", "ACMR after", "time (ms)"))
+
+    for name, geometry in primitives(args):
+        start = time.perf_counter()
+        optimized, statistics = MeshOptimizer.optimize(geometry, args.cache_size)
+        elapsed = (time.perf_counter() - start) * 1000.0
+
+        print("{:>24} {:>10} {:>10} {:>10} {:>12.3f} {:>12.3f} {:>10.2f}".format(
+            name[-24:], len(optimized['indices']), statistics['vertices_before'], statistics['vertices_after'],
+            statistics['acmr_before'], statistics['acmr_after'], elapsed))
+
+
+if __name__ == '__main__':
+
+    main()
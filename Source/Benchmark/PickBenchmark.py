@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import sys
+import math
+import time
+import argparse
+import numpy as np
+
+from PyQt5.QtGui import QVector3D, QMatrix4x4, QQuaternion
+from PyQt5.QtWidgets import QApplication
+
+from Source.Graphics.Ray import Ray
+from Source.Graphics.Scene import Scene
+from Source.Graphics.Actor import Actor
+from Source.Graphics.Group import Group
+
+def randomTransform(generator, extent):
+    """Returns a random rotation, scale and translation inside a cube of side extent"""
+    xform = QMatrix4x4()
+    position = generator.uniform(-extent / 2.0, extent / 2.0, 3)
+    xform.translate(*position.tolist())
+    axis = generator.normal(size=3)
+    xform.rotate(QQuaternion.fromAxisAndAngle(QVector3D(*axis.tolist()), generator.uniform(0.0, 360.0)))
+    xform.scale(*generator.uniform(0.5, 2.0, 3).tolist())
+    return xform
+
+
+def populate(scene, generator, actors, groups, parts):
+    """Fill scene with randomly placed actors and groups of parts"""
+    extent = 4.0 * math.pow(actors + groups * parts, 1.0 / 3.0)
+    for index in range(actors):
+        actor = Actor(scene, name="actor{}".format(index))
+        actor.setTransform(randomTransform(generator, extent))
+        scene.addActor(actor)
+
+    for index in range(groups):
+        group = Group(scene, name="group{}".format(index))
+        scene.addActor(group)
+        for part in range(parts):
+            actor = Actor(scene, name="group{}.part{}".format(index, part))
+            actor.setTransform(randomTransform(generator, extent))
+            group.addPart(actor)
+
+    return extent
+
+
+def rays(scene, generator, count, extent):
+    """Returns rays starting outside the scene aimed at random points inside it"""
+    result = []
+    for index in range(count):
+        origin = generator.normal(size=3)
+        origin *= 2.0 * extent / np.linalg.norm(origin)
+        target = generator.uniform(-extent / 2.0, extent / 2.0, 3)
+        direction = QVector3D(*(target - origin).tolist()).normalized()
+        result.append(Ray(scene, origin=QVector3D(*origin.tolist()), direction=direction))
+    return result
+
+
+def measure(function, rays):
+    """Returns milliseconds per ray and the results"""
+    start = time.perf_counter()
+    results = [function(each) for each in rays]
+    return (time.perf_counter() - start) * 1000.0 / len(rays), results
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Compare linear and hierarchical picking")
+    parser.add_argument("--actors", type=int, nargs="+", default=[100, 1000, 10000], help="numbers of actors to measure")
+    parser.add_argument("--groups", type=int, default=10, help="number of groups added to every scene")
+    parser.add_argument("--parts", type=int, default=10, help="number of parts per group")
+    parser.add_argument("--rays", type=int, default=200, help="number of picks per scene")
+    parser.add_argument("--moves", type=float, default=0.01, help="fraction of actors moved between picks")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+    args = parser.parse_args()
+    application = QApplication(sys.argv)
+    generator = np.random.RandomState(args.seed)
+
+    print("{:>8} {:>7} {:>12} {:>12} {:>8} {:>12} {:>11} {:>6}".format(
+        "actors", "height", "linear (ms)", "bvh (ms)", "speedup", "batched (ms)", "move (ms)", "same"))
+
+    for count in args.actors:
+        scene = Scene(None)
+        extent = populate(scene, generator, count, args.groups, args.parts)
+        picks = rays(scene, generator, args.rays, extent)
+
+        linear_time, expected = measure(scene.pickLinear, picks)
+        bvh_time, results = measure(scene.pickRay, picks)
+
+        ## all rays at once through the batched kernel
+        origins = [(each.origin().x(), each.origin().y(), each.origin().z()) for each in picks]
+        directions = [(each.direction().x(), each.direction().y(), each.direction().z()) for each in picks]
+        start = time.perf_counter()
+        batched = scene.pickRays(origins, directions)
+        batched_time = (time.perf_counter() - start) * 1000.0 / len(picks)
+
+        ## move a few actors and check picking still agrees
+        moved = [scene.actors()[index] for index in generator.choice(count, max(1, int(count * args.moves)), replace=False)]
+        start = time.perf_counter()
+        for each in moved:
+            each.setTransform(randomTransform(generator, extent))
+        move_time = (time.perf_counter() - start) * 1000.0 / len(moved)
+        same = results == expected and batched == expected and [scene.pickRay(each) for each in picks] == [scene.pickLinear(each) for each in picks]
+
+        print("{:>8} {:>7} {:>12.3f} {:>12.3f} {:>7.1f}x {:>12.3f} {:>11.3f} {:>6}".format(
+            count, scene.pickStatistics()['height'], linear_time, bvh_time,
+            linear_time / bvh_time if bvh_time > 0.0 else float("inf"), batched_time, move_time, str(same)))
+
+
+if __name__ == '__main__':
+
+    main()
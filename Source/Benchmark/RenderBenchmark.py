@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import itertools
+import subprocess
+import numpy as np
+
+from PyQt5.QtGui import QVector3D, QMatrix4x4, QQuaternion, QGuiApplication, QSurfaceFormat
+
+from OpenGL import GL
+from Source.Graphics.Scene import Scene
+from Source.Graphics.Cube import Cube
+from Source.Graphics.Cone import Cone
+from Source.Graphics.Icosahedron import Icosahedron
+from Source.Graphics.MeshRegistry import MeshRegistry
+from Source.Graphics.BufferUpload import BufferUpload
+from Source.Graphics.TimerQueryRing import TimerQueryRing
+from Source.Graphics.OffscreenRenderer import OffscreenRenderer
+
+DrawStyles = {"solid": Scene.DrawStyle.Solid, "edges": Scene.DrawStyle.SolidWithEdges, "wireframe": Scene.DrawStyle.Wireframe}
+Shadings = {"flat": Scene.Shading.Flat, "smooth": Scene.Shading.Smooth}
+
+
+def primitive(world, name, level, index, count, lod=True):
+    """Returns primitive index out of count, placed on a square grid centered at the origin"""
+    side = int(math.ceil(math.sqrt(count)))
+    spacing = 2.0 / side
+    xform = QMatrix4x4()
+    xform.translate((index % side - (side - 1) / 2.0) * spacing, 0.0, (index // side - (side - 1) / 2.0) * spacing)
+    xform.scale(0.4 * spacing)
+
+    if name == "cube":
+        return Cube(world, transform=xform)
+    elif name == "cone":
+        return Cone(world, resolution=24, transform=xform, lod=lod)
+    return Icosahedron(world, level=level, transform=xform, lod=lod)
+
+
+def populate(world, name, level, count, lod=True):
+    """Fill world with count primitives"""
+    world.clear()
+    for index in range(count):
+        world.addActor(primitive(world, name, level, index, count, lod))
+
+
+def residentMemory():
+    """Returns resident memory of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as stream:
+            return int(stream.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def summarize(values):
+    """Returns mean, median, 95th percentile and maximum of values in milliseconds"""
+    if len(values) == 0:
+        return None
+    p50, p95 = np.percentile(values, [50.0, 95.0])
+    return {'mean': float(np.mean(values)), 'p50': float(p50), 'p95': float(p95), 'max': float(np.max(values))}
+
+
+def run(renderer, config, frames, warmup):
+    """Render a configuration and returns its measurements"""
+    world = renderer.world
+    renderer.makeCurrent()
+    populate(world, config['primitive'], config['level'], config['actors'], config['lod'])
+    world.setDrawStyle(DrawStyles[config['draw_style']])
+    world.setLighting(config['lighting'])
+    world.setShading(Shadings[config['shading']])
+
+    home = renderer.rotation
+    timer = TimerQueryRing(size=4, window=frames)
+    cpu = []
+    for frame in range(warmup + frames):
+
+        ## turn the scene a little so that every frame does the same work from a new view
+        renderer.setRotation(home * QQuaternion.fromAxisAndAngle(QVector3D(0.0, 1.0, 0.0), frame))
+        renderer.makeCurrent()
+        measured = frame >= warmup
+        if measured:
+            timer.begin()
+        start = time.perf_counter()
+        renderer.render()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        if measured:
+            renderer.makeCurrent()
+            timer.end()
+            cpu.append(elapsed)
+
+    ## wait for the last frames so that all GPU times are read back
+    renderer.makeCurrent()
+    GL.glFinish()
+    timer.collect()
+    gpu = timer.statistics()
+    timer.destroy()
+    renderer.setRotation(home)
+
+    return dict(config, **{
+        'frames': frames,
+        'cpu_ms': summarize(cpu),
+        'gpu_ms': {key: gpu[key] for key in ('mean', 'p50', 'p95', 'max')} if gpu['samples'] > 0 else None,
+        'render': world.renderStatistics(),
+        'upload': BufferUpload().statistics(),
+        'memory': {'resident': residentMemory(), 'meshes': MeshRegistry().statistics()['bytes']}
+    })
+
+
+def configurations(args):
+    """Yields every combination of the scene parameters asked for"""
+    for name, count, style, lighting, shading, lod in itertools.product(args.primitives, args.actors, args.draw_styles, args.lighting, args.shading, args.lod):
+        for level in (args.levels if name == "icosahedron" else [0]):
+            yield {
+                'primitive': name,
+                'level': level,
+                'actors': count,
+                'draw_style': style,
+                'lighting': lighting == "on",
+                'shading': shading,
+                'lod': lod == "on"
+            }
+
+
+def environment(renderer):
+    """Returns a description of the machine and tree the benchmark ran on"""
+    renderer.makeCurrent()
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'gl_vendor': GL.glGetString(GL.GL_VENDOR).decode('UTF-8'),
+        'gl_renderer': GL.glGetString(GL.GL_RENDERER).decode('UTF-8'),
+        'gl_version': GL.glGetString(GL.GL_VERSION).decode('UTF-8'),
+        'size': [renderer.width(), renderer.height()]
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Render synthetic scenes offscreen and report frame times as JSON")
+    parser.add_argument("--primitives", nargs="+", choices=["cube", "cone", "icosahedron"], default=["cube", "cone", "icosahedron"], help="primitives scenes are made of")
+    parser.add_argument("--actors", type=int, nargs="+", default=[1, 100, 1000], help="numbers of primitives per scene")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 3], help="icosahedron subdivision levels")
+    parser.add_argument("--draw-styles", nargs="+", choices=sorted(DrawStyles), default=["solid", "edges"], help="draw styles")
+    parser.add_argument("--lighting", nargs="+", choices=["on", "off"], default=["on"], help="lighting states")
+    parser.add_argument("--shading", nargs="+", choices=sorted(Shadings), default=["smooth"], help="shading types")
+    parser.add_argument("--lod", nargs="+", choices=["on", "off"], default=["off"], help="level of detail selection states")
+    parser.add_argument("--frames", type=int, default=100, help="number of measured frames per scene")
+    parser.add_argument("--warmup", type=int, default=10, help="number of frames rendered before measuring")
+    parser.add_argument("--size", default="1280x720", help="frame size, as WIDTHxHEIGHT")
+    parser.add_argument("--samples", type=int, default=0, help="number of multisampling samples")
+    parser.add_argument("--output", help="file the JSON report is written to, standard output if not given")
+
+    args = parser.parse_args()
+
+    ## same context version and profile as the viewer, no window needed
+    glformat = QSurfaceFormat()
+    glformat.setDepthBufferSize(24)
+    glformat.setSamples(args.samples)
+    glformat.setVersion(3, 3)
+    glformat.setProfile(QSurfaceFormat.CoreProfile)
+    QSurfaceFormat.setDefaultFormat(glformat)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QGuiApplication(sys.argv)
+
+    width, height = [int(each) for each in args.size.lower().split("x")]
+    renderer = OffscreenRenderer(width, height, samples=args.samples, gnomon=False)
+    renderer.initialize()
+
+    report = {'environment': environment(renderer), 'results': []}
+    for config in configurations(args):
+        result = run(renderer, config, args.frames, args.warmup)
+        report['results'].append(result)
+        print("{primitive:>12} level {level} x{actors:<6} {draw_style:>9} lighting {lighting:d} {shading:>6}: ".format(**config) +
+            "cpu {:.3f} ms, gpu {} ms, draw calls {}, triangles {}".format(result['cpu_ms']['mean'],
+            "-" if result['gpu_ms'] is None else "{:.3f}".format(result['gpu_ms']['mean']),
+            result['render'].get('draw_calls', 0), result['render'].get('triangles', 0)), file=sys.stderr)
+
+    renderer.destroy()
+
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(report, stream, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+
+    main()
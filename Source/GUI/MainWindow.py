@@ -8,6 +8,9 @@ from Source.GUI.RenderWidget import RenderWidget
 
 class MainWindow(QMainWindow):
 
+    ## number of profiled scopes listed in the statistics tooltip
+    ProfileLines = 24
+
     ## initialization
     def __init__(self, **kwargs):
         super(MainWindow, self).__init__()
@@ -31,7 +34,7 @@ class MainWindow(QMainWindow):
             statusTip="Create a new protocol", triggered=self.new)
 
         self._fileOpenAction = QAction("&Open...", self, shortcut=QKeySequence.Open,
-            statusTip="Open an existing synaptic protocol file", triggered=self.open)
+            statusTip="Open an OBJ, PLY or STL mesh", triggered=self.open)
 
         self._fileSaveAction = QAction("&Save", self, shortcut=QKeySequence.Save,
             statusTip="Saves synaptic protocol", triggered=self.save)
@@ -86,8 +89,21 @@ class MainWindow(QMainWindow):
 
 
     def open(self):
-        """Open file"""
-        pass
+        """Open a mesh file and add it to the scene"""
+        filename, _ = QFileDialog.getOpenFileName(self, "Open Mesh", "", "Meshes (*.obj *.ply *.stl);;All files (*)")
+        if not filename:
+            return
+        try:
+            self._renderWidget.openMesh(filename)
+        except (IOError, OSError, ValueError) as error:
+            QMessageBox.warning(self, "Open Mesh", "Unable to open {}:\n{}".format(filename, error))
+            return
+        self.statusBar().showMessage("Loading " + filename, 5000)
+
+
+    def loadFailed(self, actor, message):
+        """Tell the user that a file could not be loaded"""
+        QMessageBox.warning(self, "Open Mesh", "Unable to open {}:\n{}".format(getattr(actor, "filename", actor.name), message))
 
 
     def save(self):
@@ -112,7 +128,23 @@ class MainWindow(QMainWindow):
 
     def handleTimer(self):
         times = self._renderWidget.renderTimeEstimates()
-        self.statistics.setText("Render time: " + str(round(times[0],2)) + "ms, GPU time: " + str(round(times[1],2)) + "ms")
+        counts = self._renderWidget.renderStatistics()
+        frames = self._renderWidget.frameStatistics()
+        uploads = self._renderWidget.uploadStatistics()
+        assets = self._renderWidget.assetStatistics()
+        self.statistics.setText("Render time: " + str(round(times[0],2)) + "ms, GPU time: " + str(round(times[1],2)) + "ms (p95 " + str(round(times[3],2)) + "ms)" +
+            ", drawn: " + str(counts.get('drawn', 0)) + ", culled: " + str(counts.get('culled', 0)) +
+            ", triangles: " + str(counts.get('triangles', 0)) +
+            ", frames: " + str(frames['frames']) + ", skipped: " + str(frames['skipped']) +
+            ", uploaded: " + str(round(uploads['frame_bytes'] / 1024.0, 1)) + "KiB" +
+            (", loading: " + str(assets['pending']) if assets['pending'] > 0 else ""))
+
+        ## per scope breakdown shown on hover
+        lines = []
+        for name, scope in self._renderWidget.profileSummary().items():
+            gpu = "-" if scope['gpu'] is None else str(round(scope['gpu'], 3))
+            lines.append(name + ": CPU " + str(round(scope['cpu'], 3)) + "ms, GPU " + gpu + "ms")
+        self.statistics.setToolTip("\n".join(lines[:MainWindow.ProfileLines]))
 
 
     def clearStatistics(self):
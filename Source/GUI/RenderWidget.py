@@ -125,6 +125,16 @@ class RenderWidget(QWidget):
         profilingAction.setChecked(True)  
         profilingAction.triggered.connect(self.profilingChanged)         
         menu.addAction(profilingAction)
+
+        exportTraceAction = QAction("Export Trace...", self)
+        exportTraceAction.triggered.connect(self.exportTrace)
+        menu.addAction(exportTraceAction)
+
+        self._recordAction = QAction("Record Frames...", self)
+        self._recordAction.setCheckable(True)
+        self._recordAction.setChecked(False)
+        self._recordAction.triggered.connect(self.recordChanged)
+        menu.addAction(self._recordAction)
         
         menu.addSeparator() 
         animateAction = QAction("Animate", self)
@@ -151,9 +161,25 @@ class RenderWidget(QWidget):
         self._renderer.clear()
 
 
+    def openMesh(self, filename):
+        """Ask viewer to add the mesh of a file to the scene"""
+        return self._renderer.openMesh(filename)
+
+
+    def loadFailed(self, actor, message):
+        """Pass on the failure to build an actor's geometry"""
+        if hasattr(self._parent, "loadFailed"):
+            self._parent.loadFailed(actor, message)
+
+
+    def assetStatistics(self):
+        """Ask viewer for actors still loading"""
+        return self._renderer.assetStatistics()
+
+
     def updateViewer(self):
         """Refresh viewer"""
-        self._renderer.update()
+        self._renderer.requestRedraw()
 
 
     def viewDirectionChanged(self, index):
@@ -199,6 +225,25 @@ class RenderWidget(QWidget):
             self._parent.clearStatistics()
 
 
+    def exportTrace(self):
+        """Ask for a file and save recently profiled frames as a Chrome trace"""
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Trace", "trace.json", "Trace files (*.json)")
+        if filename:
+            self._renderer.exportTrace(filename)
+
+
+    def recordChanged(self, state):
+        """Ask for a directory and start recording rendered frames into it, or stop recording"""
+        if state:
+            directory = QFileDialog.getExistingDirectory(self, "Record Frames")
+            if directory:
+                self._renderer.startCapture(directory)
+            else:
+                self._recordAction.setChecked(False)
+        else:
+            self._renderer.stopCapture()
+
+
     def animateChanged(self, state):
         """Turn on or off animation"""
         self._renderer.enableAnimation(state)
@@ -209,6 +254,26 @@ class RenderWidget(QWidget):
         return self._renderer.renderTimeEstimates()
 
 
+    def renderStatistics(self):
+        """Ask viewer for draw and culling counters"""
+        return self._renderer.renderStatistics()
+
+
+    def frameStatistics(self):
+        """Ask viewer for frames drawn and redraws skipped"""
+        return self._renderer.frameStatistics()
+
+
+    def uploadStatistics(self):
+        """Ask viewer for bytes uploaded to GPU buffers"""
+        return self._renderer.uploadStatistics()
+
+
+    def profileSummary(self):
+        """Ask viewer for time spent in each profiled scope"""
+        return self._renderer.profileSummary()
+
+
     def sizeHint(self):
         return QSize(1280, 800)
 
@@ -9,6 +9,9 @@ from PyQt5.QtWidgets import QOpenGLWidget
 from OpenGL import GL
 from Source.Graphics.Shaders import Shaders
 from Source.Graphics.Material import Material
+from Source.Graphics.MeshRegistry import MeshRegistry
+from Source.Graphics.BufferUpload import BufferUpload
+from Source.Graphics.OrientedBoxes import OrientedBoxes
 
 ##  Abstract base class for different actor implementations.
 class Actor(QObject):
@@ -33,6 +36,23 @@ class Actor(QObject):
         Modes = [Points, Lines, LineLoop, LineStrip, Triangles, TriangleStrip, TriangleFan]
 
 
+    ## relative slack of the pick bounds covering round off
+    PickTolerance = 1e-5
+
+
+    ## emission, ambient, diffuse, specular and shininess of a packed material
+    InstanceMaterial = [0, 1, 2, 4, 5, 6, 8, 9, 10, 12, 13, 14, 15]
+
+
+    ## screen pixels a segment of a curved outline should span, and the margin before switching detail
+    DetailPixels = 8.0
+    DetailHysteresis = 0.25
+
+
+    ## members swapped when switching the level of detail
+    DetailFields = ('_mesh', '_vao', '_num_vertices', '_num_indices', '_arrays', '_vertices', '_normals', '_colors', '_indices')
+
+
     ## initialization
     def __init__(self, scene, **kwargs):
         """Initialize actor."""
@@ -58,11 +78,13 @@ class Actor(QObject):
         self._active_material = self._material
 
         self._vao = QOpenGLVertexArrayObject()
-        self._vbo = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
-        self._ibo = QOpenGLBuffer(QOpenGLBuffer.IndexBuffer)
+        self._mesh = None
         self._num_vertices = 0
         self._num_indices = 0
 
+        ## arrays the mesh was created from, copied into buffers of its own before they are written
+        self._arrays = None
+
         self._hasNormals = False
         self._hasColors = False
         self._hasTextureCoords = False
@@ -70,7 +92,8 @@ class Actor(QObject):
 
         self._texture = None
 
-        #self._bbox = None
+        self._worldBounds = None
+        self._worldBoundsSource = None
         self._visible = True
         self._enabled = False
         self._pickable = True
@@ -83,6 +106,17 @@ class Actor(QObject):
         self._warningHighlight = False
         
         self._pickFactor = 1.0
+        self._pickBox = None
+
+        ## geometry built by a background loader, a box is drawn until it arrives
+        self._loader = kwargs.get("loader", None)
+        self._placeholderBounds = kwargs.get("bounds", None)
+        self._pending = False
+
+        ## levels of detail, the first the finest, built the first time they are drawn
+        self._lod = kwargs.get("lod", True)
+        self._detail = 0
+        self._details = dict()
 
 
     def update(self, **kwargs):
@@ -92,6 +126,7 @@ class Actor(QObject):
         self._render_type = kwargs.get("type", Actor.RenderType.Solid)
         self._material = kwargs.get("material", Material())
         self._wireframe = kwargs.get("wireframe", Material(diffuse=QVector3D(0.25, 0.25, 0.25)))
+        self.boundsChanged()
 
 
     def scene(self):
@@ -117,6 +152,7 @@ class Actor(QObject):
 
     def setTransform(self, xform):
         self._transform = xform
+        self.boundsChanged()
 
 
     def transform(self):
@@ -132,6 +168,7 @@ class Actor(QObject):
         #print("pos==",pos)
         self._transform = QMatrix4x4()
         self._transform.translate(pos.x(), pos.y(), pos.z())
+        self.boundsChanged()
 
 
     def texture(self):
@@ -142,6 +179,7 @@ class Actor(QObject):
     def setTexture(self, texture):
         """Sets the current texture"""
         self._texture = texture
+        self.changed()
 
 
     def isPickable(self):
@@ -162,6 +200,7 @@ class Actor(QObject):
     def setVisible(self, value):
         """Sets the visibility of this actor"""
         self._visible = value
+        self.changed()
 
 
     def isEnabled(self):
@@ -187,6 +226,7 @@ class Actor(QObject):
     def setSelected(self, value):
         """Sets selection to value"""
         self._selected = value
+        self.changed()
 
 
     def isSelected(self):
@@ -197,6 +237,7 @@ class Actor(QObject):
     def setHighlighted(self, value):
         """Sets the highlight value"""
         self._highlighted = value
+        self.changed()
 
 
     def isHighlighted(self):
@@ -212,6 +253,7 @@ class Actor(QObject):
     def setErrorHighlight(self, value):
         """Sets the error highlight"""
         self._errorHighlight = value
+        self.changed()
         
 
     def setWarningMaterial(self, material):
@@ -222,6 +264,7 @@ class Actor(QObject):
     def setWarningHighlight(self, value):
         """Sets the warning highlight"""
         self._warningHighlight = value
+        self.changed()
         
         
     @property
@@ -309,10 +352,123 @@ class Actor(QObject):
         return self._num_indices
 
 
+    @property
+    def mesh(self):
+        """Returns the mesh holding the GPU buffers of this actor"""
+        return self._mesh
+
+
+    @property
+    def numberOfTriangles(self):
+        """Returns the number of triangles drawn for this actor"""
+        if self._render_mode != Actor.RenderMode.Triangles:
+            return 0
+        return (self._num_indices if self._hasIndices else self._num_vertices) // 3
+
+
+    def detailCount(self):
+        """Returns the number of levels of detail"""
+        return 1
+
+
+    def detailSegments(self, detail):
+        """Returns the number of segments around the outline at a level of detail"""
+        return None
+
+
+    @property
+    def detail(self):
+        """Returns the level of detail drawn, 0 being the finest"""
+        return self._detail
+
+
+    def setDetail(self, detail):
+        """Switch the level of detail, building it the first time, needs a current context"""
+        if detail == self._detail or self._pending:
+            return
+
+        ## park the buffers of the current level, they are kept for when it comes back
+        self._details[self._detail] = {name: getattr(self, name, None) for name in type(self).DetailFields}
+        state = self._details.pop(detail, None)
+        if state is None:
+            self._mesh = None
+            self._vao = QOpenGLVertexArrayObject()
+            self.generateGeometry(detail)
+            self.initialize()
+        else:
+            for name, value in state.items():
+                setattr(self, name, value)
+        self._detail = detail
+
+
+    def selectDetail(self, pixels):
+        """Returns the coarsest level of detail keeping outline segments near DetailPixels long at a projected diameter of pixels"""
+        count = self.detailCount()
+        detail = min(self._detail, count - 1)
+        circumference = math.pi * pixels
+
+        ## coarser only once well below the target, finer only once well above, so that sizes near a threshold do not flip every frame
+        while detail + 1 < count and circumference / self.detailSegments(detail + 1) <= Actor.DetailPixels * (1.0 - Actor.DetailHysteresis):
+            detail += 1
+        while detail > 0 and circumference / self.detailSegments(detail) > Actor.DetailPixels * (1.0 + Actor.DetailHysteresis):
+            detail -= 1
+        return detail
+
+
+    def load(self):
+        """Build and upload geometry, in the background when the actor was given a loader"""
+        if self._loader is None:
+            self.initialize()
+        else:
+            self.createPlaceholder()
+            self._loader.submit(self)
+
+
+    def isPending(self):
+        """Returns whether the geometry is still being built in the background"""
+        return self._pending
+
+
+    def placeholderBounds(self):
+        """Returns (lower, upper) corners of the box drawn while loading, a unit box unless given"""
+        if self._placeholderBounds is not None:
+            return tuple(np.asarray(each, dtype=np.float64) for each in self._placeholderBounds)
+        return (np.full(3, -0.5), np.full(3, 0.5))
+
+
+    def createPlaceholder(self):
+        """Upload the edges of the placeholder box"""
+        lower, upper = self.placeholderBounds()
+        corners = np.array([[(upper if (index >> axis) & 1 else lower)[axis] for axis in range(3)] for index in range(8)], dtype=np.float32)
+        edges = [(a, a | (1 << axis)) for a in range(8) for axis in range(3) if not a & (1 << axis)]
+        self.create(np.ascontiguousarray(corners[np.array(edges).reshape(-1)]))
+        self._pending = True
+
+
+    def finishLoading(self):
+        """Replace the placeholder with the geometry built in the background"""
+        self._pending = False
+        self.initialize()
+        self.boundsChanged()
+        self.changed()
+
+
+    def renderPlaceholder(self):
+        """Render the edges of the placeholder box"""
+        GL.glDrawArrays(GL.GL_LINES, 0, self.numberOfVertices)
+
+
     def mapBuffer(self, offset, count, access):
         """Map the given buffer into a numpy array"""
-        vbo_ptr = self._vbo.mapRange( offset, count, access )
-        vp_array = ctypes.cast(ctypes.c_void_p(int(vbo_ptr)), ctypes.POINTER(ctypes.c_byte * self._vbo.size())).contents
+        self.detachMesh()
+        vbo = self._mesh.vbo
+
+        ## positions written through the mapping are not seen, give up on bounds
+        if offset < self._mesh.offsetNormals:
+            self._mesh.updateBounds(None)
+
+        vbo_ptr = vbo.mapRange( offset, count, access )
+        vp_array = ctypes.cast(ctypes.c_void_p(int(vbo_ptr)), ctypes.POINTER(ctypes.c_byte * vbo.size())).contents
         # Note: we could have returned the raw ctypes.c_byte array instead... see pyglet github for map/unmap classes
         array = np.frombuffer( vp_array, 'B' )
         return array
@@ -320,201 +476,206 @@ class Actor(QObject):
 
     def unmapBuffer(self):
         """Update the GPU with new buffer contents"""
-        self._vbo.unmap()
+        self._mesh.vbo.unmap()
+
+
+    def detachMesh(self):
+        """Copy shared geometry into buffers of this actor alone before they are written, needs a current context"""
+        if self._mesh.references <= 1 and self._mesh.key is None:
+            return
+        self.create(usage=QOpenGLBuffer.DynamicDraw, **self._arrays)
 
 
     def updateBuffer(self, vertices=None, normals=None, colors=None, texcoords=None):
         """Update buffer with new data"""
-        self._vbo.bind()
+
+        ## geometry created for streaming goes to the next region of its ring, whatever its size
+        if self._mesh.isStreaming():
+            self.streamBuffer(vertices, normals, colors, texcoords)
+            return
+
+        ## other actors keep drawing the geometry as it was
+        self.detachMesh()
+
         if vertices is not None:
-            vertices = vertices.tostring()
-            #vertices = np.fromstring(vertices, dtype="uint8")
-            self._vbo.write(0, vertices, len(vertices))
-            #buffer = self.mapBuffer(0, len(vertices), QOpenGLBuffer.RangeWrite | QOpenGLBuffer.RangeInvalidate)
-            #buffer[:len(vertices)] = vertices
-            #self.unmapBuffer()
+            bounds = self._mesh.bounds
+            self._mesh.updateBounds(vertices)
+
+            ## partial updates keep the remaining vertices, so bounds can only grow
+            if vertices.size < 3 * self._mesh.numberOfVertices:
+                if bounds is None or self._mesh.bounds is None:
+                    self._mesh.updateBounds(None)
+                else:
+                    self._mesh.updateBounds(np.concatenate(bounds + self._mesh.bounds))
+
+        vbo = self._mesh.vbo
+        vbo.bind()
+        upload = BufferUpload()
+        if vertices is not None:
+            upload.write(vbo, 0, upload.array(vertices))
         if normals is not None:
-            normals = normals.tostring()
-            self._vbo.write(self._offsetNormals, normals, len(normals))
+            upload.write(vbo, self._mesh.offsetNormals, upload.array(normals))
         if colors is not None:
-            colors = colors.tostring()
-            self._vbo.write(self._offsetColors, colors, len(colors))
+            upload.write(vbo, self._mesh.offsetColors, upload.array(colors))
         if texcoords is not None:
-            texcoords = texcoords.tostring()
-            self._vbo.write(self._offsetTexCoords, texcoords, len(texcoords))
-        self._vbo.release()
+            upload.write(vbo, self._mesh.offsetTexCoords, upload.array(texcoords))
+        vbo.release()
+
+
+    def streamBuffer(self, vertices=None, normals=None, colors=None, texcoords=None):
+        """Write a new frame of geometry created with StreamDraw usage and point the vao at it"""
+        if vertices is not None:
+            self._mesh.updateBounds(vertices)
+        self._mesh.stream(vertices, normals, colors, texcoords)
+        self._num_vertices = self._mesh.numberOfVertices
+
+        ## the region written moves every frame, so does the attribute layout
+        self._vao.bind()
+        self._mesh.bindAttributes([self._solid_shader, self._wireframe_shader, self._nolight_solid_shader, self._nolight_wireframe_shader])
+        self._vao.release()
+        if self._hasIndices:
+            self._mesh.ibo.release(QOpenGLBuffer.IndexBuffer)
+
+        if vertices is not None:
+            self.boundsChanged()
 
 
     def create(self, vertices, normals=None, colors=None, texcoords=None, indices=None, usage=QOpenGLBuffer.StaticDraw):
-        """Create object vertex arrays and buffers"""
+        """Create object vertex arrays and buffers, StreamDraw geometry may be replaced every frame through updateBuffer"""
         
         ## list of shaders
         shaders = [self._solid_shader, self._wireframe_shader, self._nolight_solid_shader, self._nolight_wireframe_shader]
 
+        ## drop previous geometry, if any
+        if self._mesh is not None:
+            MeshRegistry().release(self._mesh)
+
+        ## share buffers with any actor holding the same geometry
+        self._mesh = MeshRegistry().acquire(vertices, normals=normals, colors=colors,
+            texcoords=texcoords, indices=indices, usage=usage)
+        self._arrays = {'vertices': vertices, 'normals': normals, 'colors': colors, 'texcoords': texcoords, 'indices': indices}
+        self._num_vertices = self._mesh.numberOfVertices
+        self._num_indices = self._mesh.numberOfIndices
+        self._hasNormals = self._mesh.hasNormals
+        self._hasColors = self._mesh.hasColors
+        self._hasTextureCoords = self._mesh.hasTextureCoords
+        self._hasIndices = self._mesh.hasIndices
+
         ## bind vao
         self._vao.create()
         self._vao.bind()
 
-        ## define total sizes
-        vertices = vertices.tostring()
-        total_vertices = len(vertices)
-        total_normals = 0
-        total_colors = 0
-        total_texcoords = 0
-        self._num_vertices = total_vertices // (np.dtype(np.float32).itemsize * 3)
-        #print('total vertices=', self._num_vertices)
-
-        if normals is not None:
-            self._hasNormals = True
-            normals = normals.tostring()
-            total_normals = len(normals)
-
-        if colors is not None:
-            self._hasColors = True
-            colors = colors.tostring()
-            total_colors = len(colors)
-
-        if texcoords is not None:
-            self._hasTextureCoords = True
-            texcoords = texcoords.tostring()
-            total_texcoords = len(texcoords)
-
-        if indices is not None:
-            self._hasIndices = True
-            indices = indices.tostring()
-            total_indices = len(indices)
-            self._num_indices = total_indices // np.dtype(np.uint32).itemsize
-            #print('total indices=', self._num_indices)
-        
-        ## create vertex buffer object
-        self._vbo.setUsagePattern(usage)
-        self._vbo.create()
-        self._vbo.bind()
-
-        ## populate vertex buffer object with data
-        offset = 0
-        self._vbo.allocate(total_vertices + total_normals + total_colors + total_texcoords)
-        self._vbo.write(offset, vertices, total_vertices)
-        for each in shaders:
-            each.setAttributeBuffer('position', GL.GL_FLOAT, offset, 3, 3 * np.dtype(np.float32).itemsize)
-        offset += total_vertices
-        self._offsetNormals = offset
-        
-        if self._hasNormals:
-            self._vbo.write(offset, normals, total_normals)
-            for each in shaders:
-                each.setAttributeBuffer('normal', GL.GL_FLOAT, offset, 3, 3 * np.dtype(np.float32).itemsize)
-            offset += total_normals
-        if self._hasColors:
-            self._offsetColors = offset
-            self._vbo.write(offset, colors, total_colors)
-            for each in shaders:
-                each.setAttributeBuffer('color', GL.GL_FLOAT, offset, 3, 3 * np.dtype(np.float32).itemsize)
-            offset += total_colors
-        if self._hasTextureCoords:
-            self._offsetTexCoords = offset
-            self._vbo.write(offset, texcoords, total_texcoords)
-            for each in shaders:
-                each.setAttributeBuffer('texcoord', GL.GL_FLOAT, offset, 2, 2 * np.dtype(np.float32).itemsize)
-            offset += total_texcoords
-
-        ## release buffer
-        self._vbo.release(QOpenGLBuffer.VertexBuffer)
-
-        ## enable arrays as part of the vao state
-        for each in shaders:
-            each.enableAttributeArray('position')
-        if self._hasNormals:
-            for each in shaders:
-                each.enableAttributeArray('normal')
-        if self._hasColors:
-            for each in shaders:
-                each.enableAttributeArray('color')
-        if self._hasTextureCoords:
-            for each in shaders:
-                each.enableAttributeArray('texcoord')
-
-        ## create index buffer object if required by the actor
-        if self._hasIndices:
-            self._ibo.setUsagePattern(usage)
-            self._ibo.create()
-            self._ibo.bind()
-
-            self._ibo.allocate(total_indices)
-            self._ibo.write(0, indices, total_indices)
+        ## record mesh layout as part of the vao state
+        self._mesh.bindAttributes(shaders)
 
         ## release vao
         self._vao.release()
             
         ## release ibo
         if self._hasIndices:
-            self._ibo.release(QOpenGLBuffer.IndexBuffer)
+            self._mesh.ibo.release(QOpenGLBuffer.IndexBuffer)
+
+
+    def destroy(self):
+        """Free vertex array, material buffers and release the mesh"""
+        if self._pending:
+            self._loader.cancel(self)
+            self._pending = False
+        for state in self._details.values():
+            MeshRegistry().release(state['_mesh'])
+            state['_vao'].destroy()
+        self._details.clear()
+        if self._mesh is not None:
+            MeshRegistry().release(self._mesh)
+            self._mesh = None
+        self._vao.destroy()
+
+        ## presets are shared with other actors
+        for each in (self._material, self._wireframe, self._errorMaterial, self._warningMaterial):
+            if not each.isPreset():
+                each.destroy()
+
+
+    def renderMaterial(self, base=None):
+        """Returns the material this actor is drawn with"""
+        base = self._active_material if base is None else base
+        material = base
+
+        ## the error and warning colors take precedence
+        if self._warningHighlight:
+            material = self._warningMaterial
+        elif self._errorHighlight:
+            material = self._errorMaterial
+
+        ## highlighted and enabled actors glow
+        if self.isHighlighted() or self.isEnabled():
+            emission = QVector3D(0.25, 0.25, 0.25)
+        else:
+            emission = base.emissionColor
+
+        return material.variant(emission)
 
 
     def setUniformBindings(self, wireframe=False):
         """Sets up uniform shader bindings"""
-        normalMatrix = self._transform.normalMatrix()
         self._active_shader.setUniformValue("modelMatrix", self._transform)
-        self._active_shader.setUniformValue("viewMatrix", self._scene.camera.viewMatrix)
-        self._active_shader.setUniformValue("projectionMatrix", self._scene.camera.projectionMatrix)
-        self._active_shader.setUniformValue("normalMatrix", normalMatrix)
+        self._active_shader.setUniformValue("normalMatrix", self._transform.normalMatrix())
+
+        ## selection is only shown through the texture
         if self.texture() is not None:
             self._active_shader.setUniformValue("texObject", 0)
-        
-        ## bind active material
-        if self.isSelectable() and self.isSelected():
-            self._active_shader.setUniformValue("selected", 1.0)
-        else:
-            self._active_shader.setUniformValue("selected", 0.65)
-
-        ## set highlight color
-        if self.isHighlighted():
-            self._active_shader.setUniformValue("material.emission", QVector3D(0.25, 0.25, 0.25))
-        else:
-            self._active_shader.setUniformValue("material.emission", self._active_material.emissionColor)
-        self._active_shader.setUniformValue("material.ambient", self._active_material.ambientColor)
-        
-        ## set the enabled color
-        if self.isEnabled():
-            self._active_shader.setUniformValue("material.emission", QVector3D(0.25, 0.25, 0.25))
-            self._active_shader.setUniformValue("material.diffuse", self._active_material.diffuseColor)
-        else:
-            self._active_shader.setUniformValue("material.diffuse", self._active_material.diffuseColor)
-        self._active_shader.setUniformValue("material.specular", self._active_material.specularColor)
-        self._active_shader.setUniformValue("material.shininess", self._active_material.shininess)
-    
-        ## set the error and warning colors
-        if self._errorHighlight:
-            self._active_shader.setUniformValue("material.ambient", self._errorMaterial.ambientColor)
-            self._active_shader.setUniformValue("material.diffuse", self._errorMaterial.diffuseColor)
-            self._active_shader.setUniformValue("material.specular", self._errorMaterial.specularColor)
-            self._active_shader.setUniformValue("material.shininess", self._errorMaterial.shininess)
-        if self._warningHighlight:
-            self._active_shader.setUniformValue("material.ambient", self._warningMaterial.ambientColor)
-            self._active_shader.setUniformValue("material.diffuse", self._warningMaterial.diffuseColor)
-            self._active_shader.setUniformValue("material.specular", self._warningMaterial.specularColor)
-            self._active_shader.setUniformValue("material.shininess", self._warningMaterial.shininess)     
-        
-        ## bind lights
-        camera_position = QVector4D(self._scene.camera.position[0], self._scene.camera.position[1], self._scene.camera.position[2], 1.0)
-        if self._scene.light.headlight:
-            if self._scene.light.directional:
-                self._active_shader.setUniformValue("lightPosition", QVector4D(0.0, 0.0, 1.0, 0.0))
+            if self.isSelectable() and self.isSelected():
+                self._active_shader.setUniformValue("selected", 1.0)
             else:
-                self._active_shader.setUniformValue("lightPosition", QVector4D(0.0, 0.0, 0.0, 1.0))
-        else:
-            self._active_shader.setUniformValue("lightPosition", self._scene.camera.viewMatrix * self._scene.light.position)
+                self._active_shader.setUniformValue("selected", 0.65)
 
-        self._active_shader.setUniformValue("light.ambient", self._scene.light.ambientColor)
-        self._active_shader.setUniformValue("light.diffuse", self._scene.light.diffuseColor)
-        self._active_shader.setUniformValue("light.specular", self._scene.light.specularColor)
-        self._active_shader.setUniformValue("lightAttenuation", self._scene.light.attenuation)
+        ## camera and lights are bound by the scene, bind active material
+        self.renderMaterial().bind()
 
 
-    ## This should set up any required state before any actual rendering happens.
-    def beginRendering(self, draw_style, lighting, shading, passNumber):
-        ## determine right shader to bind
-        if lighting:
+    def instanceData(self):
+        """Returns per-instance attributes: model matrix, normal matrix and material"""
+        packed = self.renderMaterial(self._material).packed()
+        return self._transform.data() + self._transform.normalMatrix().data() + packed[Actor.InstanceMaterial].tolist()
+
+
+    def instancedShader(self, draw_style, lighting, shading):
+        """Returns the shader to draw this actor instanced with, None if it cannot be batched"""
+        if self._mesh is None or self._texture is not None or self._pending:
+            return None
+        if self._render_type != self.RenderType.Solid or draw_style != GL.GL_FILL or not lighting:
+            return None
+        if type(self).renderInstanced is Actor.renderInstanced:
+            return None
+
+        shader = self._solid_shader if shading == GL.GL_SMOOTH else self._solid_flat_shader
+        return self._shader_collection.instancedShader(shader)
+
+
+    @property
+    def activeShader(self):
+        """Returns the shader selected for the current pass"""
+        return self._active_shader
+
+
+    @property
+    def activeMaterial(self):
+        """Returns the material selected for the current pass"""
+        return self._active_material
+
+
+    @property
+    def vertexArray(self):
+        """Returns the vertex array object of this actor"""
+        return self._vao
+
+
+    def selectShader(self, draw_style, lighting, shading, passNumber):
+        """Determine shader and material to render with"""
+        if self._pending:
+            self._active_shader = self._nolight_wireframe_shader
+            self._active_material = self._wireframe
+        elif lighting:
             if draw_style == GL.GL_LINE:
                 self._active_shader = self._wireframe_shader
                 self._active_material = self._material if passNumber == 0 else self._wireframe
@@ -532,6 +693,9 @@ class Actor(QObject):
                 self._active_shader = self._nolight_solid_shader
                 self._active_material = self._material
 
+
+    def setRenderState(self, draw_style):
+        """Set polygon mode and depth state for this actor's render type"""
         GL.glPolygonMode(GL.GL_FRONT_AND_BACK, draw_style)
 
         ## determine rendering type to use
@@ -543,6 +707,14 @@ class Actor(QObject):
             GL.glDepthMask(GL.GL_FALSE)
         elif self._render_type == self.RenderType.Overlay:
             GL.glDisable(GL.GL_DEPTH_TEST)
+
+
+    ## This should set up any required state before any actual rendering happens.
+    def beginRendering(self, draw_style, lighting, shading, passNumber):
+        ## determine right shader to bind
+        self.selectShader(draw_style, lighting, shading, passNumber)
+
+        self.setRenderState(draw_style)
         
         ## bind shader
         self._active_shader.bind()
@@ -563,6 +735,11 @@ class Actor(QObject):
         raise NotImplementedError("render() must be implemented in child class")
 
 
+    def renderInstanced(self, instances):
+        """Render this actor's geometry once per instance"""
+        raise NotImplementedError("renderInstanced() must be implemented in child class")
+
+
     def endRendering(self):
         """Finished rendering, clean yourself up"""
 
@@ -585,38 +762,75 @@ class Actor(QObject):
     def setPickFactor(self, value):
         """Sets the pick factor for intersection calculations"""
         self._pickFactor = value
-        
-        
+        self.boundsChanged()
+
+
+    def changed(self):
+        """Lets the scene know that this actor looks different"""
+        if self._scene is not None:
+            self._scene.invalidate()
+
+
+    def boundsChanged(self):
+        """Lets the scene know that the pick volume and bounds of this actor moved"""
+        self._pickBox = None
+        self._worldBounds = None
+        if self._scene is not None:
+            self._scene.updateBounds(self)
+
+
+    def localBounds(self):
+        """Returns (lower, upper) corners enclosing the geometry in local space, None if unknown"""
+        return None if self._mesh is None else self._mesh.bounds
+
+
+    def worldBounds(self):
+        """Returns center and half extents of the world space box enclosing the geometry, None if unknown"""
+        bounds = self.localBounds()
+        if bounds is None:
+            return None
+
+        if self._worldBounds is None or self._worldBoundsSource is not bounds:
+            lower, upper = bounds
+            xform = np.array(self._transform.data(), dtype=np.float64).reshape(4, 4).T
+            center = xform[:3, :3].dot((lower + upper) / 2.0) + xform[:3, 3]
+            extent = np.abs(xform[:3, :3]).dot((upper - lower) / 2.0)
+            self._worldBounds = (center, extent)
+            self._worldBoundsSource = bounds
+        return self._worldBounds
+
+
+    def pickBounds(self):
+        """Returns world space (lower, upper, slope) enclosing the volume tested by intersect, None if unbounded"""
+        box = self.pickBox()
+        axes = box[OrientedBoxes.Axes].reshape(3, 3)
+        if not np.all(axes.any(axis=1)) or np.linalg.cond(axes) > 1e6:
+            return None
+        inverse = np.abs(np.linalg.inv(axes))
+
+        ## rays close to parallel to a slab are not clipped by it, so the box
+        ## grows with the distance along the ray, and is padded for round off
+        center = box[OrientedBoxes.Center]
+        extent = inverse.dot(box[OrientedBoxes.Halves]) * max(box[OrientedBoxes.Factor], 1.0)
+        extent += Actor.PickTolerance * (1.0 + np.abs(center) + extent)
+        slope = OrientedBoxes.Parallel * inverse.sum(axis=1).max() + Actor.PickTolerance
+        return (tuple((center - extent).tolist()), tuple((center + extent).tolist()), float(slope))
+
+
+    def pickBox(self):
+        """Returns the packed oriented box tested when picking this actor"""
+        if self._pickBox is None:
+            self._pickBox = OrientedBoxes.pack(self._transform, self._pickFactor)
+        return self._pickBox
+
+
     def intersect(self, ray):
         """Returns intersection if any"""
-        tMin = -math.inf
-        tMax = math.inf
-        obb_xform = self.transform()
-        obb_center = QVector3D(obb_xform[0,3], obb_xform[1,3], obb_xform[2,3])
-        point = obb_center - ray.origin()
-        for i in range(3):
-            axis = QVector3D(obb_xform[0,i], obb_xform[1,i], obb_xform[2,i]).normalized()
-            half_length = QVector3D(obb_xform[i,0], obb_xform[i,1], obb_xform[i,2]).length() / 2.0
-            e = QVector3D.dotProduct(axis, point)
-            f = QVector3D.dotProduct(axis, ray.direction())
-            if abs(f) > 10E-6:
-                t1 = (e + half_length*self._pickFactor) / f
-                t2 = (e - half_length*self._pickFactor) / f
-                if t1 > t2:
-                    w=t1; t1=t2; t2=w
-                if t1 > tMin:
-                    tMin = t1
-                if t2 < tMax:
-                    tMax = t2
-                if tMin > tMax:
-                    return (False, math.inf)
-                if tMax < 0:
-                    return (False, math.inf)
-            elif -e-half_length > 0.0 or -e+half_length < 0.0:
-                return (False, math.inf)
-        if tMin > 0:
-            return (True, tMin)
-        return (True, tMax)
+        origin = ray.origin()
+        direction = ray.direction()
+        hits, distances = OrientedBoxes(self.pickBox()).intersect(
+            (origin.x(), origin.y(), origin.z()), (direction.x(), direction.y(), direction.z()))
+        return (bool(hits[0, 0]), float(distances[0, 0]))
 
 
     
@@ -0,0 +1,143 @@
+import os
+import queue
+import concurrent.futures
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from Source.Graphics.BufferUpload import BufferUpload
+
+##  Builds actor geometry on a pool of worker threads and uploads it from the render thread under a byte budget per frame.
+class AssetLoader(QObject):
+
+    ## emitted from a worker when geometry is ready to be uploaded
+    ready = pyqtSignal()
+
+    ## emitted when building the geometry of an actor failed, with the error message
+    failed = pyqtSignal(object, str)
+
+
+    ## initialization
+    def __init__(self, viewer, **kwargs):
+        """Initialize loader feeding viewer."""
+        super(AssetLoader, self).__init__()
+
+        self._viewer = viewer
+        self._budget = kwargs.get("budget", 32 * 1024 * 1024)
+        self._workers = kwargs.get("workers", min(4, os.cpu_count() or 1))
+        self._executor = None
+
+        ## finished work waiting for the render thread, in the order it finished
+        self._done = queue.Queue()
+        self._futures = dict()
+        self._loaded = 0
+        self._failures = 0
+        self._cancelled = 0
+        self._bytes = 0
+
+        ## queued connection, the viewer is asked for a frame on its own thread
+        self.ready.connect(self._viewer.requestRedraw)
+
+
+    @property
+    def budget(self):
+        """Returns the number of bytes uploaded per frame before the rest waits for the next one"""
+        return self._budget
+
+
+    def setBudget(self, budget):
+        """Sets the number of bytes uploaded per frame, at least one actor is uploaded whatever its size"""
+        self._budget = budget
+
+
+    def executor(self):
+        """Returns the pool of workers, started when first needed"""
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="AssetLoader")
+        return self._executor
+
+
+    def submit(self, actor):
+        """Build the geometry of actor on a worker"""
+        future = self.executor().submit(actor.generateGeometry)
+        self._futures[actor] = future
+        future.add_done_callback(lambda future: self.finished(actor, future))
+
+
+    def execute(self, function):
+        """Run function on a worker and ask for a frame once it is done, returns its future"""
+        future = self.executor().submit(function)
+        future.add_done_callback(lambda future: self.ready.emit())
+        return future
+
+
+    def finished(self, actor, future):
+        """Called on the worker, hands the actor over to the render thread"""
+        self._done.put((actor, future))
+        self.ready.emit()
+
+
+    def cancel(self, actor):
+        """Forget an actor removed before its geometry was uploaded"""
+        future = self._futures.pop(actor, None)
+        if future is not None:
+            future.cancel()
+            self._cancelled += 1
+
+
+    def pending(self):
+        """Returns the number of actors whose geometry is not uploaded yet"""
+        return len(self._futures)
+
+
+    def upload(self):
+        """Upload finished geometry until the byte budget of this frame is spent, needs a current context"""
+        counter = BufferUpload()
+        start = counter.statistics()['bytes']
+        uploaded = 0
+        while uploaded == 0 or counter.statistics()['bytes'] - start < self._budget:
+            try:
+                actor, future = self._done.get_nowait()
+            except queue.Empty:
+                break
+
+            ## removed from the scene while building
+            if self._futures.pop(actor, None) is not future or future.cancelled():
+                continue
+
+            error = future.exception()
+            if error is not None:
+                self._failures += 1
+                self.failed.emit(actor, str(error))
+                continue
+
+            actor.finishLoading()
+            self._loaded += 1
+            uploaded += 1
+
+        self._bytes += counter.statistics()['bytes'] - start
+
+        ## the rest goes into the next frames
+        if not self._done.empty():
+            self._viewer.requestRedraw()
+        return uploaded
+
+
+    def statistics(self):
+        """Returns actors waiting, loaded, failed and cancelled, and bytes uploaded by the loader"""
+        return {
+            'pending': len(self._futures),
+            'ready': self._done.qsize(),
+            'loaded': self._loaded,
+            'failed': self._failures,
+            'cancelled': self._cancelled,
+            'bytes': self._bytes,
+            'budget': self._budget
+        }
+
+
+    def shutdown(self):
+        """Stop the workers, geometry not built yet is dropped"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._futures.clear()
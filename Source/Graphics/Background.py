@@ -1,7 +1,7 @@
 import numpy as np
 
 from OpenGL import GL
-from PyQt5.QtGui import QColor
+from PyQt5.QtGui import QColor, QOpenGLBuffer
 from Source.Graphics.Actor import Actor
 
 class Background(Actor):
@@ -115,8 +115,8 @@ class Background(Actor):
         if self._vertices is None:
             self.generateGeometry()
 
-        ## create object
-        self.create(self._vertices, colors=self._colors)
+        ## create object, colors are rewritten when the palette changes
+        self.create(self._vertices, colors=self._colors, usage=QOpenGLBuffer.DynamicDraw)
 
 
     def setPalette(self, palette):
@@ -0,0 +1,294 @@
+import math
+import heapq
+
+from PyQt5.QtCore import QObject
+
+##  Dynamic tree of axis aligned boxes used to find the items hit by a ray.
+class BoundingVolumeHierarchy(QObject):
+
+    ## leaf boxes are enlarged by this fraction of their size so that small moves keep the tree intact
+    Margin = 0.1
+
+
+    class Node:
+        """Box enclosing an item, or both children for inner nodes"""
+
+        def __init__(self, lower, upper, slope=0.0, item=None):
+            self.lower = lower
+            self.upper = upper
+            self.slope = slope      ## growth of the box per unit of ray distance
+            self.item = item
+            self.parent = None
+            self.left = None
+            self.right = None
+            self.height = 0
+
+
+        def isLeaf(self):
+            return self.item is not None
+
+
+    ## initialization
+    def __init__(self):
+        """Initialize empty hierarchy."""
+        super(BoundingVolumeHierarchy, self).__init__()
+
+        self._root = None
+        self._leaves = dict()
+        self._unbounded = set()
+        self._rebuilds = 0
+
+
+    @property
+    def count(self):
+        """Returns the number of items stored"""
+        return len(self._leaves) + len(self._unbounded)
+
+
+    @property
+    def height(self):
+        """Returns the height of the tree"""
+        return 0 if self._root is None else self._root.height
+
+
+    def contains(self, item):
+        """Returns whether item is stored"""
+        return item in self._leaves or item in self._unbounded
+
+
+    def clear(self):
+        """Remove all items"""
+        self._root = None
+        self._leaves.clear()
+        self._unbounded.clear()
+
+
+    def insert(self, item, bounds):
+        """Store item with bounds (lower, upper, slope), None for items hit from anywhere"""
+        if bounds is None:
+            self._unbounded.add(item)
+            return
+
+        lower, upper, slope = bounds
+        leaf = BoundingVolumeHierarchy.Node(*self.enlarge(lower, upper), slope=slope, item=item)
+        self._leaves[item] = leaf
+        self.insertLeaf(leaf)
+
+        ## keep traversal logarithmic whatever the order of insertion
+        if self._root.height > 2 * math.ceil(math.log2(len(self._leaves))) + 4:
+            self.rebuild()
+
+
+    def remove(self, item):
+        """Remove item"""
+        if item in self._unbounded:
+            self._unbounded.discard(item)
+            return
+        self.removeLeaf(self._leaves.pop(item))
+
+
+    def update(self, item, bounds):
+        """Move item to new bounds, returns whether the tree changed"""
+        leaf = self._leaves.get(item, None)
+        if leaf is not None and bounds is not None:
+            lower, upper, slope = bounds
+            if slope <= leaf.slope and self.encloses(leaf.lower, leaf.upper, lower, upper):
+                return False
+
+        self.remove(item)
+        self.insert(item, bounds)
+        return True
+
+
+    def enlarge(self, lower, upper):
+        """Returns box grown by the margin"""
+        grow = [BoundingVolumeHierarchy.Margin * (upper[i] - lower[i]) for i in range(3)]
+        return (tuple(lower[i] - grow[i] for i in range(3)), tuple(upper[i] + grow[i] for i in range(3)))
+
+
+    @classmethod
+    def encloses(cls, lower, upper, innerLower, innerUpper):
+        """Returns whether box contains inner box"""
+        return all(lower[i] <= innerLower[i] and innerUpper[i] <= upper[i] for i in range(3))
+
+
+    @classmethod
+    def union(cls, a, b):
+        """Returns lower and upper corners of the box enclosing nodes a and b"""
+        return (tuple(min(a.lower[i], b.lower[i]) for i in range(3)),
+            tuple(max(a.upper[i], b.upper[i]) for i in range(3)))
+
+
+    @classmethod
+    def perimeter(cls, lower, upper):
+        """Returns the sum of the box sides, cheaper stand in for its surface area"""
+        return (upper[0] - lower[0]) + (upper[1] - lower[1]) + (upper[2] - lower[2])
+
+
+    def refit(self, node):
+        """Recompute boxes and heights from node up to the root"""
+        while node is not None:
+            node.lower, node.upper = self.union(node.left, node.right)
+            node.slope = max(node.left.slope, node.right.slope)
+            node.height = 1 + max(node.left.height, node.right.height)
+            node = node.parent
+
+
+    def insertLeaf(self, leaf):
+        """Attach leaf next to the node whose box grows the least"""
+        if self._root is None:
+            self._root = leaf
+            leaf.parent = None
+            return
+
+        ## descend while it is cheaper to push the leaf further down
+        node = self._root
+        while not node.isLeaf():
+            area = self.perimeter(node.lower, node.upper)
+            combined = self.perimeter(*self.union(node, leaf))
+            cost = 2.0 * combined
+            inherited = 2.0 * (combined - area)
+
+            costs = []
+            for child in (node.left, node.right):
+                grown = self.perimeter(*self.union(child, leaf))
+                if not child.isLeaf():
+                    grown -= self.perimeter(child.lower, child.upper)
+                costs.append(grown + inherited)
+
+            if cost < costs[0] and cost < costs[1]:
+                break
+            node = node.left if costs[0] < costs[1] else node.right
+
+        ## replace the chosen sibling by a new parent of both
+        sibling = node
+        parent = BoundingVolumeHierarchy.Node(*self.union(sibling, leaf))
+        parent.parent = sibling.parent
+        if sibling.parent is None:
+            self._root = parent
+        elif sibling.parent.left is sibling:
+            sibling.parent.left = parent
+        else:
+            sibling.parent.right = parent
+        parent.left = sibling
+        parent.right = leaf
+        sibling.parent = parent
+        leaf.parent = parent
+        self.refit(parent)
+
+
+    def removeLeaf(self, leaf):
+        """Detach leaf, its sibling takes the place of their parent"""
+        if leaf is self._root:
+            self._root = None
+            return
+
+        parent = leaf.parent
+        sibling = parent.right if parent.left is leaf else parent.left
+        grandParent = parent.parent
+        sibling.parent = grandParent
+        if grandParent is None:
+            self._root = sibling
+        else:
+            if grandParent.left is parent:
+                grandParent.left = sibling
+            else:
+                grandParent.right = sibling
+            self.refit(grandParent)
+        leaf.parent = None
+
+
+    def rebuild(self):
+        """Rebuild a balanced tree over the current leaves"""
+        self._rebuilds += 1
+        leaves = list(self._leaves.values())
+        self._root = self.build(leaves) if len(leaves) > 0 else None
+        if self._root is not None:
+            self._root.parent = None
+
+
+    def build(self, leaves):
+        """Returns root of a tree built top down by splitting at the median center"""
+        if len(leaves) == 1:
+            return leaves[0]
+
+        ## split along the axis in which centers spread the most
+        centers = [[each.lower[i] + each.upper[i] for i in range(3)] for each in leaves]
+        spread = [max(c[i] for c in centers) - min(c[i] for c in centers) for i in range(3)]
+        axis = spread.index(max(spread))
+        order = sorted(range(len(leaves)), key=lambda index: centers[index][axis])
+        middle = len(leaves) // 2
+
+        node = BoundingVolumeHierarchy.Node(None, None)
+        node.left = self.build([leaves[index] for index in order[:middle]])
+        node.right = self.build([leaves[index] for index in order[middle:]])
+        node.left.parent = node
+        node.right.parent = node
+        node.lower, node.upper = self.union(node.left, node.right)
+        node.slope = max(node.left.slope, node.right.slope)
+        node.height = 1 + max(node.left.height, node.right.height)
+        return node
+
+
+    @classmethod
+    def enter(cls, node, origin, direction):
+        """Returns the smallest non negative ray distance inside the node's box, None if missed"""
+        near = 0.0
+        far = math.inf
+        slope = node.slope
+        for i in (0, 1, 2):
+
+            ## the box grows with distance by slope, each side bounds the ray distance from one end
+            for rate, room in ((direction[i] - slope, node.upper[i] - origin[i]), (-direction[i] - slope, origin[i] - node.lower[i])):
+                if rate > 0.0:
+                    distance = room / rate
+                    if distance < far:
+                        far = distance
+                elif rate < 0.0:
+                    distance = room / rate
+                    if distance > near:
+                        near = distance
+                elif room < 0.0:
+                    return None
+            if near > far:
+                return None
+        return near
+
+
+    def traverse(self, origin, direction):
+        """Yields (distance, item) of the items whose boxes the ray crosses, by increasing entry distance.
+
+        Items hit from anywhere come first with distance 0, callers may stop
+        consuming once the distance exceeds their closest hit."""
+        for item in self._unbounded:
+            yield (0.0, item)
+
+        if self._root is None:
+            return
+        near = self.enter(self._root, origin, direction)
+        if near is None:
+            return
+
+        queue = [(near, 0, self._root)]
+        counter = 1
+        while queue:
+            near, index, node = heapq.heappop(queue)
+            if node.isLeaf():
+                yield (near, node.item)
+                continue
+
+            for child in (node.left, node.right):
+                near = self.enter(child, origin, direction)
+                if near is not None:
+                    heapq.heappush(queue, (near, counter, child))
+                    counter += 1
+
+
+    def statistics(self):
+        """Returns size and shape counters"""
+        return {
+            'items': self.count,
+            'unbounded': len(self._unbounded),
+            'height': self.height,
+            'rebuilds': self._rebuilds
+        }
@@ -0,0 +1,86 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+##  Hands array memory to GPU buffers without copying it and counts the bytes uploaded per frame.
+class BufferUpload(QObject):
+
+    ## singleton
+    __instance = None
+
+    ## element types buffers are filled with, and the array kinds that may be converted to them
+    Attribute = (np.dtype(np.float32), "fiu")
+    Index = (np.dtype(np.uint32), "iu")
+
+
+    def __new__(cls):
+        if BufferUpload.__instance is None:
+            BufferUpload.__instance = QObject.__new__(cls)
+            BufferUpload.__instance.initialize()
+        return BufferUpload.__instance
+
+
+    def initialize(self):
+        """Create counters"""
+        self.__instance._bytes = 0
+        self.__instance._uploads = 0
+        self.__instance._conversions = 0
+        self.__instance._converted = 0
+        self.__instance._frameBytes = 0
+        self.__instance._lastFrameBytes = 0
+
+
+    def array(self, data, layout=Attribute):
+        """Returns data as a C-contiguous array of the layout element type, copied only if it is not one already"""
+        dtype, kinds = layout
+        array = np.asarray(data)
+        if array.dtype.kind not in kinds:
+            raise TypeError("Cannot upload array of {} as {}".format(array.dtype, dtype))
+        if array.dtype == dtype and array.flags['C_CONTIGUOUS']:
+            return array
+
+        ## conversions double peak memory for a moment, callers should hand over buffer ready arrays
+        self._conversions += 1
+        self._converted += array.nbytes
+        return np.ascontiguousarray(array, dtype=dtype)
+
+
+    def indices(self, data):
+        """Returns data as a C-contiguous array of unsigned ints"""
+        return self.array(data, BufferUpload.Index)
+
+
+    def record(self, count):
+        """Count bytes sent to the GPU by other means, such as a mapped range"""
+        self._bytes += count
+        self._frameBytes += count
+        self._uploads += 1
+
+
+    def allocate(self, buffer, array):
+        """Allocate bound buffer storage filled with array, read straight from its memory"""
+        buffer.allocate(array, array.nbytes)
+        self.record(array.nbytes)
+
+
+    def write(self, buffer, offset, array):
+        """Write array into bound buffer at byte offset, read straight from its memory"""
+        buffer.write(offset, array, array.nbytes)
+        self.record(array.nbytes)
+
+
+    def endFrame(self):
+        """Bytes uploaded since the last frame are charged to the frame just drawn"""
+        self._lastFrameBytes = self._frameBytes
+        self._frameBytes = 0
+
+
+    def statistics(self):
+        """Returns bytes uploaded by the last frame and overall, and arrays that had to be converted first"""
+        return {
+            'frame_bytes': self._lastFrameBytes,
+            'bytes': self._bytes,
+            'uploads': self._uploads,
+            'conversions': self._conversions,
+            'converted_bytes': self._converted
+        }
@@ -32,6 +32,10 @@ class Camera(QObject):
         self._focal_distance = 5.0
         self._aspect_ratio = 1.0
 
+        ## matrices are only recomputed after a parameter changes
+        self._view_dirty = True
+        self._projection_dirty = True
+
         self._stored = None
 
 
@@ -53,6 +57,9 @@ class Camera(QObject):
         self._focal_distance = camera.focalDistance
         self._aspect_ratio = camera.aspectRatio
 
+        self._view_dirty = True
+        self._projection_dirty = True
+
 
     def store(self):
         """Save current camera settings"""
@@ -66,6 +73,7 @@ class Camera(QObject):
         if self._stored:
             self.copyFrom(self._stored)
             self._aspect_ratio = aspect
+            self._projection_dirty = True
             
 
     @property
@@ -97,6 +105,8 @@ class Camera(QObject):
                     self._position = focal_point - self._focal_distance * direction
             
             self._lens = lens
+            self._view_dirty = True
+            self._projection_dirty = True
 
 
     @property
@@ -108,6 +118,7 @@ class Camera(QObject):
     def setPosition(self, position):
         """Sets the position of the camera"""
         self._position = position
+        self._view_dirty = True
 
 
     @property
@@ -119,6 +130,7 @@ class Camera(QObject):
     def setAspectRatio(self, aspect):
         """Sets the aspect ratio of the camera"""
         self._aspect_ratio = aspect
+        self._projection_dirty = True
 
     
     @property
@@ -141,6 +153,7 @@ class Camera(QObject):
     def setHeight(self, height):
         """Sets the height of the camera"""
         self._height = height
+        self._projection_dirty = True
 
 
     def scaleHeight(self, scaleFactor):
@@ -149,6 +162,7 @@ class Camera(QObject):
             self._height *= scaleFactor
         else:
             self._fovy *= scaleFactor
+        self._projection_dirty = True
 
 
     @property
@@ -157,9 +171,10 @@ class Camera(QObject):
         return self._fovy
 
 
-    def setHeightAngle(self, fov):
+    def setHeightAngle(self, fovy):
         """Sets the height angle of the camera"""
         self._fovy = fovy
+        self._projection_dirty = True
 
 
     @property
@@ -171,6 +186,7 @@ class Camera(QObject):
     def setNearDistance(self, near):
         """Sets the distance to the near clipping plane from the camera"""
         self._near_distance = near
+        self._projection_dirty = True
 
 
     @property
@@ -182,6 +198,7 @@ class Camera(QObject):
     def setFarDistance(self, far):
         """Sets the distance to the far clipping plane from the camera"""
         self._far_distance = far
+        self._projection_dirty = True
 
 
     @property
@@ -192,7 +209,9 @@ class Camera(QObject):
 
     def setRotation(self, rotation):
         """Sets the rotation of the camera"""
-        self._rotation = rotation
+        if rotation != self._rotation:
+            self._rotation = rotation
+            self._view_dirty = True
 
 
     @property
@@ -204,6 +223,7 @@ class Camera(QObject):
     def setOrientation(self, orientation):
         """Sets the orientation matrix of the camera"""
         self._orientation = orientation
+        self._view_dirty = True
 
 
     def pointAt(self, target, up=QVector3D(0.0, 1.0, 0.0)):
@@ -223,6 +243,7 @@ class Camera(QObject):
             y[0], y[1], y[2], 0.0,
             z[0], z[1], z[2], 0.0,
             0.0, 0.0, 0.0, 1.0)
+        self._view_dirty = True
 
 
     def cameraMatrixOriginal(self):
@@ -244,18 +265,23 @@ class Camera(QObject):
 
     @property
     def viewMatrix(self):
-        """Returns view matrix for this camera"""
-        return self.cameraMatrix().inverted()[0]
+        """Returns view matrix for this camera, do not modify it"""
+        if self._view_dirty:
+            self._view_matrix = self.cameraMatrix().inverted()[0]
+            self._view_dirty = False
+        return self._view_matrix
 
 
     @property
     def projectionMatrix(self):
-        """Returns the projection matrix for this camera"""
-        self._projection_matrix.setToIdentity()
-        if self._lens == Camera.Lens.Orthographic:
-            xradius = 0.5 * self._height * self._aspect_ratio
-            yradius = 0.5 * self._height
-            self._projection_matrix.ortho(-xradius, xradius, -yradius, yradius, self._near_distance, self._far_distance)
-        else:
-            self._projection_matrix.perspective(self._fovy, self._aspect_ratio, self._near_distance, self._far_distance)
+        """Returns the projection matrix for this camera, do not modify it"""
+        if self._projection_dirty:
+            self._projection_matrix = QMatrix4x4()
+            if self._lens == Camera.Lens.Orthographic:
+                xradius = 0.5 * self._height * self._aspect_ratio
+                yradius = 0.5 * self._height
+                self._projection_matrix.ortho(-xradius, xradius, -yradius, yradius, self._near_distance, self._far_distance)
+            else:
+                self._projection_matrix.perspective(self._fovy, self._aspect_ratio, self._near_distance, self._far_distance)
+            self._projection_dirty = False
         return self._projection_matrix
@@ -2,9 +2,15 @@ import math
 import numpy as np
 from OpenGL import GL
 from Source.Graphics.Actor import Actor
+from Source.Graphics.GeometryCache import GeometryCache
+from Source.Graphics.MeshOptimizer import MeshOptimizer
 
 class Cone(Actor):
 
+    ## coarsest resolution levels of detail go down to
+    MinResolution = 6
+
+
     ## initialization
     def __init__(self, renderer,  **kwargs):
         """Initialize actor."""
@@ -17,7 +23,7 @@ class Cone(Actor):
         self._vertices = None
 
         ## create actor
-        self.initialize()
+        self.load()
         
 
     @property
@@ -38,32 +44,54 @@ class Cone(Actor):
         return self._resolution
 
 
-    def generateGeometry(self):
+    def detailCount(self):
+        """Returns the number of levels of detail, halving the resolution down to MinResolution"""
+        count = 1
+        while self._lod and self._resolution >> count >= Cone.MinResolution:
+            count += 1
+        return count
+
+
+    def detailSegments(self, detail):
+        """Returns the number of segments around the base at a level of detail"""
+        return self._resolution >> detail
+
+
+    def placeholderBounds(self):
+        """Returns the box enclosing the cone while it is built"""
+        if self._placeholderBounds is not None:
+            return super(Cone, self).placeholderBounds()
+        half = np.array([self._radius, self._height * 0.5, self._radius])
+        return (-half, half)
+
+
+    @classmethod
+    def buildGeometry(cls, resolution, radius, height):
         """Generate geometry"""
         
         ## circle coordinates in x-z plane
-        h2 = self._height * 0.5
-        angle = np.linspace(0.0, 2.0*math.pi, self._resolution, endpoint=False)
+        h2 = height * 0.5
+        angle = np.linspace(0.0, 2.0*math.pi, resolution, endpoint=False)
         angle = np.append(angle, [0.0])
 
         ## scaling factors for vertex normals
-        cosn = (self._height / np.sqrt( self._height * self._height + self._radius * self._radius ))
-        sinn = (self._radius / np.sqrt( self._height * self._height + self._radius * self._radius ))
+        cosn = (height / np.sqrt( height * height + radius * radius ))
+        sinn = (radius / np.sqrt( height * height + radius * radius ))
 
-        x = np.cos(angle) * self._radius
-        y = np.zeros(self._resolution+1)
-        z = np.sin(angle) * self._radius
+        x = np.cos(angle) * radius
+        y = np.zeros(resolution+1)
+        z = np.sin(angle) * radius
 
         ## normals
         nx = np.cos(angle) * cosn
-        ny = sinn * np.ones(self._resolution+1)
+        ny = sinn * np.ones(resolution+1)
         nz = np.sin(angle) * cosn
         
         #t = 1.0
-        #delta = 1.0 / self._resolution
+        #delta = 1.0 / resolution
         vertices, normals = [], []
         #texcoords = []
-        for i in list(range(self._resolution)):
+        for i in list(range(resolution)):
 
             vertices.append([0.0, h2, 0.0])
             normals.append([(nx[i]+nx[i+1])*0.5, (ny[i]+ny[i+1])*0.5, (nz[i]+nz[i+1])*0.5])
@@ -82,19 +110,33 @@ class Cone(Actor):
         vertices_side = np.array(vertices, dtype=np.float32)
         normals_side = np.array(normals, dtype=np.float32)
         #textcoords_side = np.array(normals, dtype=np.float32)
-        self._num_vertices_side = len(vertices_side)
 
         ##  bottom cap
         vertices, normals = [[0.0, -h2, 0.0]], [[0.0, -1.0, 0.0]]
-        for i in list(reversed(range(self._resolution+1))):
+        for i in list(reversed(range(resolution+1))):
             vertices.append([x[i], -h2, z[i]])
             normals.append([0.0, -1.0, 0.0])
         vertices_bot = np.array(vertices, dtype=np.float32)
         normals_bot = np.array(normals, dtype=np.float32)
-        self._num_vertices_bot = len(vertices_bot)
 
-        self._vertices = np.concatenate((vertices_side, vertices_bot))
-        self._normals = np.concatenate((normals_side, normals_bot))
+        ## the fan becomes triangles so that the cone is one indexed draw, welded and ordered for the vertex cache
+        indices = np.concatenate((np.arange(len(vertices_side)).reshape(-1, 3), MeshOptimizer.fan(len(vertices_side), len(vertices_bot))))
+        return MeshOptimizer.reorder(MeshOptimizer.weld({
+            'vertices': np.concatenate((vertices_side, vertices_bot)),
+            'normals': np.concatenate((normals_side, normals_bot)),
+            'indices': indices
+        }))
+
+
+    def generateGeometry(self, detail=0):
+        """Fetch geometry of a level of detail from the shared cache"""
+        resolution = self._resolution >> detail
+        geometry = GeometryCache().fetch((type(self), resolution, self._radius, self._height),
+            lambda: self.buildGeometry(resolution, self._radius, self._height))
+
+        self._vertices = geometry['vertices']
+        self._normals = geometry['normals']
+        self._indices = geometry['indices']
 
 
     def initialize(self):
@@ -103,12 +145,16 @@ class Cone(Actor):
             self.generateGeometry()
 
         ## create object
-        self.create(self._vertices, normals=self._normals)
+        self.create(self._vertices, normals=self._normals, indices=self._indices)
 
 
     def render(self):
-        """Render cube"""
-        GL.glDrawArrays(GL.GL_TRIANGLES, 0, self._num_vertices_side)
-        GL.glDrawArrays(GL.GL_TRIANGLE_FAN, self._num_vertices_side, self._num_vertices_bot)
+        """Render cone"""
+        GL.glDrawElements(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None)
+
+
+    def renderInstanced(self, instances):
+        """Render cone once per instance"""
+        GL.glDrawElementsInstanced(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None, instances)
 
     
\ No newline at end of file
@@ -3,6 +3,8 @@ from PyQt5.QtGui import QVector3D
 
 from OpenGL import GL
 from Source.Graphics.Actor import Actor
+from Source.Graphics.GeometryCache import GeometryCache
+from Source.Graphics.MeshOptimizer import MeshOptimizer
 
 class Cube(Actor):
 
@@ -14,7 +16,7 @@ class Cube(Actor):
         self._vertices = None
 
         ## create actor
-        self.initialize()
+        self.load()
 
 
     @classmethod
@@ -23,9 +25,10 @@ class Cube(Actor):
         return True
 
 
-    def generateGeometry(self):
+    @classmethod
+    def buildGeometry(cls):
         """Generate geometry"""
-        self._vertices = np.array([
+        vertices = np.array([
             -0.5, -0.5, -0.5,  
             0.5, -0.5, -0.5, 
             0.5,  0.5, -0.5,  
@@ -68,7 +71,7 @@ class Cube(Actor):
             -0.5,  0.5,  0.5,  
             -0.5,  0.5, -0.5], dtype=np.float32)
 
-        self._normals = np.array([
+        normals = np.array([
             0.0,  0.0, -1.0,
             0.0,  0.0, -1.0,
             0.0,  0.0, -1.0,
@@ -111,6 +114,18 @@ class Cube(Actor):
             0.0,  1.0,  0.0,
             0.0,  1.0,  0.0], dtype=np.float32)
 
+        ## the corners of each face are shared by its two triangles
+        return MeshOptimizer.reorder(MeshOptimizer.weld({'vertices': vertices, 'normals': normals, 'indices': np.arange(36).reshape(-1, 3)}))
+
+
+    def generateGeometry(self):
+        """Fetch geometry from the shared cache"""
+        geometry = GeometryCache().fetch((type(self),), self.buildGeometry)
+
+        self._vertices = geometry['vertices']
+        self._normals = geometry['normals']
+        self._indices = geometry['indices']
+
 
     def initialize(self):
         """Creates cube's geometry"""
@@ -118,11 +133,16 @@ class Cube(Actor):
             self.generateGeometry()
 
         ## create object
-        self.create(self._vertices, normals=self._normals)
+        self.create(self._vertices, normals=self._normals, indices=self._indices)
 
 
     def render(self):
         """Render cube"""
-        GL.glDrawArrays(self._render_mode, 0, len(self._vertices))
+        GL.glDrawElements(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None)
+
+
+    def renderInstanced(self, instances):
+        """Render cube once per instance"""
+        GL.glDrawElementsInstanced(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None, instances)
 
     
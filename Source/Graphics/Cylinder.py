@@ -2,9 +2,15 @@ import math
 import numpy as np
 from OpenGL import GL
 from Source.Graphics.Actor import Actor
+from Source.Graphics.GeometryCache import GeometryCache
+from Source.Graphics.MeshOptimizer import MeshOptimizer
 
 class Cylinder(Actor):
 
+    ## coarsest resolution levels of detail go down to
+    MinResolution = 6
+
+
     ## initialization
     def __init__(self, renderer,  **kwargs):
         """Initialize actor."""
@@ -17,7 +23,7 @@ class Cylinder(Actor):
         self._vertices = None
 
         ## create actor
-        self.initialize()
+        self.load()
         
 
     @property
@@ -31,22 +37,44 @@ class Cylinder(Actor):
         return self._height
 
     
-    def generateGeometry(self):
-        """Creates cone geometry"""
+    def detailCount(self):
+        """Returns the number of levels of detail, halving the resolution down to MinResolution"""
+        count = 1
+        while self._lod and self._resolution >> count >= Cylinder.MinResolution:
+            count += 1
+        return count
+
+
+    def detailSegments(self, detail):
+        """Returns the number of segments around the base at a level of detail"""
+        return self._resolution >> detail
+
+
+    def placeholderBounds(self):
+        """Returns the box enclosing the cylinder while it is built"""
+        if self._placeholderBounds is not None:
+            return super(Cylinder, self).placeholderBounds()
+        half = np.array([self._radius, self._height * 0.5, self._radius])
+        return (-half, half)
+
+
+    @classmethod
+    def buildGeometry(cls, resolution, radius, height):
+        """Creates cylinder geometry"""
 
         ## circle coordinates in x-z plane
-        h2 = self._height * 0.5
-        angle = np.linspace(0.0, 2.0*math.pi, self._resolution, endpoint=False)
+        h2 = height * 0.5
+        angle = np.linspace(0.0, 2.0*math.pi, resolution, endpoint=False)
         angle = np.append(angle, [0.0])
 
         ## circle in x-z plane
-        x = -np.sin(angle) * self._radius
-        y = np.zeros(self._resolution+1)
-        z = -np.cos(angle) * self._radius
+        x = -np.sin(angle) * radius
+        y = np.zeros(resolution+1)
+        z = -np.cos(angle) * radius
 
         ## normal vectors
         nx = -np.sin(angle)
-        ny = np.zeros(self._resolution+1)
+        ny = np.zeros(resolution+1)
         nz = -np.cos(angle)
 
         ## top and bottom circles
@@ -55,16 +83,15 @@ class Cylinder(Actor):
     
         ## top cap
         vertices, normals = [[0.0, h2, 0.0]], [[0.0, 1.0, 0.0]]
-        for i in list(range(self._resolution+1)):
+        for i in list(range(resolution+1)):
             vertices.append([x[i], h2, z[i]])
             normals.append([0.0, 1.0, 0.0])
         vertices_top = np.array(vertices, dtype=np.float32)
         normals_top = np.array(normals, dtype=np.float32)
-        self._num_vertices_top = len(vertices_top)
 
         ## side
         vertices, normals = [], []
-        for i in list(range(self._resolution)):
+        for i in list(range(resolution)):
             vertices.append([x[i], h2, z[i]])
             normals.append([nx[i], ny[i], nz[i]])
 
@@ -85,19 +112,35 @@ class Cylinder(Actor):
 
         vertices_side = np.array(vertices, dtype=np.float32)
         normals_side = np.array(normals, dtype=np.float32)
-        self._num_vertices_side = len(vertices_side)
 
         ##  bottom cap
         vertices, normals = [[0.0, -h2, 0.0]], [[0.0, -1.0, 0.0]]
-        for i in list(reversed(range(self._resolution+1))):
+        for i in list(reversed(range(resolution+1))):
             vertices.append([x[i], -h2, z[i]])
             normals.append([0.0, -1.0, 0.0])
         vertices_bot = np.array(vertices, dtype=np.float32)
         normals_bot = np.array(normals, dtype=np.float32)
-        self._num_vertices_bot = len(vertices_bot)
 
-        self._vertices = np.concatenate((vertices_top, vertices_side, vertices_bot))
-        self._normals = np.concatenate((normals_top, normals_side, normals_bot))
+        ## the fans become triangles so that the cylinder is one indexed draw, welded and ordered for the vertex cache
+        indices = np.concatenate((MeshOptimizer.fan(0, len(vertices_top)),
+            len(vertices_top) + np.arange(len(vertices_side)).reshape(-1, 3),
+            MeshOptimizer.fan(len(vertices_top) + len(vertices_side), len(vertices_bot))))
+        return MeshOptimizer.reorder(MeshOptimizer.weld({
+            'vertices': np.concatenate((vertices_top, vertices_side, vertices_bot)),
+            'normals': np.concatenate((normals_top, normals_side, normals_bot)),
+            'indices': indices
+        }))
+
+
+    def generateGeometry(self, detail=0):
+        """Fetch geometry of a level of detail from the shared cache"""
+        resolution = self._resolution >> detail
+        geometry = GeometryCache().fetch((type(self), resolution, self._radius, self._height),
+            lambda: self.buildGeometry(resolution, self._radius, self._height))
+
+        self._vertices = geometry['vertices']
+        self._normals = geometry['normals']
+        self._indices = geometry['indices']
 
 
     def initialize(self):
@@ -106,13 +149,16 @@ class Cylinder(Actor):
             self.generateGeometry()
 
         ## create object
-        self.create(self._vertices, normals=self._normals)
+        self.create(self._vertices, normals=self._normals, indices=self._indices)
 
        
     def render(self):
-        """Render cube"""
-        GL.glDrawArrays(GL.GL_TRIANGLE_FAN, 0, self._num_vertices_top)
-        GL.glDrawArrays(GL.GL_TRIANGLES, self._num_vertices_top, self._num_vertices_side)
-        GL.glDrawArrays(GL.GL_TRIANGLE_FAN, self._num_vertices_top + self._num_vertices_side, self._num_vertices_bot)
+        """Render cylinder"""
+        GL.glDrawElements(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None)
+
+
+    def renderInstanced(self, instances):
+        """Render cylinder once per instance"""
+        GL.glDrawElementsInstanced(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None, instances)
 
     
\ No newline at end of file
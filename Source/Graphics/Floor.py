@@ -5,6 +5,7 @@ from PyQt5.QtGui import QVector3D, QMatrix4x4, QOpenGLShader, QOpenGLShaderProgr
 from OpenGL import GL
 from Source.Graphics.Actor import Actor
 from Source.Graphics.Material import Material
+from Source.Graphics.GeometryCache import GeometryCache
 
 class Floor(Actor):
 
@@ -36,28 +37,39 @@ class Floor(Actor):
         return self._resolution
 
 
-    def generateGeometry(self):
+    @classmethod
+    def buildGeometry(cls, length, resolution):
         """Creates floor grid geometry"""
-        resx, resy = self._resolution, self._resolution
+        resx, resy = resolution, resolution
 
         ## create grid coordinates
-        xsteps = np.linspace(-self._length, self._length, resx)
-        ysteps = np.linspace(-self._length, self._length, resy)
+        xsteps = np.linspace(-length, length, resx)
+        ysteps = np.linspace(-length, length, resy)
         x, y, z = np.meshgrid(xsteps, 0.0, ysteps)
         vertical = np.vstack((x, y, z)).reshape(3, -1).T.astype(np.float32)
         horizontal = np.vstack((z, y, x)).reshape(3, -1).T.astype(np.float32)
 
-        ## create vertices array from grid coordinates
-        self._vertices = np.concatenate((vertical, horizontal)).flatten()
-
         ## create supporting arrays for rendering
         ystart = list(range(0, resx*resy, resy))
         xstart = list(range(ystart[-1]+resy, ystart[-1]+resy+resx*resy, resx))
         ylen = [resy] * resx
         xlen = [resx] * resy
 
-        self._start = ystart + xstart
-        self._lengths = ylen + xlen
+        return {
+            'vertices': np.concatenate((vertical, horizontal)).flatten(),
+            'start': np.array(ystart + xstart, dtype=np.dtype(np.int32)),
+            'lengths': np.array(ylen + xlen, dtype=np.dtype(np.int32))
+        }
+
+
+    def generateGeometry(self):
+        """Fetch geometry from the shared cache"""
+        geometry = GeometryCache().fetch((type(self), self._length, self._resolution),
+            lambda: self.buildGeometry(self._length, self._resolution))
+
+        self._vertices = geometry['vertices']
+        self._start = geometry['start']
+        self._lengths = geometry['lengths']
 
 
     def initialize(self):
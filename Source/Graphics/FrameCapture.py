@@ -0,0 +1,216 @@
+import os
+import queue
+import ctypes
+import threading
+import numpy as np
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtGui import QImage
+
+from OpenGL import GL
+
+##  Records rendered frames through a ring of pixel buffer objects, written to disk by a worker thread.
+class FrameCapture(QObject):
+
+    ## formats frames can be written in
+    class Format:
+        PNG = "png"     ## one image per frame
+        Raw = "raw"     ## all frames in one file of RGBA bytes, top row first
+        Formats = [PNG, Raw]
+
+
+    ## initialization
+    def __init__(self, directory, format=Format.PNG, **kwargs):
+        """Initialize capture into directory with a ring of size buffers."""
+        super(FrameCapture, self).__init__()
+
+        if format not in FrameCapture.Format.Formats:
+            raise ValueError("Unknown frame capture format {}".format(format))
+
+        self._directory = directory
+        self._format = format
+        self._size = kwargs.get("size", 3)
+        self._width = 0
+        self._height = 0
+        self._buffers = None
+        self._fences = None
+        self._frames = None
+        self._next = 0
+        self._resolve = None
+        self._renderbuffer = None
+        self._frameNumber = 0
+        self._stalls = 0
+        self._dropped = 0
+
+        ## frames waiting to be written, frames read back while it is full are dropped rather than waited for
+        self._queue = queue.Queue(maxsize=kwargs.get("backlog", 16))
+        self._written = 0
+        self._error = None
+        self._worker = threading.Thread(target=self.write, name="FrameCapture", daemon=True)
+        self._worker.start()
+
+
+    @property
+    def directory(self):
+        return self._directory
+
+
+    @property
+    def format(self):
+        return self._format
+
+
+    def statistics(self):
+        """Returns counters of captured, written, stalled and dropped frames"""
+        return {
+            'captured': self._frameNumber,
+            'written': self._written,
+            'queued': self._queue.qsize(),
+            'stalls': self._stalls,
+            'dropped': self._dropped,
+            'error': self._error
+        }
+
+
+    def create(self, width, height):
+        """Allocate pixel buffers and the framebuffer multisampled frames are resolved into"""
+        self._width = width
+        self._height = height
+        self._buffers = [int(each) for each in np.atleast_1d(GL.glGenBuffers(self._size))]
+        for each in self._buffers:
+            GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, each)
+            GL.glBufferData(GL.GL_PIXEL_PACK_BUFFER, width * height * 4, None, GL.GL_STREAM_READ)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        self._fences = [None] * self._size
+        self._frames = [None] * self._size
+        self._next = 0
+
+        self._renderbuffer = GL.glGenRenderbuffers(1)
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, self._renderbuffer)
+        GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_RGBA8, width, height)
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+        self._resolve = GL.glGenFramebuffers(1)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._resolve)
+        GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_RENDERBUFFER, self._renderbuffer)
+
+
+    def isCreated(self):
+        return self._buffers is not None
+
+
+    def release(self):
+        """Free GL objects, frames still in flight are read back first"""
+        if not self.isCreated():
+            return
+        self.drain()
+        GL.glDeleteBuffers(self._size, self._buffers)
+        GL.glDeleteFramebuffers(1, [self._resolve])
+        GL.glDeleteRenderbuffers(1, [self._renderbuffer])
+        self._buffers = self._fences = self._frames = None
+        self._resolve = self._renderbuffer = None
+
+
+    def capture(self, framebuffer, width, height):
+        """Start reading back the frame just rendered into framebuffer, finished frames are handed to the worker"""
+        if self.isCreated() and (width, height) != (self._width, self._height):
+            self.release()
+        if not self.isCreated():
+            self.create(width, height)
+
+        ## the slot about to be reused must have been read back, this waits only if the GPU is a whole ring behind
+        self.collect()
+        if self._fences[self._next] is not None:
+            self._stalls += 1
+            self.map(self._next, wait=True)
+
+        ## resolve samples, then copy into the pixel buffer without waiting for the GPU
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, framebuffer)
+        GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, self._resolve)
+        GL.glBlitFramebuffer(0, 0, width, height, 0, 0, width, height, GL.GL_COLOR_BUFFER_BIT, GL.GL_NEAREST)
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self._resolve)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self._buffers[self._next])
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        GL.glReadPixels(0, 0, width, height, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, framebuffer)
+
+        self._fences[self._next] = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self._frames[self._next] = self._frameNumber
+        self._frameNumber += 1
+        self._next = (self._next + 1) % self._size
+
+
+    def collect(self):
+        """Hand over frames whose copies have finished, oldest first"""
+        for offset in range(self._size):
+            slot = (self._next + offset) % self._size
+            if self._fences[slot] is not None and not self.map(slot, wait=False):
+                break
+
+
+    def drain(self):
+        """Wait for every frame in flight and hand it over"""
+        for offset in range(self._size):
+            slot = (self._next + offset) % self._size
+            if self._fences[slot] is not None:
+                self.map(slot, wait=True)
+
+
+    def map(self, slot, wait):
+        """Copy a finished pixel buffer out and queue it for writing, returns False if not finished"""
+        timeout = GL.GL_TIMEOUT_IGNORED if wait else 0
+        status = GL.glClientWaitSync(self._fences[slot], GL.GL_SYNC_FLUSH_COMMANDS_BIT, timeout)
+        if status not in (GL.GL_ALREADY_SIGNALED, GL.GL_CONDITION_SATISFIED):
+            return False
+        GL.glDeleteSync(self._fences[slot])
+        self._fences[slot] = None
+
+        count = self._width * self._height * 4
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self._buffers[slot])
+        address = GL.glMapBufferRange(GL.GL_PIXEL_PACK_BUFFER, 0, count, GL.GL_MAP_READ_BIT)
+        pixels = np.frombuffer((ctypes.c_ubyte * count).from_address(address), dtype=np.uint8).copy()
+        GL.glUnmapBuffer(GL.GL_PIXEL_PACK_BUFFER)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+
+        ## the render thread never waits for the writer
+        try:
+            self._queue.put_nowait((self._frames[slot], pixels.reshape(self._height, self._width, 4)))
+        except queue.Full:
+            self._dropped += 1
+        return True
+
+
+    def write(self):
+        """Worker loop writing queued frames until told to stop"""
+        stream = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            number, pixels = item
+
+            ## rows were read bottom up
+            pixels = np.ascontiguousarray(pixels[::-1])
+            try:
+                if self._format == FrameCapture.Format.Raw:
+                    if stream is None:
+                        stream = open(os.path.join(self._directory, "capture.rgba"), "wb")
+                    stream.write(pixels.tobytes())
+                else:
+                    height, width = pixels.shape[:2]
+                    image = QImage(pixels.data, width, height, 4 * width, QImage.Format_RGBA8888)
+                    if not image.save(os.path.join(self._directory, "frame_{:05d}.png".format(number))):
+                        raise IOError("Unable to write frame {}".format(number))
+                self._written += 1
+            except (IOError, OSError) as error:
+                self._error = str(error)
+
+        if stream is not None:
+            stream.close()
+
+
+    def finish(self):
+        """Read back frames in flight, free GL objects and wait until all frames are written"""
+        self.release()
+        self._queue.put(None)
+        self._worker.join()
@@ -0,0 +1,36 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+##  View volume of a camera, used to skip actors that cannot be seen.
+class Frustum(QObject):
+
+    ## initialization
+    def __init__(self, matrix):
+        """Initialize from a combined projection and view matrix."""
+        super(Frustum, self).__init__()
+
+        ## planes are sums and differences of the rows, pointing inwards
+        rows = np.array(matrix.data(), dtype=np.float64).reshape(4, 4).T
+        planes = np.array([
+            rows[3] + rows[0], rows[3] - rows[0],   ## left, right
+            rows[3] + rows[1], rows[3] - rows[1],   ## bottom, top
+            rows[3] + rows[2], rows[3] - rows[2]])  ## near, far
+        self._planes = planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+
+    @property
+    def planes(self):
+        """Returns the six planes as rows (a, b, c, d), inside where ax + by + cz + d >= 0"""
+        return self._planes
+
+
+    def intersects(self, centers, extents):
+        """Returns which of the boxes given by centers and half extents overlap the frustum"""
+        centers = np.array(centers, dtype=np.float64, ndmin=2)
+        extents = np.array(extents, dtype=np.float64, ndmin=2)
+
+        ## a box is outside once it is entirely behind one of the planes
+        distances = centers.dot(self._planes[:, :3].T) + self._planes[:, 3]
+        radii = extents.dot(np.abs(self._planes[:, :3]).T)
+        return np.all(distances + radii >= 0.0, axis=1)
@@ -0,0 +1,105 @@
+import threading
+import numpy as np
+
+from collections import OrderedDict
+from PyQt5.QtCore import QObject
+
+## singleton cache of tessellated geometry shared by all primitive actors
+class GeometryCache(QObject):
+
+    __instance = None
+
+    def __new__(cls):
+        if GeometryCache.__instance is None:
+            GeometryCache.__instance = QObject.__new__(cls)
+            GeometryCache.__instance.initialize()
+        return GeometryCache.__instance
+
+
+    def initialize(self, budget=64 * 1024 * 1024):
+        """Create empty cache"""
+        self.__instance._entries = OrderedDict()
+        self.__instance._budget = budget
+        self.__instance._bytes = 0
+        self.__instance._hits = 0
+        self.__instance._misses = 0
+        self.__instance._evictions = 0
+
+        ## geometry is also built by background loaders
+        self.__instance._lock = threading.Lock()
+
+
+    @classmethod
+    def sizeOf(cls, geometry):
+        """Returns the number of bytes held by the arrays of a geometry"""
+        return sum(each.nbytes for each in geometry.values() if isinstance(each, np.ndarray))
+
+
+    def budget(self):
+        """Returns the maximum number of bytes kept in the cache"""
+        return self._budget
+
+
+    def setBudget(self, budget):
+        """Sets the maximum number of bytes kept in the cache"""
+        with self._lock:
+            self._budget = budget
+            self.evict()
+
+
+    def size(self):
+        """Returns the number of bytes currently kept in the cache"""
+        return self._bytes
+
+
+    def fetch(self, key, generator):
+        """Returns the geometry stored under key, calling generator to build it if missing"""
+        with self._lock:
+            geometry = self._entries.get(key, None)
+            if geometry is not None:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return geometry
+            self._misses += 1
+
+        ## not in cache, build it outside the lock and hand out read-only arrays
+        geometry = dict(generator())
+        for each in geometry.values():
+            if isinstance(each, np.ndarray):
+                each.flags.writeable = False
+
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            self._entries[key] = geometry
+            self._bytes += self.sizeOf(geometry)
+            self.evict()
+
+        return geometry
+
+
+    def evict(self):
+        """Drop least recently used geometry until the cache fits its budget"""
+        while self._bytes > self._budget and len(self._entries) > 0:
+            key, geometry = self._entries.popitem(last=False)
+            self._bytes -= self.sizeOf(geometry)
+            self._evictions += 1
+
+
+    def clear(self):
+        """Drop all cached geometry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+    def statistics(self):
+        """Returns hit, miss and eviction counters"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'budget': self._budget,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions
+        }
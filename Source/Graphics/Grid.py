@@ -5,6 +5,7 @@ from PyQt5.QtGui import QVector3D, QMatrix4x4, QOpenGLShader, QOpenGLShaderProgr
 from OpenGL import GL
 from Source.Graphics.Actor import Actor
 from Source.Graphics.Material import Material
+from Source.Graphics.GeometryCache import GeometryCache
 
 class Grid(Actor):
 
@@ -32,37 +33,52 @@ class Grid(Actor):
         self.initialize()
 
 
-    def generateGeometry(self):
+    @classmethod
+    def buildGeometry(cls, lengthRows, lengthCols, rows, cols):
         """Generate vertices"""
-        starty = -self._lengthRows / 2.0
-        endy = self._lengthRows / 2.0
+        starty = -lengthRows / 2.0
+        endy = lengthRows / 2.0
 
-        startx = -self._lengthCols / 2.0
-        endx = self._lengthCols / 2.0
+        startx = -lengthCols / 2.0
+        endx = lengthCols / 2.0
         
-        self._resx = resx = self._cols + 1
-        self._resy = resy = self._rows + 1
+        resx = cols + 1
+        resy = rows + 1
 
         ## create grid coordinates
-        xsteps = np.linspace(startx, endx, self._resx)
-        ysteps = np.linspace(starty, endy, self._resy)
+        xsteps = np.linspace(startx, endx, resx)
+        ysteps = np.linspace(starty, endy, resy)
         
         x, y, z = np.meshgrid(xsteps, 0.0, ysteps)
         
         vertical = np.vstack((x, y, z)).reshape(3, -1).T.astype(np.float32)
         horizontal = np.vstack((x, y, z)).T.astype(np.float32)
 
-        ## create vertices array from grid coordinates
-        self._vertices = np.concatenate((vertical.flatten(), horizontal.flatten()))
-
         ## create supporting arrays for rendering
         ystart = list(range(0, resx*resy, resy))
         xstart = list(range(ystart[-1]+resy, ystart[-1]+resy+resx*resy, resx))
         ylen = [resy] * resx
         xlen = [resx] * resy
 
-        self._start = np.array(ystart + xstart, dtype=np.dtype(np.uint32))
-        self._lengths = np.array(ylen + xlen, dtype=np.dtype(np.uint32))
+        return {
+            'vertices': np.concatenate((vertical.flatten(), horizontal.flatten())),
+            'start': np.array(ystart + xstart, dtype=np.dtype(np.uint32)),
+            'lengths': np.array(ylen + xlen, dtype=np.dtype(np.uint32)),
+            'resx': resx,
+            'resy': resy
+        }
+
+
+    def generateGeometry(self):
+        """Fetch geometry from the shared cache"""
+        geometry = GeometryCache().fetch((type(self), self._lengthRows, self._lengthCols, self._rows, self._cols),
+            lambda: self.buildGeometry(self._lengthRows, self._lengthCols, self._rows, self._cols))
+
+        self._vertices = geometry['vertices']
+        self._start = geometry['start']
+        self._lengths = geometry['lengths']
+        self._resx = geometry['resx']
+        self._resy = geometry['resy']
 
 
     def initialize(self):
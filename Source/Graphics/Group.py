@@ -1,3 +1,5 @@
+import numpy as np
+
 from collections import OrderedDict
 from PyQt5.QtCore import QObject
 
@@ -108,3 +110,30 @@ class Group(QObject):
         """Add a part to the group"""
         self._parts[part.name] = part
 
+        ## parts are picked individually
+        if self._scene is not None:
+            self._scene.insertBounds(self)
+
+
+    def localBounds(self):
+        """Returns (lower, upper) corners enclosing all parts, None if any part's bounds are unknown"""
+        bounds = [each.worldBounds() for each in self.parts]
+        if len(bounds) == 0 or any(each is None for each in bounds):
+            return None
+        centers, extents = np.array([each[0] for each in bounds]), np.array([each[1] for each in bounds])
+        return ((centers - extents).min(axis=0), (centers + extents).max(axis=0))
+
+
+    def worldBounds(self):
+        """Returns center and half extents of the box enclosing all parts, groups have no transform of their own"""
+        bounds = self.localBounds()
+        if bounds is None:
+            return None
+        lower, upper = bounds
+        return ((lower + upper) / 2.0, (upper - lower) / 2.0)
+
+
+    def destroy(self):
+        """Free GPU resources of all parts"""
+        for each in self.parts:
+            each.destroy()
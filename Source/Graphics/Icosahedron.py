@@ -2,6 +2,8 @@ import math
 import numpy as np
 from OpenGL import GL
 from Source.Graphics.Actor import Actor
+from Source.Graphics.GeometryCache import GeometryCache
+from Source.Graphics.MeshOptimizer import MeshOptimizer
 
 class Icosahedron(Actor):
 
@@ -29,17 +31,36 @@ class Icosahedron(Actor):
         self._vertices = None
 
         ## create actor
-        self.initialize()
+        self.load()
 
 
-    def addVertex(self, v, vertices):
+    def detailCount(self):
+        """Returns the number of levels of detail, one per subdivision level down to the icosahedron"""
+        return self._level + 1 if self._lod else 1
+
+
+    def detailSegments(self, detail):
+        """Returns the number of edges around the equator at a level of detail"""
+        return 5 * 2 ** (self._level - detail + 1)
+
+
+    def placeholderBounds(self):
+        """Returns the box enclosing the sphere while it is built"""
+        if self._placeholderBounds is not None:
+            return super(Icosahedron, self).placeholderBounds()
+        return (np.full(3, -self._radius), np.full(3, self._radius))
+
+
+    @classmethod
+    def addVertex(cls, v, vertices, radius=1.0):
         """Add a vertex into the array"""
-        vn = v / np.linalg.norm(v) * self._radius
+        vn = v / np.linalg.norm(v) * radius
         vertices += [[vn[0], vn[1], vn[2]]]
         return len(vertices)-1
 
 
-    def getMiddlePoint(self, p1, p2, vertices, indexCache):
+    @classmethod
+    def getMiddlePoint(cls, p1, p2, vertices, indexCache, radius=1.0):
         """Returns index of point in the middle of p1 and p2"""
 
         ## first check if we have it already
@@ -60,7 +81,7 @@ class Icosahedron(Actor):
         middle = ((point1[0] + point2[0]) / 2.0, (point1[1] + point2[1]) / 2.0, (point1[2] + point2[2]) / 2.0)
 
         ## add vertex makes sure point is on unit sphere
-        index = self.addVertex(np.array(middle), vertices)
+        index = cls.addVertex(np.array(middle), vertices, radius)
 
         ## store it, return index
         indexCache[key] = index
@@ -68,69 +89,56 @@ class Icosahedron(Actor):
         return index
 
 
-    def generateGeometry(self):
-        """Generate vertices"""
+    @classmethod
+    def baseVertices(cls):
+        """Returns the 12 (unnormalized) corners of the icosahedron"""
+        t = (1.0 + math.sqrt(5.0)) / 2.0
+
+        return [
+            (-1.0,  t,  0), ( 1.0,  t,  0), (-1.0, -t,  0), ( 1.0, -t,  0),
+            ( 0, -1.0,  t), ( 0,  1.0,  t), ( 0, -1.0, -t), ( 0,  1.0, -t),
+            ( t,  0, -1.0), ( t,  0,  1.0), (-t,  0, -1.0), (-t,  0,  1.0)]
+
+
+    @classmethod
+    def baseFaces(cls):
+        """Returns the faces of the icosahedron"""
+        return [
+            ## 5 faces around point 0
+            [0, 11, 5], [0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+
+            ## 5 adjacent faces 
+            [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+
+            ## 5 faces around point 3
+            [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+
+            ## 5 adjacent faces 
+            [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]]
+
+
+    @classmethod
+    def tessellateLoop(cls, level, radius=1.0):
+        """Subdivide the icosahedron one edge at a time (reference implementation)"""
         vertices = []
-        indices = []
         middlePointIndexCache = dict()
 
-        t = (1.0 + math.sqrt(5.0)) / 2.0
+        for each in cls.baseVertices():
+            cls.addVertex(np.array(each), vertices, radius)
 
-        self.addVertex(np.array((-1.0,  t,  0)), vertices)
-        self.addVertex(np.array(( 1.0,  t,  0)), vertices)
-        self.addVertex(np.array((-1.0, -t,  0)), vertices)
-        self.addVertex(np.array(( 1.0, -t,  0)), vertices)
-
-        self.addVertex(np.array(( 0, -1.0,  t)), vertices)
-        self.addVertex(np.array(( 0,  1.0,  t)), vertices)
-        self.addVertex(np.array(( 0, -1.0, -t)), vertices)
-        self.addVertex(np.array(( 0,  1.0, -t)), vertices)
-
-        self.addVertex(np.array(( t,  0, -1.0)), vertices)
-        self.addVertex(np.array(( t,  0,  1.0)), vertices)
-        self.addVertex(np.array((-t,  0, -1.0)), vertices)
-        self.addVertex(np.array((-t,  0,  1.0)), vertices)
-
-        ## 5 faces around point 0
-        indices += [[0, 11, 5]]
-        indices += [[0, 11, 5]]
-        indices += [[0, 5, 1]]
-        indices += [[0, 1, 7]]
-        indices += [[0, 7, 10]]
-        indices += [[0, 10, 11]]
-
-        ## 5 adjacent faces 
-        indices += [[1, 5, 9]]
-        indices += [[5, 11, 4]]
-        indices += [[11, 10, 2]]
-        indices += [[10, 7, 6]]
-        indices += [[7, 1, 8]]
-
-        ## 5 faces around point 3
-        indices += [[3, 9, 4]]
-        indices += [[3, 4, 2]]
-        indices += [[3, 2, 6]]
-        indices += [[3, 6, 8]]
-        indices += [[3, 8, 9]]
-
-        ## 5 adjacent faces 
-        indices += [[4, 9, 5]]
-        indices += [[2, 4, 11]]
-        indices += [[6, 2, 10]]
-        indices += [[8, 6, 7]]
-        indices += [[9, 8, 1]]
+        indices = cls.baseFaces()
 
         ## subdivide triangles
-        for i in range(self._level):
+        for i in range(level):
 
             new_indices = []
 
             for tri in indices:
 
                 ## replace triangle by 4 triangles
-                a = self.getMiddlePoint(tri[0], tri[1], vertices, middlePointIndexCache)
-                b = self.getMiddlePoint(tri[1], tri[2], vertices, middlePointIndexCache)
-                c = self.getMiddlePoint(tri[2], tri[0], vertices, middlePointIndexCache)
+                a = cls.getMiddlePoint(tri[0], tri[1], vertices, middlePointIndexCache, radius)
+                b = cls.getMiddlePoint(tri[1], tri[2], vertices, middlePointIndexCache, radius)
+                c = cls.getMiddlePoint(tri[2], tri[0], vertices, middlePointIndexCache, radius)
 
                 new_indices += [[tri[0], a, c]]
                 new_indices += [[tri[1], b, a]]
@@ -139,11 +147,84 @@ class Icosahedron(Actor):
 
             indices = new_indices
 
-        self._vertices = np.array(vertices, dtype=np.float32)
+        return np.array(vertices, dtype=np.float64), np.array(indices, dtype=np.uint32)
+
+
+    @classmethod
+    def subdivide(cls, vertices, indices, radius=1.0):
+        """Replace every triangle by 4 triangles using batched array operations"""
+
+        ## edges in the order they are visited: (t0, t1), (t1, t2), (t2, t0)
+        edges = np.stack((indices, np.roll(indices, -1, axis=1)), axis=2).reshape(-1, 2)
+        smaller = edges.min(axis=1).astype(np.uint64)
+        greater = edges.max(axis=1).astype(np.uint64)
+        keys = (smaller << np.uint64(32)) | greater
+
+        ## number new vertices by the first time their edge shows up
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        middle = (len(vertices) + rank[inverse.reshape(-1)]).reshape(-1, 3)
+
+        ## all midpoints pushed onto the sphere at once
+        first = first[order]
+        points = (vertices[edges[first, 0]] + vertices[edges[first, 1]]) / 2.0
+        points = points / np.linalg.norm(points, axis=1)[:, np.newaxis] * radius
+
+        ## replace triangle by 4 triangles
+        a, b, c = middle[:, 0], middle[:, 1], middle[:, 2]
+        new_indices = np.stack((
+            np.stack((indices[:, 0], a, c), axis=1),
+            np.stack((indices[:, 1], b, a), axis=1),
+            np.stack((indices[:, 2], c, b), axis=1),
+            np.stack((a, b, c), axis=1)), axis=1).reshape(-1, 3)
+
+        return np.concatenate((vertices, points)), new_indices
+
+
+    @classmethod
+    def tessellate(cls, level, radius=1.0):
+        """Returns vertices and triangle indices of the subdivided icosahedron"""
+        vertices = np.array(cls.baseVertices(), dtype=np.float64)
+        vertices = vertices / np.linalg.norm(vertices, axis=1)[:, np.newaxis] * radius
+        indices = np.array(cls.baseFaces(), dtype=np.int64)
+
+        ## subdivide triangles
+        for i in range(level):
+            vertices, indices = cls.subdivide(vertices, indices, radius)
+
+        return vertices, indices.astype(np.uint32)
+
+
+    @classmethod
+    def buildGeometry(cls, level, radius, colors):
+        """Generate vertices"""
+        vertices, indices = cls.tessellate(level, radius)
+
+        geometry = {
+            'vertices': vertices.astype(np.float32),
+            'normals': vertices.astype(np.float32),
+            'indices': indices
+        }
+        if colors:
+            geometry['colors'] = np.abs(geometry['vertices'])
+
+        ## subdivision order leaves neighbors far apart in the index buffer
+        return MeshOptimizer.reorder(geometry)
+
+
+    def generateGeometry(self, detail=0):
+        """Fetch geometry of a level of detail from the shared cache"""
+        level = self._level - detail
+        geometry = GeometryCache().fetch((type(self), level, self._radius, self._rgb_colors),
+            lambda: self.buildGeometry(level, self._radius, self._rgb_colors))
+
+        self._vertices = geometry['vertices']
         if self._rgb_colors:
-            self._colors = np.abs(np.array(vertices, dtype=np.float32))
-        self._normals = np.array(vertices, dtype=np.float32)
-        self._indices = np.array(indices, dtype=np.uint32)
+            self._colors = geometry['colors']
+        self._normals = geometry['normals']
+        self._indices = geometry['indices']
 
 
     def initialize(self):
@@ -161,4 +242,9 @@ class Icosahedron(Actor):
         """Render icosahedron"""
         GL.glDrawElements(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None)
 
+
+    def renderInstanced(self, instances):
+        """Render icosahedron once per instance"""
+        GL.glDrawElementsInstanced(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None, instances)
+
     
\ No newline at end of file
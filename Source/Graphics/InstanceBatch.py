@@ -0,0 +1,121 @@
+import ctypes
+import numpy as np
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtGui import QOpenGLBuffer, QOpenGLVertexArrayObject
+
+from OpenGL import GL
+from Source.Graphics.MeshRegistry import MeshRegistry
+from Source.Graphics.BufferUpload import BufferUpload
+
+##  Vertex array drawing one mesh many times with per-instance attributes.
+class InstanceBatch(QObject):
+
+    ## per-instance attribute layout: (location, number of floats)
+    Attributes = [
+        (4, 4), (5, 4), (6, 4), (7, 4),     ## model matrix columns
+        (8, 3), (9, 3), (10, 3),            ## normal matrix columns
+        (11, 3),                            ## emission
+        (12, 3),                            ## ambient
+        (13, 3),                            ## diffuse
+        (14, 4)]                            ## specular and shininess
+
+    ## number of floats per instance
+    Stride = 38
+
+
+    ## initialization
+    def __init__(self, mesh):
+        """Initialize batch."""
+        super(InstanceBatch, self).__init__()
+
+        self._mesh = mesh
+        self._vao = QOpenGLVertexArrayObject()
+        self._buffer = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self._capacity = 0
+        self._count = 0
+
+        ## keep the mesh alive for as long as this batch exists
+        self._mesh.reference()
+
+
+    @property
+    def mesh(self):
+        """Returns the mesh drawn by this batch"""
+        return self._mesh
+
+
+    @property
+    def count(self):
+        """Returns the number of instances uploaded"""
+        return self._count
+
+
+    def create(self):
+        """Create vertex array combining mesh and instance attributes"""
+        itemsize = np.dtype(np.float32).itemsize
+
+        self._vao.create()
+        self._vao.bind()
+
+        ## per-vertex attributes come from the shared mesh
+        self._mesh.vbo.bind()
+        GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, GL.GL_FALSE, 3 * itemsize, None)
+        GL.glEnableVertexAttribArray(0)
+        if self._mesh.hasNormals:
+            GL.glVertexAttribPointer(1, 3, GL.GL_FLOAT, GL.GL_FALSE, 3 * itemsize, ctypes.c_void_p(self._mesh.offsetNormals))
+            GL.glEnableVertexAttribArray(1)
+        self._mesh.vbo.release(QOpenGLBuffer.VertexBuffer)
+
+        ## per-instance attributes advance once per instance
+        self._buffer.setUsagePattern(QOpenGLBuffer.StreamDraw)
+        self._buffer.create()
+        self._buffer.bind()
+        offset = 0
+        for location, size in InstanceBatch.Attributes:
+            GL.glVertexAttribPointer(location, size, GL.GL_FLOAT, GL.GL_FALSE, InstanceBatch.Stride * itemsize, ctypes.c_void_p(offset))
+            GL.glVertexAttribDivisor(location, 1)
+            GL.glEnableVertexAttribArray(location)
+            offset += size * itemsize
+        self._buffer.release(QOpenGLBuffer.VertexBuffer)
+
+        ## index buffer binding is part of the vao state
+        if self._mesh.hasIndices:
+            self._mesh.ibo.bind()
+
+        self._vao.release()
+
+        if self._mesh.hasIndices:
+            self._mesh.ibo.release(QOpenGLBuffer.IndexBuffer)
+
+
+    def upload(self, instances):
+        """Upload per-instance data, an array with Stride floats per row"""
+        data = BufferUpload().array(instances)
+
+        self._buffer.bind()
+        if data.nbytes > self._capacity:
+            ## grow geometrically so that adding actors does not reallocate every frame
+            self._capacity = max(data.nbytes, 2 * self._capacity)
+            self._buffer.allocate(self._capacity)
+        BufferUpload().write(self._buffer, 0, data)
+        self._buffer.release(QOpenGLBuffer.VertexBuffer)
+
+        self._count = len(instances)
+
+
+    def bind(self):
+        """Bind vertex array"""
+        self._vao.bind()
+
+
+    def release(self):
+        """Release vertex array"""
+        self._vao.release()
+
+
+    def destroy(self):
+        """Free vertex array, instance buffer and our mesh reference"""
+        self._vao.destroy()
+        self._buffer.destroy()
+        MeshRegistry().release(self._mesh)
@@ -1,19 +1,36 @@
+import numpy as np
+
 from PyQt5.QtCore import QObject
 from PyQt5.QtGui import QVector3D
 
+from Source.Graphics.UniformBuffer import UniformBuffer
+
 ##  Base class for material properties.
 class Material(QObject):
 
+    __presets = dict()
+    __revision = 0
+
     ## initialization
     def __init__(self, **kwargs):
         """Initialize material."""
         super(Material, self).__init__()
 
-        self._emissionColor = kwargs.get("emission", QVector3D(0.0, 0.0, 0.0))
-        self._ambientColor = kwargs.get("ambient", QVector3D(0.2, 0.2, 0.2))
-        self._diffuseColor = kwargs.get("diffuse", QVector3D(0.8, 0.8, 0.8))
-        self._specularColor = kwargs.get("specular", QVector3D(0.0, 0.0, 0.0))
-        self._shininess = float(kwargs.get("shininess", 12.0))
+        ## std140 material block, bumping the version whenever it changes
+        self._packed = np.zeros(16, dtype=np.float32)
+        self._version = 0
+        self._preset = False
+
+        self.emissionColor = kwargs.get("emission", QVector3D(0.0, 0.0, 0.0))
+        self.ambientColor = kwargs.get("ambient", QVector3D(0.2, 0.2, 0.2))
+        self.diffuseColor = kwargs.get("diffuse", QVector3D(0.8, 0.8, 0.8))
+        self.specularColor = kwargs.get("specular", QVector3D(0.0, 0.0, 0.0))
+        self.shininess = kwargs.get("shininess", 12.0)
+
+        ## gpu copy of the material block and derived materials
+        self._uniformBuffer = UniformBuffer(self._packed.nbytes)
+        self._variants = dict()
+        self._sourceVersion = None
 
 
     @property
@@ -24,7 +41,10 @@ class Material(QObject):
 
     @emissionColor.setter
     def emissionColor(self, value):
+        self.modify()
         self._emissionColor = value
+        self._packed[0:3] = (value.x(), value.y(), value.z())
+        self.changed()
         
         
     @property
@@ -35,7 +55,10 @@ class Material(QObject):
     
     @ambientColor.setter
     def ambientColor(self, value):
+        self.modify()
         self._ambientColor = value
+        self._packed[4:7] = (value.x(), value.y(), value.z())
+        self.changed()
         
         
     @property
@@ -46,7 +69,10 @@ class Material(QObject):
 
     @diffuseColor.setter
     def diffuseColor(self, value):
+        self.modify()
         self._diffuseColor = value
+        self._packed[8:11] = (value.x(), value.y(), value.z())
+        self.changed()
         
         
     @property
@@ -57,7 +83,10 @@ class Material(QObject):
 
     @specularColor.setter
     def specularColor(self, value):
+        self.modify()
         self._specularColor = value
+        self._packed[12:15] = (value.x(), value.y(), value.z())
+        self.changed()
         
         
     @property
@@ -68,13 +97,101 @@ class Material(QObject):
 
     @shininess.setter
     def shininess(self, value):
+        self.modify()
         self._shininess = float(value)
+        self._packed[15] = self._shininess
+        self.changed()
+
+
+    @property
+    def version(self):
+        """Counter increased on every change of this material"""
+        return self._version
+
+
+    def modify(self):
+        """Raise if this is a preset, changing it would change every actor drawn with it"""
+        if self._preset:
+            raise RuntimeError("Material presets are shared, change a copy() of them instead")
+
+
+    def copy(self):
+        """Returns a material of its own with the properties of this one"""
+        return Material(emission=QVector3D(self._emissionColor), ambient=QVector3D(self._ambientColor),
+            diffuse=QVector3D(self._diffuseColor), specular=QVector3D(self._specularColor), shininess=self._shininess)
+
+
+    def changed(self):
+        """Bump the version of this material and the revision shared by all materials"""
+        self._version += 1
+        Material.__revision += 1
+
+
+    @classmethod
+    def revision(cls):
+        """Returns a counter increased on every change of any material"""
+        return Material.__revision
+
+
+    def isPreset(self):
+        """Returns whether this is a shared preset material"""
+        return self._preset
     
 
+    def packed(self):
+        """Returns this material laid out as the std140 material block, do not modify it"""
+        return self._packed
+
+
+    def bind(self):
+        """Upload this material if it changed and attach it to the material block"""
+        self._uniformBuffer.write(self._packed, self._version)
+        self._uniformBuffer.bind(UniformBuffer.Binding.Material)
+
+
+    def destroy(self):
+        """Free gpu buffers of this material and its variants"""
+        self._uniformBuffer.destroy()
+        for each in self._variants.values():
+            each.destroy()
+
+
+    def variant(self, emission):
+        """Returns this material with a different emission color, kept around for reuse"""
+        if emission == self._emissionColor:
+            return self
+
+        key = (emission.x(), emission.y(), emission.z())
+        material = self._variants.get(key, None)
+        if material is None:
+            material = Material(emission=QVector3D(emission))
+            self._variants[key] = material
+
+        ## follow changes made to this material
+        if material._sourceVersion != self._version:
+            material.ambientColor = self._ambientColor
+            material.diffuseColor = self._diffuseColor
+            material.specularColor = self._specularColor
+            material.shininess = self._shininess
+            material._sourceVersion = self._version
+        return material
+
+
+    @classmethod
+    def preset(cls, name, **kwargs):
+        """Returns the material shared under name, creating it from kwargs on first use, changes go to a copy() of it"""
+        material = Material.__presets.get(name, None)
+        if material is None:
+            material = Material(**kwargs)
+            material._preset = True
+            Material.__presets[name] = material
+        return material
+
+
     @classmethod
     def brass(cls):
         """Return brass material"""
-        return Material(
+        return cls.preset("brass",
             ambient=QVector3D(0.329412, 0.223529, 0.027451), 
             diffuse=QVector3D(0.780392, 0.568627, 0.113725), 
             specular=QVector3D(0.992157, 0.941176, 0.807843), 
@@ -84,7 +201,7 @@ class Material(QObject):
     @classmethod
     def bronze(cls):
         """Return bronze material"""
-        return Material(
+        return cls.preset("bronze",
             ambient=QVector3D(0.2125, 0.1275, 0.054), 
             diffuse=QVector3D(0.714, 0.4284, 0.18144), 
             specular=QVector3D(0.393548, 0.271906, 0.166721), 
@@ -94,7 +211,7 @@ class Material(QObject):
     @classmethod
     def polishedBronze(cls):
         """Return polished bronze material"""
-        return Material(
+        return cls.preset("polishedBronze",
             ambient=QVector3D(0.25, 0.148, 0.06475), 
             diffuse=QVector3D(0.4, 0.2368, 0.1036), 
             specular=QVector3D(0.774597, 0.458561, 0.200621), 
@@ -104,7 +221,7 @@ class Material(QObject):
     @classmethod
     def chrome(cls):
         """Return chrome material"""
-        return Material(
+        return cls.preset("chrome",
             ambient=QVector3D(0.25, 0.25, 0.25), 
             diffuse=QVector3D(0.4, 0.4, 0.4), 
             specular=QVector3D(0.774597, 0.774597, 0.774597), 
@@ -114,7 +231,7 @@ class Material(QObject):
     @classmethod
     def copper(cls):
         """Return copper material"""
-        return Material(
+        return cls.preset("copper",
             ambient=QVector3D(0.19125, 0.0735, 0.0225), 
             diffuse=QVector3D(0.7038, 0.27048, 0.0828), 
             specular=QVector3D(0.256777, 0.137622, 0.086014), 
@@ -124,7 +241,7 @@ class Material(QObject):
     @classmethod
     def polishedCopper(cls):
         """Return polished copper material"""
-        return Material(
+        return cls.preset("polishedCopper",
             ambient=QVector3D(0.2295, 0.08825, 0.0275), 
             diffuse=QVector3D(0.5508, 0.2118, 0.066), 
             specular=QVector3D(0.580594, 0.223257, 0.0695701), 
@@ -134,7 +251,7 @@ class Material(QObject):
     @classmethod
     def plasticCyan(cls):
         """Return cyan plastic material"""
-        return Material(
+        return cls.preset("plasticCyan",
             ambient=QVector3D(0.0, 0.0, 0.0), 
             diffuse=QVector3D(0.1, 0.35, 0.1), 
             specular=QVector3D(0.45, 0.55, 0.45), 
@@ -144,7 +261,7 @@ class Material(QObject):
     @classmethod
     def emerald(cls):
         """Return emerald material"""
-        return Material(
+        return cls.preset("emerald",
             ambient=QVector3D(0.0215, 0.1745, 0.0215), 
             diffuse=QVector3D(0.07568, 0.61424, 0.07568), 
             specular=QVector3D(0.633, 0.727811, 0.633), 
@@ -154,7 +271,7 @@ class Material(QObject):
     @classmethod
     def gold(cls):
         """Return gold material"""
-        return Material(
+        return cls.preset("gold",
             ambient=QVector3D(0.24725, 0.1995, 0.0745), 
             diffuse=QVector3D(0.75164, 0.60648, 0.22648), 
             specular=QVector3D(0.628281, 0.555802, 0.366065), 
@@ -164,7 +281,7 @@ class Material(QObject):
     @classmethod
     def polishedGold(cls):
         """Return polished gold material"""
-        return Material(
+        return cls.preset("polishedGold",
             ambient=QVector3D(0.24725, 0.2245, 0.0645), 
             diffuse=QVector3D(0.34615, 0.3143, 0.0903), 
             specular=QVector3D(0.797357, 0.723991, 0.208006), 
@@ -174,7 +291,7 @@ class Material(QObject):
     @classmethod
     def jade(cls):
         """Return jade material"""
-        return Material(
+        return cls.preset("jade",
             ambient=QVector3D(0.135, 0.2225, 0.1575), 
             diffuse=QVector3D(0.54, 0.89, 0.63), 
             specular=QVector3D(0.316228, 0.316228, 0.316228), 
@@ -184,7 +301,7 @@ class Material(QObject):
     @classmethod
     def obsidian(cls):
         """Return obsidian material"""
-        return Material(
+        return cls.preset("obsidian",
             ambient=QVector3D(0.05375, 0.05, 0.06625), 
             diffuse=QVector3D(0.18275, 0.17, 0.22525), 
             specular=QVector3D(0.332741, 0.328634, 0.346435), 
@@ -194,7 +311,7 @@ class Material(QObject):
     @classmethod
     def pearl(cls):
         """Return pearl material"""
-        return Material(
+        return cls.preset("pearl",
             ambient=QVector3D(0.25, 0.20725, 0.20725), 
             diffuse=QVector3D(1, 0.829, 0.829), 
             specular=QVector3D(0.296648, 0.296648, 0.296648), 
@@ -204,7 +321,7 @@ class Material(QObject):
     @classmethod
     def plasticRed(cls):
         """Return red plastic material"""
-        return Material(
+        return cls.preset("plasticRed",
             ambient=QVector3D(0.0, 0.0, 0.0), 
             diffuse=QVector3D(0.5, 0.0, 0.0), 
             specular=QVector3D(0.7, 0.6, 0.6), 
@@ -214,7 +331,7 @@ class Material(QObject):
     @classmethod
     def ruby(cls):
         """Return ruby material"""
-        return Material(
+        return cls.preset("ruby",
             ambient=QVector3D(0.1745, 0.01175, 0.01175), 
             diffuse=QVector3D(0.61424, 0.04136, 0.04136), 
             specular=QVector3D(0.727811, 0.626959, 0.626959), 
@@ -224,7 +341,7 @@ class Material(QObject):
     @classmethod
     def silver(cls):
         """Return silver material"""
-        return Material(
+        return cls.preset("silver",
             ambient=QVector3D(0.19225, 0.19225, 0.19225), 
             diffuse=QVector3D(0.50754, 0.50754, 0.50754), 
             specular=QVector3D(0.508273, 0.508273, 0.508273), 
@@ -234,7 +351,7 @@ class Material(QObject):
     @classmethod
     def polishedSilver(cls):
         """Return polished silver material"""
-        return Material(
+        return cls.preset("polishedSilver",
             ambient=QVector3D(0.23125, 0.23125, 0.23125), 
             diffuse=QVector3D(0.2775, 0.2775, 0.2775), 
             specular=QVector3D(0.773911, 0.773911, 0.773911), 
@@ -244,7 +361,7 @@ class Material(QObject):
     @classmethod
     def tin(cls):
         """Return tin material"""
-        return Material(
+        return cls.preset("tin",
             ambient=QVector3D(0.105882, 0.058824, 0.113725), 
             diffuse=QVector3D(0.427451, 0.470588, 0.541176), 
             specular=QVector3D(0.333333, 0.333333, 0.521569), 
@@ -254,7 +371,7 @@ class Material(QObject):
     @classmethod
     def turquoise(cls):
         """Return turquoise material"""
-        return Material(
+        return cls.preset("turquoise",
             ambient=QVector3D(0.1, 0.18725, 0.1745), 
             diffuse=QVector3D(0.396, 0.74151, 0.69102), 
             specular=QVector3D(0.297254, 0.30829, 0.306678), 
@@ -264,7 +381,7 @@ class Material(QObject):
     @classmethod
     def rubberCyan(cls):
         """Return cyan rubber material"""
-        return Material(
+        return cls.preset("rubberCyan",
             ambient=QVector3D(0.0, 0.05, 0.05), 
             diffuse=QVector3D(0.4, 0.5, 0.5), 
             specular=QVector3D(0.04, 0.7, 0.7), 
@@ -274,7 +391,7 @@ class Material(QObject):
     @classmethod
     def rubberWhite(cls):
         """Return white rubber material"""
-        return Material(
+        return cls.preset("rubberWhite",
             ambient=QVector3D(0.05, 0.05,0.05), 
             diffuse=QVector3D(0.5, 0.5, 0.5), 
             specular=QVector3D(0.7, 0.7, 0.7), 
@@ -284,7 +401,7 @@ class Material(QObject):
     @classmethod
     def rubberBlack(cls):
         """Return black rubber material"""
-        return Material(
+        return cls.preset("rubberBlack",
             ambient=QVector3D(0.02, 0.02, 0.02), 
             diffuse=QVector3D(0.01, 0.01, 0.0), 
             specular=QVector3D(0.4, 0.4, 0.4), 
@@ -294,7 +411,7 @@ class Material(QObject):
     @classmethod
     def sun(cls):
         """Return sun material"""
-        return Material(
+        return cls.preset("sun",
             emission=QVector3D(1.0, 1.0, 1.0),
             ambient=QVector3D(1.0, 1.0, 1.0), 
             diffuse=QVector3D(1.0, 1.0, 1.0), 
@@ -0,0 +1,418 @@
+import ctypes
+import numpy as np
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtGui import QOpenGLBuffer
+
+from OpenGL import GL
+from Source.Graphics.BufferUpload import BufferUpload
+
+##  GPU buffers holding the geometry of one or more actors.
+class Mesh(QObject):
+
+    ## copies of the vertices kept by streaming meshes, one is written while the others may still be drawn
+    Regions = 3
+
+    ## floats per vertex of positions, normals, colors and texture coordinates
+    Components = (3, 3, 3, 2)
+
+
+    ## initialization
+    def __init__(self, key=None):
+        """Initialize mesh."""
+        super(Mesh, self).__init__()
+
+        self._key = key
+        self._vbo = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self._ibo = QOpenGLBuffer(QOpenGLBuffer.IndexBuffer)
+        self._references = 0
+
+        self._num_vertices = 0
+        self._num_indices = 0
+        self._bytes = 0
+
+        self._hasNormals = False
+        self._hasColors = False
+        self._hasTextureCoords = False
+        self._hasIndices = False
+
+        self._offsetNormals = 0
+        self._offsetColors = 0
+        self._offsetTexCoords = 0
+
+        ## local space box enclosing the vertices
+        self._bounds = None
+
+        ## ring of regions written by streaming meshes
+        self._streaming = False
+        self._capacity = 0
+        self._region = 0
+        self._fences = [None] * Mesh.Regions
+        self._arrays = [None] * len(Mesh.Components)
+        self._offsetPositions = 0
+        self._streamed = 0
+        self._stalls = 0
+        self._grows = 0
+
+
+    @property
+    def key(self):
+        """Returns the registry key of this mesh, None if it is not shared"""
+        return self._key
+
+
+    def setKey(self, key):
+        """Sets the registry key of this mesh"""
+        self._key = key
+
+
+    @property
+    def vbo(self):
+        """Returns the vertex buffer object"""
+        return self._vbo
+
+
+    @property
+    def ibo(self):
+        """Returns the index buffer object"""
+        return self._ibo
+
+
+    @property
+    def references(self):
+        """Returns the number of actors using this mesh"""
+        return self._references
+
+
+    @property
+    def numberOfVertices(self):
+        """Returns the number of vertices of this mesh"""
+        return self._num_vertices
+
+
+    @property
+    def numberOfIndices(self):
+        """Returns the number of indices of this mesh"""
+        return self._num_indices
+
+
+    @property
+    def numberOfBuffers(self):
+        """Returns the number of GPU buffers allocated by this mesh"""
+        return 2 if self._hasIndices else 1
+
+
+    @property
+    def bytes(self):
+        """Returns the number of bytes uploaded to the GPU"""
+        return self._bytes
+
+
+    @property
+    def hasNormals(self):
+        return self._hasNormals
+
+
+    @property
+    def hasColors(self):
+        return self._hasColors
+
+
+    @property
+    def hasTextureCoords(self):
+        return self._hasTextureCoords
+
+
+    @property
+    def hasIndices(self):
+        return self._hasIndices
+
+
+    @property
+    def offsetPositions(self):
+        """Returns the byte offset of the positions in the vertex buffer"""
+        return self._offsetPositions
+
+
+    @property
+    def offsetNormals(self):
+        """Returns the byte offset of the normals in the vertex buffer"""
+        return self._offsetNormals
+
+
+    @property
+    def offsetColors(self):
+        """Returns the byte offset of the colors in the vertex buffer"""
+        return self._offsetColors
+
+
+    @property
+    def offsetTexCoords(self):
+        """Returns the byte offset of the texture coordinates in the vertex buffer"""
+        return self._offsetTexCoords
+
+
+    @property
+    def bounds(self):
+        """Returns (lower, upper) corners enclosing the vertices, None if unknown"""
+        return self._bounds
+
+
+    def updateBounds(self, vertices):
+        """Recompute bounds from vertex positions, None leaves them unknown"""
+        if vertices is None or len(vertices) == 0:
+            self._bounds = None
+            return
+        ## reduce in the array's own type, a double copy of a big mesh is not needed for two corners
+        vertices = np.asarray(vertices).reshape(-1, 3)
+        self._bounds = (vertices.min(axis=0).astype(np.float64), vertices.max(axis=0).astype(np.float64))
+
+
+    def isStreaming(self):
+        """Returns whether vertices are rewritten through a ring of regions"""
+        return self._streaming
+
+
+    def streamStatistics(self):
+        """Returns bytes streamed, waits for the GPU and buffer growths of a streaming mesh"""
+        return {'capacity': self._capacity, 'streamed': self._streamed, 'stalls': self._stalls, 'grows': self._grows}
+
+
+    def create(self, vertices, normals=None, colors=None, texcoords=None, indices=None, usage=QOpenGLBuffer.StaticDraw):
+        """Create buffers and upload geometry, stream draw geometry goes into a ring for per frame updates"""
+        self.updateBounds(vertices)
+
+        if usage == QOpenGLBuffer.StreamDraw:
+            self.createStream(vertices, normals, colors, texcoords, indices)
+            return
+
+        ## arrays are read in place, sizes come from their memory
+        upload = BufferUpload()
+        vertices = upload.array(vertices)
+        total_vertices = vertices.nbytes
+        total_normals = 0
+        total_colors = 0
+        total_texcoords = 0
+        total_indices = 0
+        self._num_vertices = vertices.size // 3
+
+        if normals is not None:
+            self._hasNormals = True
+            normals = upload.array(normals)
+            total_normals = normals.nbytes
+
+        if colors is not None:
+            self._hasColors = True
+            colors = upload.array(colors)
+            total_colors = colors.nbytes
+
+        if texcoords is not None:
+            self._hasTextureCoords = True
+            texcoords = upload.array(texcoords)
+            total_texcoords = texcoords.nbytes
+
+        if indices is not None:
+            self._hasIndices = True
+            indices = upload.indices(indices)
+            total_indices = indices.nbytes
+            self._num_indices = indices.size
+
+        ## create vertex buffer object
+        self._vbo.setUsagePattern(usage)
+        self._vbo.create()
+        self._vbo.bind()
+
+        ## populate vertex buffer object with data
+        offset = 0
+        self._vbo.allocate(total_vertices + total_normals + total_colors + total_texcoords)
+        upload.write(self._vbo, offset, vertices)
+        offset += total_vertices
+        self._offsetNormals = offset
+
+        if self._hasNormals:
+            upload.write(self._vbo, offset, normals)
+            offset += total_normals
+        if self._hasColors:
+            self._offsetColors = offset
+            upload.write(self._vbo, offset, colors)
+            offset += total_colors
+        if self._hasTextureCoords:
+            self._offsetTexCoords = offset
+            upload.write(self._vbo, offset, texcoords)
+            offset += total_texcoords
+
+        ## release buffer
+        self._vbo.release(QOpenGLBuffer.VertexBuffer)
+
+        ## create index buffer object if required
+        if self._hasIndices:
+            self._ibo.setUsagePattern(usage)
+            self._ibo.create()
+            self._ibo.bind()
+            upload.allocate(self._ibo, indices)
+            self._ibo.release(QOpenGLBuffer.IndexBuffer)
+
+        self._bytes = offset + total_indices
+
+
+    def createStream(self, vertices, normals, colors, texcoords, indices):
+        """Create a vertex buffer holding Regions copies of the vertices and upload the first one"""
+        self._streaming = True
+        self._hasNormals = normals is not None
+        self._hasColors = colors is not None
+        self._hasTextureCoords = texcoords is not None
+
+        self._vbo.setUsagePattern(QOpenGLBuffer.StreamDraw)
+        self._vbo.create()
+
+        ## indices do not change, they are uploaded once
+        total_indices = 0
+        if indices is not None:
+            self._hasIndices = True
+            indices = BufferUpload().indices(indices)
+            total_indices = indices.nbytes
+            self._num_indices = indices.size
+            self._ibo.setUsagePattern(QOpenGLBuffer.StaticDraw)
+            self._ibo.create()
+            self._ibo.bind()
+            BufferUpload().allocate(self._ibo, indices)
+            self._ibo.release(QOpenGLBuffer.IndexBuffer)
+
+        self.stream(vertices, normals, colors, texcoords)
+        self._bytes = Mesh.Regions * self.regionBytes() + total_indices
+
+
+    def regionBytes(self):
+        """Returns the size of one region of a streaming mesh"""
+        present = (True, self._hasNormals, self._hasColors, self._hasTextureCoords)
+        floats = sum(components for components, used in zip(Mesh.Components, present) if used)
+        return self._capacity * floats * np.dtype(np.float32).itemsize
+
+
+    def stream(self, vertices=None, normals=None, colors=None, texcoords=None):
+        """Write vertex data into the next region of the ring, attributes not given keep their last data"""
+        present = (True, self._hasNormals, self._hasColors, self._hasTextureCoords)
+        for index, each in enumerate((vertices, normals, colors, texcoords)):
+            if each is None:
+                continue
+            if not present[index]:
+                raise ValueError("Mesh was created without this vertex attribute")
+            self._arrays[index] = BufferUpload().array(each).reshape(-1)
+
+        count = len(self._arrays[0]) // 3
+        for index, components in enumerate(Mesh.Components):
+            if present[index] and len(self._arrays[index]) != count * components:
+                raise ValueError("Vertex attributes hold different numbers of vertices")
+        if count == 0:
+            self._num_vertices = 0
+            return
+
+        self._vbo.bind()
+        if count > self._capacity:
+
+            ## grow geometrically, orphaning the old storage so the GPU keeps drawing from it
+            self._capacity = max(count, 2 * self._capacity)
+            self.deleteFences()
+            self._region = 0
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, Mesh.Regions * self.regionBytes(), None, GL.GL_STREAM_DRAW)
+            self._bytes = Mesh.Regions * self.regionBytes() + self._num_indices * np.dtype(np.uint32).itemsize
+            self._grows += 1
+
+        else:
+
+            ## the region just drawn is free once the GPU passes this fence, move on to the next one
+            self._fences[self._region] = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+            self._region = (self._region + 1) % Mesh.Regions
+            fence = self._fences[self._region]
+            if fence is not None:
+                if GL.glClientWaitSync(fence, 0, 0) == GL.GL_TIMEOUT_EXPIRED:
+                    self._stalls += 1
+                    GL.glClientWaitSync(fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, GL.GL_TIMEOUT_IGNORED)
+                GL.glDeleteSync(fence)
+                self._fences[self._region] = None
+
+        ## nothing else reads this region, write it without synchronizing
+        size = self.regionBytes()
+        base = self._region * size
+        pointer = self._vbo.mapRange(base, size, QOpenGLBuffer.RangeWrite | QOpenGLBuffer.RangeInvalidate | QOpenGLBuffer.RangeUnsynchronized)
+        region = np.frombuffer((ctypes.c_float * (size // np.dtype(np.float32).itemsize)).from_address(int(pointer)), dtype=np.float32)
+
+        ## attributes follow each other in blocks of capacity vertices
+        offsets = []
+        offset = 0
+        for index, components in enumerate(Mesh.Components):
+            offsets.append(base + offset * np.dtype(np.float32).itemsize)
+            if present[index]:
+                region[offset:offset + count * components] = self._arrays[index]
+                offset += self._capacity * components
+        self._vbo.unmap()
+        self._vbo.release(QOpenGLBuffer.VertexBuffer)
+
+        self._offsetPositions, self._offsetNormals, self._offsetColors, self._offsetTexCoords = offsets
+        self._num_vertices = count
+        written = count * sum(components for components, used in zip(Mesh.Components, present) if used) * np.dtype(np.float32).itemsize
+        self._streamed += written
+        BufferUpload().record(written)
+
+
+    def deleteFences(self):
+        """Forget the fences guarding regions of a streaming mesh"""
+        for index, fence in enumerate(self._fences):
+            if fence is not None:
+                GL.glDeleteSync(fence)
+            self._fences[index] = None
+
+
+    def bindAttributes(self, shaders):
+        """Record attribute layout of this mesh into the currently bound vao"""
+        self._vbo.bind()
+        for each in shaders:
+            each.setAttributeBuffer('position', GL.GL_FLOAT, self._offsetPositions, 3, 3 * np.dtype(np.float32).itemsize)
+        if self._hasNormals:
+            for each in shaders:
+                each.setAttributeBuffer('normal', GL.GL_FLOAT, self._offsetNormals, 3, 3 * np.dtype(np.float32).itemsize)
+        if self._hasColors:
+            for each in shaders:
+                each.setAttributeBuffer('color', GL.GL_FLOAT, self._offsetColors, 3, 3 * np.dtype(np.float32).itemsize)
+        if self._hasTextureCoords:
+            for each in shaders:
+                each.setAttributeBuffer('texcoord', GL.GL_FLOAT, self._offsetTexCoords, 2, 2 * np.dtype(np.float32).itemsize)
+
+        ## release buffer
+        self._vbo.release(QOpenGLBuffer.VertexBuffer)
+
+        ## enable arrays as part of the vao state
+        for each in shaders:
+            each.enableAttributeArray('position')
+        if self._hasNormals:
+            for each in shaders:
+                each.enableAttributeArray('normal')
+        if self._hasColors:
+            for each in shaders:
+                each.enableAttributeArray('color')
+        if self._hasTextureCoords:
+            for each in shaders:
+                each.enableAttributeArray('texcoord')
+
+        ## index buffer binding is part of the vao state
+        if self._hasIndices:
+            self._ibo.bind()
+
+
+    def reference(self):
+        """Register one more user of this mesh"""
+        self._references += 1
+
+
+    def dereference(self):
+        """Unregister a user of this mesh, returns the number of remaining users"""
+        self._references -= 1
+        return self._references
+
+
+    def destroy(self):
+        """Free GPU buffers"""
+        self.deleteFences()
+        self._vbo.destroy()
+        if self._hasIndices:
+            self._ibo.destroy()
@@ -0,0 +1,134 @@
+import math
+import numpy as np
+from PyQt5.QtGui import QMatrix4x4
+
+from OpenGL import GL
+from Source.Graphics.Actor import Actor
+from Source.Graphics.MeshLoader import MeshLoader
+from Source.Graphics.MeshSimplifier import MeshSimplifier
+
+##  Actor drawing the triangles of an OBJ, PLY or STL file.
+class MeshActor(Actor):
+
+    ## triangles below which no coarser level of detail is made
+    MinTriangles = 1024
+
+    ## initialization
+    def __init__(self, scene, filename, **kwargs):
+        """Initialize actor."""
+        super(MeshActor, self).__init__(scene, mode=Actor.RenderMode.Triangles, **kwargs)
+
+        self._filename = filename
+        self._cache = kwargs.get("cache", True)
+        self._fit = kwargs.get("fit", "transform" not in kwargs)
+
+        self._vertices = None
+        self._colors = None
+
+        ## levels of detail, simplified in the background once the geometry is drawn
+        self._chain = None
+        self._chainRequested = False
+        self._chainFuture = None
+
+        ## create actor
+        self.load()
+
+
+    @classmethod
+    def isSelectable(self):
+        """Returns true if actor is selectable"""
+        return True
+
+
+    @property
+    def filename(self):
+        """Returns the file the geometry was read from"""
+        return self._filename
+
+
+    def detailCount(self):
+        """Returns the number of levels of detail, one until they are simplified"""
+        return len(self._chain) if self._chain is not None else 1
+
+
+    def detailSegments(self, detail):
+        """Returns the number of segments around the outline at a level of detail, as a sphere of as many triangles has"""
+        return math.sqrt(5.0 * self._chain[detail]['indices'].size / 3)
+
+
+    def buildDetails(self, vertices, indices, normals, colors):
+        """Simplify full geometry into a chain of levels of detail, each with half the triangles of the previous"""
+        chain = MeshSimplifier.chain(vertices, indices, minimum=MeshActor.MinTriangles, normals=normals, colors=colors)
+
+        ## swapped in whole, the render thread sees no levels or all of them
+        self._chain = chain if len(chain) > 1 else None
+
+
+    def generateGeometry(self, detail=0):
+        """Read geometry from the file, or from its cache, coarser levels of detail from the chain"""
+        if detail > 0:
+            geometry = self._chain[detail]
+        else:
+            geometry = MeshLoader.load(self._filename, cache=self._cache)
+
+        self._vertices = geometry['vertices']
+        self._normals = geometry['normals']
+        self._indices = geometry['indices']
+        self._colors = geometry.get('colors', None)
+
+
+    def fitTransform(self):
+        """Returns the transform centering the geometry in a box of unit size, as the primitives are"""
+        lower, upper = self._vertices.min(axis=0).astype(np.float64), self._vertices.max(axis=0).astype(np.float64)
+        size = float((upper - lower).max())
+        center = (lower + upper) / 2.0
+
+        xform = QMatrix4x4()
+        if size > 0.0:
+            xform.scale(1.0 / size)
+        xform.translate(-center[0], -center[1], -center[2])
+        return xform
+
+
+    def initialize(self):
+        """Creates mesh geometry"""
+        if self._vertices is None:
+            self.generateGeometry()
+
+        ## geometry may have been read by a background loader, everything else happens here
+        if self._fit:
+            self._transform = self.fitTransform()
+            self._fit = False
+        if self._colors is not None:
+            self.setSolidShader(self.shaderCollection.attributeColorPhongShader())
+            self.setSolidFlatShader(self.shaderCollection.attributeColorPhongFlatShader())
+            self.setNoLightSolidShader(self.shaderCollection.attributeColorShader())
+
+        ## create object
+        self.create(self._vertices, normals=self._normals, colors=self._colors, indices=self._indices)
+
+        ## levels of detail are made from the full geometry, in the background when there is a loader
+        if self._lod and not self._chainRequested and self._indices.size // 3 >= 2 * MeshActor.MinTriangles:
+            self._chainRequested = True
+            arrays = (self._vertices, self._indices, self._normals, self._colors)
+            if self._loader is None:
+                self.buildDetails(*arrays)
+            else:
+                self._chainFuture = self._loader.execute(lambda: self.buildDetails(*arrays))
+
+
+    def destroy(self):
+        """Stop simplifying, then free the geometry"""
+        if self._chainFuture is not None:
+            self._chainFuture.cancel()
+        super(MeshActor, self).destroy()
+
+
+    def render(self):
+        """Render mesh"""
+        GL.glDrawElements(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None)
+
+
+    def renderInstanced(self, instances):
+        """Render mesh once per instance"""
+        GL.glDrawElementsInstanced(self._render_mode, self.numberOfIndices, GL.GL_UNSIGNED_INT, None, instances)
@@ -0,0 +1,497 @@
+import os
+import re
+import json
+import struct
+import itertools
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+from Source.Graphics.MeshOptimizer import MeshOptimizer
+
+##  Reads OBJ, PLY and STL files into indexed triangle geometry, cached next to the file in a memory-mappable form.
+class MeshLoader(QObject):
+
+    ## file extensions understood
+    Formats = ['.obj', '.ply', '.stl']
+
+    ## bytes of text and number of lines or records parsed at once
+    ChunkBytes = 4 * 1024 * 1024
+    ChunkLines = 1 << 18
+
+    ## cache file: magic, header length, JSON header, then aligned raw arrays
+    CacheSuffix = ".meshcache"
+    CacheMagic = b"MESHCACHE 2\n"
+    CacheAlignment = 64
+
+    ## PLY property types
+    PLYTypes = {
+        b'char': 'i1', b'int8': 'i1', b'uchar': 'u1', b'uint8': 'u1',
+        b'short': 'i2', b'int16': 'i2', b'ushort': 'u2', b'uint16': 'u2',
+        b'int': 'i4', b'int32': 'i4', b'uint': 'u4', b'uint32': 'u4',
+        b'float': 'f4', b'float32': 'f4', b'double': 'f8', b'float64': 'f8'}
+
+    ## binary STL triangle record
+    STLRecord = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+
+
+    @classmethod
+    def load(cls, filename, cache=True, optimize=True):
+        """Returns float32 vertices and normals and uint32 triangle indices of a mesh file, from its cache when up to date, ordered for the vertex cache unless optimize is off"""
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in cls.Formats:
+            raise ValueError("Unknown mesh format {}".format(extension))
+
+        if cache:
+            geometry = cls.readCache(filename, optimize)
+            if geometry is not None:
+                return geometry
+
+        if extension == '.obj':
+            geometry = cls.parseOBJ(filename)
+        elif extension == '.ply':
+            geometry = cls.parsePLY(filename)
+        else:
+            geometry = cls.parseSTL(filename)
+
+        geometry = MeshOptimizer.weld(geometry)
+        if len(geometry['indices']) == 0:
+            raise ValueError("{} holds no triangles".format(filename))
+        if 'normals' not in geometry:
+            geometry['normals'] = cls.computeNormals(geometry['vertices'], geometry['indices'])
+
+        ## paid once, the cache keeps the order
+        if optimize:
+            geometry = MeshOptimizer.reorder(geometry)
+
+        if cache:
+            cls.writeCache(filename, geometry, optimize)
+        return geometry
+
+
+    @classmethod
+    def chunks(cls, stream):
+        """Yields blocks of whole lines read from a binary stream"""
+        rest = b""
+        while True:
+            block = stream.read(cls.ChunkBytes)
+            if not block:
+                break
+            block = rest + block
+            end = block.rfind(b"\n")
+            if end < 0:
+                rest = block
+                continue
+            rest = block[end + 1:]
+            yield block[:end + 1]
+        if rest:
+            yield rest
+
+
+    @classmethod
+    def numbers(cls, text, dtype, count=None):
+        """Parse whitespace separated numbers, checking that count of them were found"""
+        values = np.fromstring(text, dtype=dtype, sep=' ') if text.strip() else np.empty(0, dtype=dtype)
+        if count is not None and len(values) != count:
+            raise ValueError("Expected {} numbers, found {}".format(count, len(values)))
+        return values
+
+
+    @classmethod
+    def tokenCounts(cls, text, lines):
+        """Returns the number of whitespace separated tokens on each of lines newline separated lines of text"""
+        data = np.frombuffer(text, dtype=np.uint8)
+        if len(data) == 0:
+            return np.zeros(lines, dtype=np.int64)
+        space = (data == 32) | (data == 9) | (data == 10) | (data == 13)
+        starts = ~space & np.concatenate(([True], space[:-1]))
+        line = np.cumsum(data == 10) - (data == 10)
+        return np.bincount(line[starts], minlength=lines)[:lines]
+
+
+    @classmethod
+    def selectLines(cls, block, keyword):
+        """Returns the lines of block whose first word is keyword, keyword blanked out, and which lines matched"""
+        data = np.frombuffer(block, dtype=np.uint8)
+        starts = np.concatenate(([0], np.flatnonzero(data == 10) + 1))
+        ends = np.append(starts[1:], len(data))
+
+        ## lines may be indented and the keyword followed by spaces or tabs
+        blank = (data == 32) | (data == 9)
+        solid = np.where(blank, len(data), np.arange(len(data)))
+        heads = np.append(np.minimum.accumulate(solid[::-1])[::-1], len(data))[starts]
+        match = np.ones(len(starts), dtype=bool)
+        for position, character in enumerate(bytearray(keyword) + b"\x00"):
+            at = heads + position
+            value = data[np.minimum(at, len(data) - 1)] if len(data) else np.zeros(len(at), dtype=np.uint8)
+            if character:
+                match &= (at < ends) & (value == character)
+            else:
+                match &= (at < ends) & ((value == 32) | (value == 9))
+
+        ## matching lines come in runs, each is cut out whole with the keywords blanked out
+        text = data.copy()
+        text[(heads[match][:, np.newaxis] + np.arange(len(keyword))).reshape(-1)] = 32
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], match, [False])).astype(np.int8)))
+        text = b"".join([text[starts[first]:ends[last - 1]].tobytes() for first, last in zip(edges[::2], edges[1::2])])
+        return text, match
+
+
+    @classmethod
+    def triangulate(cls, indices, counts):
+        """Split polygons given as flat indices and vertex counts into fans of triangles"""
+        counts = np.asarray(counts, dtype=np.int64)
+        if np.all(counts == 3):
+            return indices.reshape(-1, 3)
+
+        starts = np.cumsum(counts) - counts
+        triangles = np.maximum(counts - 2, 0)
+        first = np.repeat(starts, triangles)
+        step = np.arange(triangles.sum()) - np.repeat(np.cumsum(triangles) - triangles, triangles) + 1
+        return np.stack((indices[first], indices[first + step], indices[first + step + 1]), axis=1)
+
+
+    @classmethod
+    def parseOBJ(cls, filename):
+        """Read positions and polygons of a Wavefront OBJ file, texture and normal references are dropped"""
+        positions = []
+        polygons = []
+        counts = []
+        total = 0
+
+        with open(filename, "rb") as stream:
+            for block in cls.chunks(stream):
+                vertexText, vertexLines = cls.selectLines(block, b"v")
+                faceText, faceLines = cls.selectLines(block, b"f")
+                vertexCount = int(vertexLines.sum())
+                faceCount = int(faceLines.sum())
+
+                ## positions, an optional w or color follows them on some lines
+                values = cls.numbers(vertexText, np.float64)
+                if len(values) == 3 * vertexCount:
+                    positions.append(values.reshape(-1, 3))
+                else:
+                    tokens = cls.tokenCounts(vertexText, vertexCount)
+                    if np.any(tokens < 3):
+                        raise ValueError("{} has a vertex with less than three coordinates".format(filename))
+                    starts = np.cumsum(tokens) - tokens
+                    positions.append(values[starts[:, np.newaxis] + np.arange(3)])
+
+                ## polygons, keeping the position index of v/vt/vn references
+                if faceCount > 0:
+                    text = re.sub(rb"/\S*", b"", faceText)
+                    lineCounts = cls.tokenCounts(text, faceCount)
+                    indices = cls.numbers(text, np.int64, lineCounts.sum())
+
+                    ## negative indices count back from the last position read before their line
+                    if np.any(indices < 0):
+                        before = total + np.cumsum(vertexLines)[faceLines]
+                        base = np.repeat(before, lineCounts)
+                        indices = np.where(indices < 0, base + indices, indices - 1)
+                    else:
+                        indices = indices - 1
+                    polygons.append(indices)
+                    counts.append(lineCounts)
+
+                total += vertexCount
+
+        vertices = np.concatenate(positions) if positions else np.empty((0, 3))
+        indices = np.concatenate(polygons) if polygons else np.empty(0, dtype=np.int64)
+        triangles = cls.triangulate(indices, np.concatenate(counts) if counts else np.empty(0, dtype=np.int64))
+        if len(triangles) > 0 and (triangles.min() < 0 or triangles.max() >= len(vertices)):
+            raise ValueError("{} references missing vertices".format(filename))
+        return {'vertices': vertices.astype(np.float32), 'indices': triangles}
+
+
+    @classmethod
+    def readPLYHeader(cls, stream):
+        """Returns format and elements of a PLY header, each element a name, count and list of properties"""
+        if stream.readline().strip() != b"ply":
+            raise ValueError("Not a PLY file")
+
+        format = None
+        elements = []
+        while True:
+            line = stream.readline()
+            if not line:
+                raise ValueError("PLY header is not terminated")
+            words = line.split()
+            if not words or words[0] in (b"comment", b"obj_info"):
+                continue
+            if words[0] == b"end_header":
+                break
+            if words[0] == b"format":
+                format = words[1].decode()
+            elif words[0] == b"element":
+                elements.append((words[1].decode(), int(words[2]), []))
+            elif words[0] == b"property":
+                if words[1] == b"list":
+                    elements[-1][2].append((words[4].decode(), cls.PLYTypes[words[2]], cls.PLYTypes[words[3]]))
+                else:
+                    elements[-1][2].append((words[2].decode(), cls.PLYTypes[words[1]], None))
+
+        if format not in ("ascii", "binary_little_endian", "binary_big_endian"):
+            raise ValueError("Unknown PLY format {}".format(format))
+        return format, elements
+
+
+    @classmethod
+    def plyGeometry(cls, vertices, faces):
+        """Build geometry from the vertex element table and face polygons of a PLY file"""
+        names = vertices.dtype.names
+        geometry = {'vertices': np.stack([vertices[each] for each in ('x', 'y', 'z')], axis=1).astype(np.float32)}
+        if all(each in names for each in ('nx', 'ny', 'nz')):
+            geometry['normals'] = np.stack([vertices[each] for each in ('nx', 'ny', 'nz')], axis=1).astype(np.float32)
+        if all(each in names for each in ('red', 'green', 'blue')):
+            colors = np.stack([vertices[each] for each in ('red', 'green', 'blue')], axis=1).astype(np.float32)
+            geometry['colors'] = colors / 255.0 if vertices.dtype['red'].kind in "iu" else colors
+
+        indices, counts = faces
+        triangles = cls.triangulate(indices, counts)
+        if len(triangles) > 0 and (triangles.min() < 0 or triangles.max() >= len(geometry['vertices'])):
+            raise ValueError("PLY faces reference missing vertices")
+        geometry['indices'] = triangles
+        return geometry
+
+
+    @classmethod
+    def parsePLY(cls, filename):
+        """Read vertices, normals, colors and faces of an ASCII or binary PLY file"""
+        with open(filename, "rb") as stream:
+            format, elements = cls.readPLYHeader(stream)
+            start = stream.tell()
+
+        if format == "ascii":
+            with open(filename, "rb") as stream:
+                stream.seek(start)
+                tables = cls.readPLYText(stream, elements)
+        else:
+            tables = cls.readPLYBinary(filename, start, elements, "<" if format == "binary_little_endian" else ">")
+
+        if 'vertex' not in tables:
+            raise ValueError("{} has no vertex element".format(filename))
+        return cls.plyGeometry(tables['vertex'], tables.get('face', (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))))
+
+
+    @classmethod
+    def readPLYText(cls, stream, elements):
+        """Parse the elements of an ASCII PLY body, vertices as tables and faces as flat indices and counts"""
+        lines = (line for block in cls.chunks(stream) for line in block.split(b"\n") if line.strip())
+        tables = dict()
+        for name, count, properties in elements:
+            scalars = [each for each in properties if each[2] is None]
+            single = len(properties) == 1 and properties[0][2] is not None
+            parts = []
+            counts = []
+            remaining = count
+            while remaining > 0:
+                batch = list(itertools.islice(lines, min(remaining, cls.ChunkLines)))
+                if not batch:
+                    raise ValueError("PLY element {} is truncated".format(name))
+                remaining -= len(batch)
+                text = b"\n".join(batch)
+
+                if len(scalars) == len(properties):
+                    values = cls.numbers(text, np.float64, len(batch) * len(properties))
+                    parts.append(values.reshape(len(batch), len(properties)))
+                elif single:
+                    ## a length then that many indices per line
+                    tokens = cls.tokenCounts(text, len(batch))
+                    values = cls.numbers(text, np.int64, tokens.sum())
+                    heads = np.cumsum(tokens) - tokens
+                    keep = np.ones(len(values), dtype=bool)
+                    keep[heads] = False
+                    if np.any(values[heads] != tokens - 1):
+                        raise ValueError("PLY list lengths do not match their lines")
+                    parts.append(values[keep])
+                    counts.append(tokens - 1)
+                elif name == 'face':
+                    raise ValueError("PLY faces with properties besides their vertex list are not supported in ASCII files")
+
+            if name == 'vertex':
+                values = np.concatenate(parts) if parts else np.empty((0, len(properties)))
+                table = np.empty(len(values), dtype=[(each[0], each[1]) for each in properties])
+                for column, each in enumerate(properties):
+                    table[each[0]] = values[:, column]
+                tables[name] = table
+            elif name == 'face' and single:
+                tables[name] = (np.concatenate(parts) if parts else np.empty(0, dtype=np.int64),
+                    np.concatenate(counts) if counts else np.empty(0, dtype=np.int64))
+        return tables
+
+
+    @classmethod
+    def readPLYBinary(cls, filename, start, elements, order):
+        """Read the elements of a binary PLY body from a memory mapping of the file"""
+        data = np.memmap(filename, dtype=np.uint8, mode='r', offset=start)
+        offset = 0
+        tables = dict()
+        for name, count, properties in elements:
+            if all(each[2] is None for each in properties):
+                dtype = np.dtype([(each[0], order + each[1]) for each in properties])
+                table = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+                offset += count * dtype.itemsize
+                if name == 'vertex':
+                    tables[name] = table
+                continue
+
+            ## faces are usually all of one size, try that before walking them one by one
+            if len(properties) == 1 and count > 0:
+                lengthType, indexType = np.dtype(order + properties[0][1]), np.dtype(order + properties[0][2])
+                size = int(np.frombuffer(data, dtype=lengthType, count=1, offset=offset)[0])
+                dtype = np.dtype([('length', lengthType), ('indices', indexType, (size,))])
+                if offset + count * dtype.itemsize <= len(data):
+                    table = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+                    if np.all(table['length'] == size):
+                        offset += count * dtype.itemsize
+                        if name == 'face':
+                            tables[name] = (table['indices'].astype(np.int64).reshape(-1), np.full(count, size))
+                        continue
+
+            indices, counts, offset = cls.walkPLYRecords(data, offset, count, properties, order)
+            if name == 'face':
+                tables[name] = (indices, counts)
+        return tables
+
+
+    @classmethod
+    def walkPLYRecords(cls, data, offset, count, properties, order):
+        """Read records of varying size one at a time, returns the first list as flat indices and counts"""
+        indices = []
+        counts = np.empty(count, dtype=np.int64)
+        buffer = memoryview(data)
+        for record in range(count):
+            first = True
+            for name, valueType, itemType in properties:
+                if itemType is None:
+                    offset += np.dtype(valueType).itemsize
+                    continue
+                length = struct.unpack_from(order + np.dtype(valueType).char, buffer, offset)[0]
+                offset += np.dtype(valueType).itemsize
+                items = struct.unpack_from(order + str(length) + np.dtype(itemType).char, buffer, offset)
+                offset += length * np.dtype(itemType).itemsize
+                if first:
+                    indices.extend(items)
+                    counts[record] = length
+                    first = False
+        return np.array(indices, dtype=np.int64), counts, offset
+
+
+    @classmethod
+    def parseSTL(cls, filename):
+        """Read the triangles of a binary or ASCII STL file, every corner its own vertex until welded"""
+        size = os.path.getsize(filename)
+        with open(filename, "rb") as stream:
+            header = stream.read(84)
+
+        ## a binary file is exactly as long as its triangle count says, whatever its header starts with
+        if len(header) == 84:
+            count = struct.unpack("<I", header[80:84])[0]
+            if 84 + count * cls.STLRecord.itemsize == size:
+                records = np.memmap(filename, dtype=cls.STLRecord, mode='r', offset=84, shape=(count,)) if count else np.empty(0, dtype=cls.STLRecord)
+                vertices = np.ascontiguousarray(records['vertices'], dtype=np.float32).reshape(-1, 3)
+                return {'vertices': vertices, 'indices': np.arange(len(vertices), dtype=np.int64).reshape(-1, 3)}
+
+        if not header.lstrip().startswith(b"solid"):
+            raise ValueError("{} is not an STL file".format(filename))
+
+        positions = []
+        with open(filename, "rb") as stream:
+            for block in cls.chunks(stream):
+                lines = re.findall(rb"^\s*vertex([^\n]*)", block, re.M)
+                positions.append(cls.numbers(b"\n".join(lines), np.float32, 3 * len(lines)).reshape(-1, 3))
+        vertices = np.concatenate(positions) if positions else np.empty((0, 3), dtype=np.float32)
+        if len(vertices) % 3:
+            raise ValueError("{} has an incomplete facet".format(filename))
+        return {'vertices': vertices, 'indices': np.arange(len(vertices), dtype=np.int64).reshape(-1, 3)}
+
+
+    @classmethod
+    def computeNormals(cls, vertices, indices):
+        """Returns area weighted vertex normals"""
+        vertices = np.asarray(vertices, dtype=np.float64)
+        a, b, c = (vertices[indices[:, corner]] for corner in range(3))
+        faces = np.cross(b - a, c - a)
+
+        normals = np.zeros_like(vertices)
+        for corner in range(3):
+            for axis in range(3):
+                normals[:, axis] += np.bincount(indices[:, corner], weights=faces[:, axis], minlength=len(vertices))
+        lengths = np.linalg.norm(normals, axis=1)
+        lengths[lengths == 0.0] = 1.0
+        return (normals / lengths[:, np.newaxis]).astype(np.float32)
+
+
+    @classmethod
+    def cachePath(cls, filename):
+        """Returns the name of the cache file of a mesh file"""
+        return filename + cls.CacheSuffix
+
+
+    @classmethod
+    def sourceStamp(cls, filename):
+        """Returns what identifies the version of a mesh file a cache was built from"""
+        status = os.stat(filename)
+        return {'size': status.st_size, 'mtime': status.st_mtime_ns}
+
+
+    @classmethod
+    def align(cls, offset):
+        return -(-offset // cls.CacheAlignment) * cls.CacheAlignment
+
+
+    @classmethod
+    def writeCache(cls, filename, geometry, optimize=True):
+        """Write geometry next to filename, noting whether it was optimized, returns False if it could not be written"""
+        layout = []
+        offset = 0
+        for name in sorted(geometry):
+            offset = cls.align(offset)
+            layout.append({'name': name, 'dtype': geometry[name].dtype.str, 'shape': list(geometry[name].shape), 'offset': offset})
+            offset += geometry[name].nbytes
+        header = json.dumps({'source': cls.sourceStamp(filename), 'optimize': optimize, 'arrays': layout}).encode('UTF-8')
+        start = cls.align(len(cls.CacheMagic) + 8 + len(header))
+
+        ## written aside and renamed, a reader never sees half a cache
+        path = cls.cachePath(filename)
+        temporary = path + ".tmp"
+        try:
+            with open(temporary, "wb") as stream:
+                stream.write(cls.CacheMagic)
+                stream.write(struct.pack("<Q", len(header)))
+                stream.write(header)
+                for entry in layout:
+                    stream.seek(start + entry['offset'])
+                    stream.write(memoryview(np.ascontiguousarray(geometry[entry['name']])).cast('B'))
+            os.replace(temporary, path)
+        except (IOError, OSError):
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False
+        return True
+
+
+    @classmethod
+    def readCache(cls, filename, optimize=True):
+        """Returns geometry mapped from the cache of filename, None if there is none, the file changed since or it was optimized otherwise"""
+        path = cls.cachePath(filename)
+        try:
+            with open(path, "rb") as stream:
+                if stream.read(len(cls.CacheMagic)) != cls.CacheMagic:
+                    return None
+                length = struct.unpack("<Q", stream.read(8))[0]
+                header = json.loads(stream.read(length).decode('UTF-8'))
+            if header['source'] != cls.sourceStamp(filename) or header.get('optimize', None) != optimize:
+                return None
+
+            ## arrays are views of one read-only mapping, pages are read when first touched
+            start = cls.align(len(cls.CacheMagic) + 8 + length)
+            data = np.memmap(path, dtype=np.uint8, mode='r')
+            geometry = dict()
+            for entry in header['arrays']:
+                dtype = np.dtype(entry['dtype'])
+                shape = tuple(entry['shape'])
+                geometry[entry['name']] = np.frombuffer(data, dtype=dtype, count=int(np.prod(shape)), offset=start + entry['offset']).reshape(shape)
+            return geometry
+        except (IOError, OSError, ValueError, KeyError, struct.error):
+            return None
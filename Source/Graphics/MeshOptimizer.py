@@ -0,0 +1,176 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+##  Reorders indexed triangles for the post-transform vertex cache and vertices for fetch locality.
+class MeshOptimizer(QObject):
+
+    ## entries of the simulated FIFO vertex cache, a conservative size for current hardware
+    CacheSize = 16
+
+    ## floats per vertex of each attribute geometry may hold
+    Widths = {'vertices': 3, 'normals': 3, 'colors': 3, 'texcoords': 2}
+
+
+    @classmethod
+    def fan(cls, start, count):
+        """Returns the triangles drawing a fan of count vertices from start"""
+        second = np.arange(start + 1, start + count - 1)
+        return np.stack((np.full(len(second), start), second, second + 1), axis=1)
+
+
+    @classmethod
+    def optimize(cls, geometry, cacheSize=CacheSize):
+        """Returns geometry welded into indexed triangles ordered for the vertex cache, with ACMR before and after"""
+        vertices = len(np.asarray(geometry['vertices']).reshape(-1, 3))
+        if 'indices' not in geometry:
+            geometry = dict(geometry, indices=np.arange(vertices).reshape(-1, 3))
+        before = cls.acmr(geometry['indices'], cacheSize)
+
+        ## shared vertices are transformed once, and can only hit the cache once they are shared
+        optimized = cls.reorder(cls.weld(geometry), cacheSize)
+
+        statistics = {
+            'vertices_before': vertices,
+            'vertices_after': len(optimized['vertices']),
+            'acmr_before': before,
+            'acmr_after': cls.acmr(optimized['indices'], cacheSize)
+        }
+        return optimized, statistics
+
+
+    @classmethod
+    def reorder(cls, geometry, cacheSize=CacheSize):
+        """Returns indexed geometry with triangles ordered for the vertex cache, then vertices in the order they are used"""
+        geometry = dict(geometry, indices=cls.tipsify(geometry['indices'], len(geometry['vertices']), cacheSize))
+        return cls.reorderVertices(geometry)
+
+
+    @classmethod
+    def weld(cls, geometry):
+        """Merge vertices whose attributes are all equal and drop degenerate triangles"""
+        unknown = set(geometry) - set(cls.Widths) - {'indices'}
+        if unknown:
+            raise ValueError("Unable to weld vertex attributes {}".format(", ".join(sorted(unknown))))
+        attributes = [name for name in cls.Widths if name in geometry]
+        columns = np.cumsum([0] + [cls.Widths[name] for name in attributes])
+        indices = np.asarray(geometry['indices']).reshape(-1)
+
+        ## equal vertices sort next to each other, negative zero is the same as zero
+        table = np.ascontiguousarray(np.hstack([np.asarray(geometry[name], dtype=np.float32).reshape(-1, cls.Widths[name]) + np.float32(0.0) for name in attributes]))
+        bits = table.view(np.uint32)
+        order = np.lexsort(bits.T[::-1])
+        step = np.any(bits[order[1:]] != bits[order[:-1]], axis=1)
+        group = np.empty(len(table), dtype=np.int64)
+        group[order] = np.concatenate(([0], np.cumsum(step)))
+
+        ## number vertices by their first use, so that triangles close in the file share nearby vertices
+        _, first, inverse = np.unique(group[indices], return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        triangles = rank[inverse.reshape(-1)].reshape(-1, 3)
+        triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])]
+
+        welded = {'indices': triangles.astype(np.uint32)}
+        for name, start, end in zip(attributes, columns[:-1], columns[1:]):
+            welded[name] = np.ascontiguousarray(table[indices[first[order]], start:end])
+        return welded
+
+
+    @classmethod
+    def acmr(cls, indices, cacheSize=CacheSize):
+        """Returns the average number of vertices transformed per triangle through a FIFO cache of cacheSize entries"""
+        indices = np.asarray(indices).reshape(-1)
+        if len(indices) == 0:
+            return 0.0
+
+        ## a vertex is in the cache while fewer than cacheSize misses happened since its own
+        inserted = [-cacheSize] * (int(indices.max()) + 1)
+        misses = 0
+        for vertex in indices.tolist():
+            if misses - inserted[vertex] >= cacheSize:
+                inserted[vertex] = misses
+                misses += 1
+        return misses / (len(indices) / 3.0)
+
+
+    @classmethod
+    def tipsify(cls, indices, count, cacheSize=CacheSize):
+        """Returns triangles reordered by Tipsify: fans around vertices, next taking the one most likely still cached"""
+        triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        if len(triangles) == 0:
+            return np.asarray(indices, dtype=np.uint32).reshape(-1, 3)
+
+        ## triangles around each vertex
+        corners = triangles.reshape(-1)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(corners, minlength=count)))).tolist()
+        around = (np.argsort(corners, kind='stable') // 3).tolist()
+        live = np.bincount(corners, minlength=count).tolist()
+        corners = triangles.tolist()
+
+        stamps = [0] * count
+        emitted = [False] * len(corners)
+        deadEnds = []
+        order = []
+        timestamp = cacheSize + 1
+        cursor = 0
+        fanning = 0
+
+        while fanning >= 0:
+            candidates = []
+            for triangle in around[offsets[fanning]:offsets[fanning + 1]]:
+                if emitted[triangle]:
+                    continue
+                emitted[triangle] = True
+                order.append(triangle)
+                for vertex in corners[triangle]:
+                    deadEnds.append(vertex)
+                    candidates.append(vertex)
+                    live[vertex] -= 1
+                    if timestamp - stamps[vertex] > cacheSize:
+                        stamps[vertex] = timestamp
+                        timestamp += 1
+
+            ## the candidate whose remaining triangles still fit the cache, oldest first
+            fanning = -1
+            best = -1
+            for vertex in candidates:
+                if live[vertex] > 0:
+                    priority = 0
+                    if timestamp - stamps[vertex] + 2 * live[vertex] <= cacheSize:
+                        priority = timestamp - stamps[vertex]
+                    if priority > best:
+                        best = priority
+                        fanning = vertex
+
+            ## dead end, go back to a recent vertex, then to any vertex left
+            if fanning < 0:
+                while deadEnds:
+                    vertex = deadEnds.pop()
+                    if live[vertex] > 0:
+                        fanning = vertex
+                        break
+            if fanning < 0:
+                while cursor < count and live[cursor] == 0:
+                    cursor += 1
+                if cursor < count:
+                    fanning = cursor
+
+        return triangles[order].astype(np.uint32)
+
+
+    @classmethod
+    def reorderVertices(cls, geometry):
+        """Returns geometry with vertices numbered in the order triangles first use them"""
+        indices = np.asarray(geometry['indices']).reshape(-1)
+        _, first, inverse = np.unique(indices, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        reordered = {'indices': rank[inverse.reshape(-1)].reshape(-1, 3).astype(np.uint32)}
+        for name, values in geometry.items():
+            if name != 'indices':
+                reordered[name] = np.ascontiguousarray(np.asarray(values)[indices[first[order]]])
+        return reordered
@@ -0,0 +1,102 @@
+import hashlib
+import numpy as np
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtGui import QOpenGLBuffer
+
+from Source.Graphics.Mesh import Mesh
+
+## singleton registry handing out one set of GPU buffers per unique geometry
+class MeshRegistry(QObject):
+
+    __instance = None
+
+    def __new__(cls):
+        if MeshRegistry.__instance is None:
+            MeshRegistry.__instance = QObject.__new__(cls)
+            MeshRegistry.__instance.initialize()
+        return MeshRegistry.__instance
+
+
+    def initialize(self):
+        """Create empty registry"""
+        self.__instance._meshes = dict()
+        self.__instance._live = set()
+        self.__instance._hits = 0
+        self.__instance._misses = 0
+        self.__instance._buffersAllocated = 0
+        self.__instance._buffersFreed = 0
+
+
+    @classmethod
+    def geometryKey(cls, vertices, normals=None, colors=None, texcoords=None, indices=None):
+        """Returns a key identifying byte-identical geometry"""
+        digest = hashlib.sha1()
+        layout = []
+        for each in (vertices, normals, colors, texcoords, indices):
+            if each is None:
+                layout.append(None)
+            else:
+                each = np.ascontiguousarray(each)
+                layout.append((each.dtype.str, each.nbytes))
+                digest.update(memoryview(each).cast('B'))
+        return (tuple(layout), digest.hexdigest())
+
+
+    def acquire(self, vertices, normals=None, colors=None, texcoords=None, indices=None, usage=QOpenGLBuffer.StaticDraw):
+        """Returns a mesh holding the given geometry, uploading it only if not already on the GPU"""
+
+        ## only static geometry is shared, anything else gets its own buffers
+        key = None
+        if usage == QOpenGLBuffer.StaticDraw:
+            key = self.geometryKey(vertices, normals, colors, texcoords, indices)
+            mesh = self._meshes.get(key, None)
+            if mesh is not None:
+                self._hits += 1
+                mesh.reference()
+                return mesh
+
+        ## not registered, upload it
+        self._misses += 1
+        mesh = Mesh(key)
+        mesh.create(vertices, normals=normals, colors=colors, texcoords=texcoords, indices=indices, usage=usage)
+        mesh.reference()
+        self._buffersAllocated += mesh.numberOfBuffers
+        self._live.add(mesh)
+        if key is not None:
+            self._meshes[key] = mesh
+
+        return mesh
+
+
+    def release(self, mesh):
+        """Drop a reference to mesh, freeing its buffers when no actor uses it anymore"""
+        if mesh.dereference() > 0:
+            return
+
+        self.invalidate(mesh)
+        self._live.discard(mesh)
+        self._buffersFreed += mesh.numberOfBuffers
+        mesh.destroy()
+
+
+    def invalidate(self, mesh):
+        """Stop sharing mesh, e.g. because its contents were modified"""
+        if mesh.key is not None and self._meshes.get(mesh.key, None) is mesh:
+            del self._meshes[mesh.key]
+        mesh.setKey(None)
+
+
+    def statistics(self):
+        """Returns mesh, buffer and memory counters"""
+        return {
+            'meshes': len(self._live),
+            'shared': len(self._meshes),
+            'references': sum(each.references for each in self._live),
+            'buffers': self._buffersAllocated - self._buffersFreed,
+            'buffers_allocated': self._buffersAllocated,
+            'buffers_freed': self._buffersFreed,
+            'bytes': sum(each.bytes for each in self._live),
+            'hits': self._hits,
+            'misses': self._misses
+        }
@@ -0,0 +1,475 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+from Source.Graphics.MeshOptimizer import MeshOptimizer
+
+##  Reduces indexed triangle geometry by quadric error edge collapses, many independent edges at a time.
+class MeshSimplifier(QObject):
+
+    ## weight of the planes holding open edges in place, relative to the faces
+    BoundaryWeight = 10.0
+
+    ## collapses whose optimal point is singular or this many edge lengths away use the best of the endpoints and midpoint
+    MaxOffset = 2.0
+
+    ## passes removing less than this share of the triangles before giving up on the target
+    MinProgress = 0.01
+    MaxStalls = 3
+
+    ## rounds of independent edges picked per pass
+    MatchRounds = 4
+
+    ## edges considered per collapse wanted in a pass, and the bands of cost they are ranked in
+    Spread = 4
+    Bands = 8
+
+    ## quadric components, upper triangle of the symmetric 4 x 4 matrix, then the area accumulated
+    Pairs = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 1), (1, 2), (1, 3), (2, 2), (2, 3), (3, 3)]
+
+
+    @classmethod
+    def simplify(cls, vertices, indices, target=None, error=None, colors=None, normals=None):
+        """Returns vertices, normals, indices and colors reduced to at most target triangles, stopping before collapses move the surface more than error"""
+        state = cls.prepare(vertices, indices, colors, normals)
+        cls.decimate(state, target, error)
+        return cls.geometry(state)
+
+
+    @classmethod
+    def chain(cls, vertices, indices, ratio=0.5, minimum=256, normals=None, colors=None):
+        """Returns levels of detail, the geometry given first, each following one cut to ratio of the triangles of the previous, keeping the hard edges of normals"""
+        levels = [{'vertices': vertices, 'normals': normals, 'indices': indices}]
+        if colors is not None:
+            levels[0]['colors'] = colors
+
+        ## one run, quadrics keep the error of the collapses made for coarser levels
+        state = cls.prepare(vertices, indices, colors, normals)
+        count = len(state['triangles'])
+        while int(count * ratio) >= minimum:
+            cls.decimate(state, int(count * ratio), None)
+
+            ## a level barely coarser than the previous is not worth its buffers
+            if len(state['triangles']) > count * (1.0 + ratio) / 2.0:
+                break
+            count = len(state['triangles'])
+            levels.append(cls.geometry(state))
+        return levels
+
+
+    @classmethod
+    def prepare(cls, vertices, indices, colors=None, normals=None):
+        """Returns the decimation state of geometry: positions welded, their quadrics, the triangles and the edges where normals split"""
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+
+        ## vertices split for their normals or colors are one point of the surface
+        group = cls.groups(vertices)
+        count = int(group.max()) + 1 if len(group) > 0 else 0
+
+        positions = np.zeros((count, 3))
+        positions[group] = vertices
+        triangles = group[indices]
+        valid = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])
+        triangles, indices = triangles[valid], indices[valid]
+
+        ## a triangle listed twice would pin its edges as if they were not manifold
+        corners = np.sort(triangles, axis=1)
+        order = np.lexsort(corners.T[::-1])
+        repeated = np.zeros(len(triangles), dtype=bool)
+        repeated[order[1:]] = np.all(corners[order[1:]] == corners[order[:-1]], axis=1)
+        triangles, indices = triangles[~repeated], indices[~repeated]
+
+        ## hard edges, where the triangles on either side give an end of the edge different normals
+        creases = np.empty(0, dtype=np.int64)
+        if normals is not None:
+            smooth = cls.groups(np.hstack((vertices, np.asarray(normals, dtype=np.float32).reshape(-1, 3))))[indices].reshape(-1)
+            first, second, a, b = cls.pairs(triangles, count)
+            split = (smooth[cls.corner(triangles, first, a)] != smooth[cls.corner(triangles, second, a)]) | \
+                (smooth[cls.corner(triangles, first, b)] != smooth[cls.corner(triangles, second, b)])
+            creases = np.unique(np.minimum(a, b)[split] * count + np.maximum(a, b)[split])
+
+        state = {'positions': positions, 'triangles': triangles, 'creases': creases,
+            'quadrics': cls.quadrics(positions, triangles, creases), 'error': 0.0, 'edges': None}
+        if colors is not None:
+            colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+            weights = np.bincount(group, minlength=count)[:, np.newaxis]
+            state['colors'] = np.stack([np.bincount(group, weights=colors[:, axis], minlength=count) for axis in range(3)], axis=1) / weights
+        return state
+
+
+    @classmethod
+    def groups(cls, table):
+        """Returns the same number for rows of table holding the same floats, negative zero the same as zero"""
+        table = np.ascontiguousarray(table, dtype=np.float32) + np.float32(0.0)
+        columns = table.view(np.uint32)
+        order = np.lexsort(columns.T[::-1])
+        step = np.any(columns[order[1:]] != columns[order[:-1]], axis=1)
+        group = np.empty(len(table), dtype=np.int64)
+        group[order] = np.concatenate(([0], np.cumsum(step)))
+        return group
+
+
+    @classmethod
+    def pairs(cls, triangles, count):
+        """Returns the two triangles and the two ends of every edge shared by exactly two triangles"""
+        first = triangles.reshape(-1)
+        second = triangles[:, [1, 2, 0]].reshape(-1)
+        keys = np.minimum(first, second) * count + np.maximum(first, second)
+        order = np.argsort(keys, kind='stable')
+        same = keys[order[1:]] == keys[order[:-1]]
+        two = np.flatnonzero(same & ~np.append(same[1:], False) & ~np.insert(same[:-1], 0, False))
+        return order[two] // 3, order[two + 1] // 3, first[order[two]], second[order[two]]
+
+
+    @classmethod
+    def corner(cls, triangles, faces, vertices):
+        """Returns the flat corner index of each vertex in its face"""
+        return 3 * faces + np.argmax(triangles[faces] == vertices[:, np.newaxis], axis=1)
+
+
+    @classmethod
+    def quadrics(cls, positions, triangles, creases=()):
+        """Returns the area weighted sum of the planes of the faces, and of the planes holding open and hard edges, around each vertex"""
+        a, b, c = (positions[triangles[:, corner]] for corner in range(3))
+        normals = np.cross(b - a, c - a)
+        areas = np.linalg.norm(normals, axis=1) / 2.0
+        normals /= np.maximum(2.0 * areas, 1e-300)[:, np.newaxis]
+
+        planes = np.hstack((normals, -np.einsum('ij,ij->i', normals, a)[:, np.newaxis]))
+        quadrics = np.zeros((len(cls.Pairs) + 1, len(positions)))
+        cls.accumulate(quadrics, triangles, cls.planeQuadrics(planes, areas))
+
+        ## open edges appear in a single triangle, their plane runs along the edge across the face, hard edges get one from each side
+        first = triangles.reshape(-1)
+        second = triangles[:, [1, 2, 0]].reshape(-1)
+        keys = np.minimum(first, second) * len(positions) + np.maximum(first, second)
+        order = np.argsort(keys, kind='stable')
+        ordered = keys[order]
+        repeated = np.zeros(len(keys), dtype=bool)
+        repeated[order[1:]] = ordered[1:] == ordered[:-1]
+        repeated[order[:-1]] |= ordered[:-1] == ordered[1:]
+        single = np.flatnonzero(~repeated | np.isin(keys, creases))
+        if len(single) > 0:
+            edges = positions[second[single]] - positions[first[single]]
+            lengths = np.linalg.norm(edges, axis=1)
+            across = np.cross(edges, normals[single // 3])
+            across /= np.maximum(np.linalg.norm(across, axis=1), 1e-300)[:, np.newaxis]
+            planes = np.hstack((across, -np.einsum('ij,ij->i', across, positions[first[single]])[:, np.newaxis]))
+            weights = cls.BoundaryWeight * lengths * lengths
+            cls.accumulate(quadrics, np.stack((first[single], second[single]), axis=1), cls.planeQuadrics(planes, weights), areas=False)
+        return quadrics
+
+
+    @classmethod
+    def planeQuadrics(cls, planes, weights):
+        """Returns the weighted quadric components of planes, one row each, with the weight last"""
+        return np.stack([weights * planes[:, i] * planes[:, j] for i, j in cls.Pairs] + [weights])
+
+
+    @classmethod
+    def accumulate(cls, quadrics, corners, values, areas=True):
+        """Add values to the quadrics of every corner, the weight only when it is an area"""
+        rows = len(values) if areas else len(values) - 1
+        for corner in range(corners.shape[1]):
+            for row in range(rows):
+                quadrics[row] += np.bincount(corners[:, corner], weights=values[row], minlength=quadrics.shape[1])
+
+
+    @classmethod
+    def cost(cls, q, points):
+        """Returns the quadric error of points"""
+        x, y, z = points
+        return (q[0] * x * x + 2.0 * (q[1] * x * y + q[2] * x * z + q[3] * x) +
+            q[4] * y * y + 2.0 * (q[5] * y * z + q[6] * y) +
+            q[7] * z * z + 2.0 * q[8] * z + q[9])
+
+
+    @classmethod
+    def optimalPoints(cls, q, first, second):
+        """Returns the points of least error of summed quadrics, one row per axis, with their error"""
+
+        ## closed form inverse of the symmetric 3 x 3 part, no per edge matrices are built
+        c00 = q[4] * q[7] - q[5] * q[5]
+        c01 = q[2] * q[5] - q[1] * q[7]
+        c02 = q[1] * q[5] - q[2] * q[4]
+        c11 = q[0] * q[7] - q[2] * q[2]
+        c12 = q[1] * q[2] - q[0] * q[5]
+        c22 = q[0] * q[4] - q[1] * q[1]
+        determinant = q[0] * c00 + q[1] * c01 + q[2] * c02
+        trace = q[0] + q[4] + q[7]
+        solvable = np.abs(determinant) > 1e-9 * trace * trace * trace
+        scale = -1.0 / np.where(solvable, determinant, 1.0)
+        points = np.stack((
+            (c00 * q[3] + c01 * q[6] + c02 * q[8]) * scale,
+            (c01 * q[3] + c11 * q[6] + c12 * q[8]) * scale,
+            (c02 * q[3] + c12 * q[6] + c22 * q[8]) * scale))
+
+        ## near singular quadrics put the point far along a flat or straight region
+        middle = (first + second) / 2.0
+        lengths = np.sqrt(((second - first) ** 2).sum(axis=0))
+        solvable &= np.sqrt(((points - middle) ** 2).sum(axis=0)) <= cls.MaxOffset * lengths
+        errors = cls.cost(q, points)
+
+        ## the solved point is the least of a positive definite quadric, the others pick the best of three
+        fallback = np.flatnonzero(~solvable)
+        if len(fallback) > 0:
+            q = q[:, fallback]
+            best = np.full(len(fallback), np.inf)
+            for candidate in (first[:, fallback], second[:, fallback], middle[:, fallback]):
+                candidateErrors = cls.cost(q, candidate)
+                better = candidateErrors < best
+                points[:, fallback[better]] = candidate[:, better]
+                best[better] = candidateErrors[better]
+            errors[fallback] = best
+        return points, np.maximum(errors, 0.0)
+
+
+    @classmethod
+    def decimate(cls, state, target=None, error=None):
+        """Collapse edges of the state until it has at most target triangles or no collapse stays within error"""
+        target = 0 if target is None else target
+        limit = np.inf if error is None else error
+        stalls = 0
+        while len(state['triangles']) > target and stalls < cls.MaxStalls:
+            before = len(state['triangles'])
+            if cls.collapse(state, (before - target + 1) // 2, limit) == 0:
+                break
+
+            ## collapses held back by flips or topology leave too little to do
+            if len(state['triangles']) > before * (1.0 - cls.MinProgress):
+                stalls += 1
+
+
+    @classmethod
+    def edges(cls, triangles, count):
+        """Returns the sorted keys of the edges of triangles, the edges lower vertex first, and the number of triangles sharing each"""
+        first = triangles.reshape(-1)
+        second = triangles[:, [1, 2, 0]].reshape(-1)
+        keys, faces = np.unique(np.minimum(first, second) * count + np.maximum(first, second), return_counts=True)
+        return keys, np.stack((keys // count, keys % count), axis=1), faces
+
+
+    @classmethod
+    def match(cls, edges, candidates, rank, count):
+        """Returns the candidates cheapest among the candidates around their vertices and the vertices next to them"""
+        best = np.full(count, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(best, edges[candidates, 0], rank[candidates])
+        np.minimum.at(best, edges[candidates, 1], rank[candidates])
+
+        ## spread over one ring, so that edges taken together never meet in a triangle
+        near = best.copy()
+        np.minimum.at(near, edges[:, 0], best[edges[:, 1]])
+        np.minimum.at(near, edges[:, 1], best[edges[:, 0]])
+        return candidates[(near[edges[candidates, 0]] == rank[candidates]) & (near[edges[candidates, 1]] == rank[candidates])]
+
+
+    @classmethod
+    def collapse(cls, state, wanted, limit):
+        """Collapse up to wanted edges no two of which meet in a triangle, returns the number collapsed"""
+        positions, triangles, quadrics = state['positions'], state['triangles'], state['quadrics']
+        count = len(positions)
+        keys, edges, faces = cls.edges(triangles, count)
+
+        ## edges whose vertices the last pass left alone keep their point and error
+        points = np.empty((3, len(edges)))
+        errors = np.empty(len(edges))
+        update = np.arange(len(edges))
+        if state['edges'] is not None:
+            previousKeys, previousPoints, previousErrors, changed = state['edges']
+            at = np.minimum(np.searchsorted(previousKeys, keys), len(previousKeys) - 1)
+            same = (previousKeys[at] == keys) & ~changed[edges[:, 0]] & ~changed[edges[:, 1]]
+            points[:, same] = previousPoints[:, at[same]]
+            errors[same] = previousErrors[at[same]]
+            update = np.flatnonzero(~same)
+        ends = edges[update]
+        points[:, update], errors[update] = cls.optimalPoints(quadrics[:, ends[:, 0]] + quadrics[:, ends[:, 1]],
+            positions[ends[:, 0]].T, positions[ends[:, 1]].T)
+
+        ## error as the distance to the planes of the area merged, in the units of the positions
+        distances = np.sqrt(errors / np.maximum(quadrics[-1, edges[:, 0]] + quadrics[-1, edges[:, 1]], 1e-300))
+        state['edges'] = (keys, points, errors, np.zeros(count, dtype=bool))
+        candidates = np.flatnonzero(distances <= limit)
+        if len(candidates) == 0:
+            return 0
+
+        ## the cheapest edges, in bands of cost shuffled within, so that smooth regions still hold many local minima
+        candidates = candidates[np.argsort(errors[candidates], kind='stable')][:cls.Spread * max(wanted, 1)]
+        shuffle = np.random.default_rng(len(triangles)).permutation(len(candidates))
+        rank = np.empty(len(edges), dtype=np.int64)
+        rank[candidates] = np.arange(len(candidates)) * cls.Bands // len(candidates) * len(candidates) + shuffle
+
+        ## rounds of edges cheapest around them, away from the triangles earlier rounds change
+        neighbors = cls.adjacency(edges, count)
+        boundary = np.zeros(count, dtype=bool)
+        boundary[edges[faces == 1].reshape(-1)] = True
+        blocked = np.zeros(count, dtype=bool)
+        chosen = []
+        for _ in range(cls.MatchRounds):
+            candidates = candidates[~blocked[edges[candidates, 0]] & ~blocked[edges[candidates, 1]]]
+            if len(candidates) == 0:
+                break
+            picked = cls.match(edges, candidates, rank, count)
+
+            ## edges pinching the surface drop out, the next round may take their neighbors
+            valid = cls.linkCondition(edges[picked], faces[picked], neighbors, boundary)
+            candidates = np.setdiff1d(candidates, picked[~valid], assume_unique=True)
+            picked = picked[valid]
+
+            ends = np.zeros(count, dtype=bool)
+            ends[edges[picked].reshape(-1)] = True
+            blocked |= ends
+            blocked[edges[ends[edges[:, 0]], 1]] = True
+            blocked[edges[ends[edges[:, 1]], 0]] = True
+            chosen.append(picked)
+        chosen = np.concatenate(chosen)
+        chosen = chosen[np.argsort(rank[chosen])][:max(wanted, 1)]
+
+        ## collapses turning a triangle over are put off
+        chosen = cls.rejectConflicts(positions, triangles, edges, points, rank, chosen)
+        if len(chosen) == 0:
+            return 0
+
+        kept, removed = edges[chosen, 0], edges[chosen, 1]
+        state['edges'][3][kept] = True
+        positions[kept] = points[:, chosen].T
+        quadrics[:, kept] += quadrics[:, removed]
+        if 'colors' in state:
+            state['colors'][kept] = (state['colors'][kept] + state['colors'][removed]) / 2.0
+        state['error'] = max(state['error'], float(distances[chosen].max()))
+
+        remap = np.arange(count)
+        remap[removed] = kept
+        triangles = remap[triangles]
+
+        ## hard edges follow their ends, and vanish when collapsed themselves
+        creases = state['creases']
+        if len(creases) > 0:
+            first, second = remap[creases // count], remap[creases % count]
+            apart = first != second
+            state['creases'] = np.unique(np.minimum(first, second)[apart] * count + np.maximum(first, second)[apart])
+        state['triangles'] = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])]
+        return len(chosen)
+
+
+    @classmethod
+    def adjacency(cls, edges, count):
+        """Returns the offsets of the neighbors of every vertex, and the neighbors"""
+        source = np.concatenate((edges[:, 0], edges[:, 1]))
+        target = np.concatenate((edges[:, 1], edges[:, 0]))
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(source, minlength=count))))
+        return offsets, target[np.argsort(source, kind='stable')]
+
+
+    @classmethod
+    def linkCondition(cls, edges, faces, adjacency, boundary):
+        """Returns which edges collapse without pinching the surface: their vertices share only the vertices across the edge"""
+        offsets, neighbors = adjacency
+        count = len(offsets) - 1
+
+        ## neighbors of both ends of every edge, a neighbor counted twice is shared
+        ends = edges.reshape(-1)
+        degrees = offsets[ends + 1] - offsets[ends]
+        owner = np.repeat(np.repeat(np.arange(len(edges)), 2), degrees)
+        within = np.arange(len(owner)) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+        keys = np.sort(owner * count + neighbors[np.repeat(offsets[ends], degrees) + within])
+        shared = np.bincount(keys[1:][keys[1:] == keys[:-1]] // count, minlength=len(edges))
+
+        ## an interior edge between two open boundaries would join them at a point
+        return (faces <= 2) & (shared == faces) & ~((faces == 2) & boundary[edges[:, 0]] & boundary[edges[:, 1]])
+
+
+    @classmethod
+    def rejectConflicts(cls, positions, triangles, edges, points, rank, chosen):
+        """Returns the chosen collapses left once those sharing a triangle with a cheaper one, or turning a triangle over, are dropped"""
+        while len(chosen) > 0:
+            moved = np.full(len(positions), -1, dtype=np.int64)
+            moved[edges[chosen].reshape(-1)] = np.repeat(chosen, 2)
+            corners = moved[triangles]
+            touched = (corners >= 0).any(axis=1)
+            faces, corners = triangles[touched], corners[touched]
+
+            ## a triangle may only change through one collapse, the cheapest
+            highest = corners.max(axis=1)
+            lowest = np.where(corners >= 0, corners, highest[:, np.newaxis]).min(axis=1)
+            shared = lowest != highest
+            if shared.any():
+                vetoed = np.where(rank[highest[shared]] > rank[lowest[shared]], highest[shared], lowest[shared])
+                chosen = np.setdiff1d(chosen, vetoed)
+                continue
+
+            ## triangles not collapsed must keep their side facing out
+            remaining = (corners >= 0).sum(axis=1) == 1
+            faces, corners = faces[remaining], corners[remaining]
+            old = positions[faces]
+            new = np.where((corners >= 0)[:, :, np.newaxis], points.T[np.maximum(corners, 0)], old)
+            oldNormals = np.cross(old[:, 1] - old[:, 0], old[:, 2] - old[:, 0])
+            newNormals = np.cross(new[:, 1] - new[:, 0], new[:, 2] - new[:, 0])
+            flipped = np.einsum('ij,ij->i', oldNormals, newNormals) <= 0.0
+            if not flipped.any():
+                break
+            chosen = np.setdiff1d(chosen, corners[flipped].max(axis=1))
+        return chosen
+
+
+    @classmethod
+    def geometry(cls, state):
+        """Returns the state as float32 vertices, normals and colors and uint32 indices, ordered for the vertex cache"""
+        triangles = state['triangles']
+        positions = state['positions']
+
+        ## corners meeting across hard edges are separate vertices, each with the normal of its own side
+        corners = triangles.reshape(-1)
+        if len(state['creases']) > 0:
+            corners = cls.smoothCorners(triangles, len(positions), state['creases'])
+        used, first, inverse = np.unique(corners, return_index=True, return_inverse=True)
+        indices = inverse.reshape(-1, 3)
+        points = triangles.reshape(-1)[first]
+        vertices = positions[points].astype(np.float32)
+
+        ## area weighted normals of the faces around each vertex
+        faces = np.repeat(np.cross(vertices[indices[:, 1]] - vertices[indices[:, 0]], vertices[indices[:, 2]] - vertices[indices[:, 0]]), 3, axis=0)
+        normals = np.stack([np.bincount(indices.reshape(-1), weights=faces[:, axis], minlength=len(vertices)) for axis in range(3)], axis=1)
+
+        ## a side holding only slivers along a hard edge takes the normal of the whole point
+        empty = np.flatnonzero(~normals.any(axis=1))
+        if len(empty) > 0:
+            around = np.stack([np.bincount(triangles.reshape(-1), weights=faces[:, axis], minlength=len(positions)) for axis in range(3)], axis=1)
+            normals[empty] = around[points[empty]]
+        lengths = np.linalg.norm(normals, axis=1)
+        lengths[lengths == 0.0] = 1.0
+
+        geometry = {
+            'vertices': vertices,
+            'normals': (normals / lengths[:, np.newaxis]).astype(np.float32),
+            'indices': indices.astype(np.uint32)
+        }
+        if 'colors' in state:
+            geometry['colors'] = state['colors'][points].astype(np.float32)
+
+        ## collapses leave the surviving triangles in their old order, around holes in the cache
+        geometry = MeshOptimizer.reorder(geometry)
+        geometry['error'] = state['error']
+        return geometry
+
+
+    @classmethod
+    def smoothCorners(cls, triangles, count, creases):
+        """Returns for every corner the lowest corner of the same vertex reached without crossing a hard edge"""
+        first, second, a, b = cls.pairs(triangles, count)
+        smooth = ~np.isin(np.minimum(a, b) * count + np.maximum(a, b), creases)
+        first, second, a, b = first[smooth], second[smooth], a[smooth], b[smooth]
+        left = np.concatenate((cls.corner(triangles, first, a), cls.corner(triangles, first, b)))
+        right = np.concatenate((cls.corner(triangles, second, a), cls.corner(triangles, second, b)))
+
+        ## spread the lowest label over the corners joined around each vertex
+        labels = np.arange(triangles.size)
+        while True:
+            lowest = np.minimum(labels[left], labels[right])
+            spread = labels.copy()
+            np.minimum.at(spread, left, lowest)
+            np.minimum.at(spread, right, lowest)
+            spread = spread[spread]
+            if np.array_equal(spread, labels):
+                return labels
+            labels = spread
@@ -0,0 +1,176 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject, QSize
+from PyQt5.QtGui import QVector3D, QQuaternion, QImage, QSurfaceFormat, QOpenGLContext, QOffscreenSurface, QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+
+from OpenGL import GL
+from Source.Graphics.World import World
+from Source.Graphics.Gnomon import Gnomon
+from Source.Graphics.Profiler import Profiler
+from Source.Graphics.BufferUpload import BufferUpload
+
+##  Renders the world into a framebuffer object without a window.
+class OffscreenRenderer(QObject):
+
+    ## initialization
+    def __init__(self, width=800, height=600, **kwargs):
+        """Initialize offscreen context, surface and scenes."""
+        super(OffscreenRenderer, self).__init__()
+
+        self._width = width
+        self._height = height
+        self._samples = kwargs.get("samples", QSurfaceFormat.defaultFormat().samples())
+        self._showGnomon = kwargs.get("gnomon", True)
+
+        ## same home orientation as the interactive renderer
+        self._rotation = kwargs.get("rotation", QQuaternion.fromAxisAndAngle(QVector3D(1.0, 0.0, 0.0), 25.0) * QQuaternion.fromAxisAndAngle(QVector3D(0.0, 1.0, 0.0), -50.0))
+
+        ## scenes take this object as their viewer
+        self._world = World(self, home_position=kwargs.get("home_position", QVector3D(0, 0, 3.5)))
+        self._gnomon = Gnomon(self)
+
+        self._context = None
+        self._surface = None
+        self._framebuffer = None
+        self._initialized = False
+
+
+    def width(self):
+        """Returns width of the rendered frames in pixels"""
+        return self._width
+
+
+    def height(self):
+        """Returns height of the rendered frames in pixels"""
+        return self._height
+
+
+    def devicePixelRatio(self):
+        """Frames are rendered at their pixel size"""
+        return 1.0
+
+
+    def requestRedraw(self):
+        """Frames are rendered when the caller asks for them"""
+        pass
+
+
+    @property
+    def world(self):
+        return self._world
+
+
+    @property
+    def rotation(self):
+        return self._rotation
+
+
+    def setRotation(self, rotation):
+        """Sets the rotation of the scene, as the trackball of the interactive renderer does"""
+        self._rotation = rotation
+
+
+    def makeCurrent(self):
+        """Make the offscreen context current"""
+        if not self._context.makeCurrent(self._surface):
+            raise RuntimeError("Unable to make offscreen OpenGL context current")
+
+
+    def doneCurrent(self):
+        self._context.doneCurrent()
+
+
+    def initialize(self):
+        """Create context, surface and framebuffer, then initialize the scenes"""
+        if self._initialized:
+            return
+
+        self._context = QOpenGLContext()
+        self._context.setFormat(QSurfaceFormat.defaultFormat())
+        if not self._context.create():
+            raise RuntimeError("Unable to create offscreen OpenGL context")
+
+        self._surface = QOffscreenSurface()
+        self._surface.setFormat(self._context.format())
+        self._surface.create()
+        self.makeCurrent()
+
+        ## color and depth attachments, multisampled frames are resolved when read
+        format = QOpenGLFramebufferObjectFormat()
+        format.setAttachment(QOpenGLFramebufferObject.CombinedDepthStencil)
+        format.setSamples(self._samples)
+        self._framebuffer = QOpenGLFramebufferObject(QSize(self._width, self._height), format)
+        if not self._framebuffer.isValid():
+            raise RuntimeError("Unable to create offscreen framebuffer")
+
+        GL.glEnable(GL.GL_DEPTH_TEST)
+        GL.glEnable(GL.GL_DEPTH_CLAMP)
+        GL.glEnable(GL.GL_MULTISAMPLE)
+        GL.glEnable(GL.GL_FRAMEBUFFER_SRGB)
+        GL.glClearColor(0.75, 0.76, 0.76, 0.0)
+
+        self._world.initialize()
+        self._gnomon.initialize()
+        self._world.camera.setAspectRatio(self._width / float(self._height))
+
+        self._initialized = True
+
+
+    def render(self):
+        """Render one frame into the framebuffer"""
+        self.initialize()
+        self.makeCurrent()
+        self._framebuffer.bind()
+
+        Profiler().beginFrame()
+        GL.glViewport(0, 0, self._width, self._height)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+        self._world.camera.setRotation(self._rotation.inverted())
+        self._gnomon.camera.setRotation(self._rotation.inverted())
+        self._world.render()
+
+        if self._showGnomon:
+            with Profiler().scope("gnomon"):
+                self._gnomon.render()
+        Profiler().endFrame()
+        BufferUpload().endFrame()
+
+        self._framebuffer.release()
+
+
+    def image(self):
+        """Returns the last rendered frame"""
+        self.makeCurrent()
+        return self._framebuffer.toImage()
+
+
+    def pixels(self):
+        """Returns the last rendered frame as a height x width x 4 array of bytes, top row first"""
+        image = self.image().convertToFormat(QImage.Format_RGBA8888)
+        bits = image.constBits()
+        bits.setsize(image.byteCount())
+        return np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())[:, :4 * image.width()].reshape(image.height(), image.width(), 4).copy()
+
+
+    def save(self, filename, format="png"):
+        """Write the last rendered frame as an image, or as raw RGBA bytes when format is raw"""
+        if format == "raw":
+            self.pixels().tofile(filename)
+        elif not self.image().save(filename, format.upper()):
+            raise IOError("Unable to write frame to {}".format(filename))
+
+
+    def destroy(self):
+        """Free scenes, framebuffer and context"""
+        if not self._initialized:
+            return
+        self.makeCurrent()
+        self._world.clear()
+        self._gnomon.clear()
+        Profiler().destroy()
+        self._framebuffer = None
+        self.doneCurrent()
+        self._surface.destroy()
+        self._context = None
+        self._initialized = False
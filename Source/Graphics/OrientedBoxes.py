@@ -0,0 +1,89 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+##  Packed oriented boxes intersected with one or many rays at once.
+class OrientedBoxes(QObject):
+
+    ## layout of a packed box: center, unit axes as rows, half lengths and pick factor
+    Center = slice(0, 3)
+    Axes = slice(3, 12)
+    Halves = slice(12, 15)
+    Factor = 15
+    Size = 16
+
+    ## rays closer than this to parallel with a slab are not clipped by it
+    Parallel = 10E-6
+
+
+    ## initialization
+    def __init__(self, boxes):
+        """Initialize from an array of packed boxes, one per row."""
+        super(OrientedBoxes, self).__init__()
+
+        self._boxes = np.array(boxes, dtype=np.float64, ndmin=2).reshape(-1, OrientedBoxes.Size)
+
+
+    @property
+    def count(self):
+        """Returns the number of boxes"""
+        return len(self._boxes)
+
+
+    @property
+    def boxes(self):
+        """Returns the packed boxes"""
+        return self._boxes
+
+
+    @classmethod
+    def pack(cls, transform, pickFactor=1.0):
+        """Returns the packed box of the unit cube placed by a transform"""
+        xform = np.array(transform.data(), dtype=np.float64).reshape(4, 4).T
+
+        ## axes are the normalized columns, degenerate ones are left zero
+        columns = xform[:3, :3].T
+        lengths = np.sqrt((columns ** 2).sum(axis=1))
+        axes = np.zeros((3, 3))
+        valid = lengths ** 2 > 1e-12
+        axes[valid] = columns[valid] / lengths[valid, None]
+
+        box = np.empty(OrientedBoxes.Size)
+        box[OrientedBoxes.Center] = xform[:3, 3]
+        box[OrientedBoxes.Axes] = axes.ravel()
+        box[OrientedBoxes.Halves] = np.sqrt((xform[:3, :3] ** 2).sum(axis=1)) / 2.0
+        box[OrientedBoxes.Factor] = pickFactor
+        return box
+
+
+    def intersect(self, origins, directions):
+        """Returns hit mask and distances of shape (rays, boxes), distance is inf where missed.
+
+        The distance is where the ray enters the box, or leaves it when starting inside."""
+        origins = np.array(origins, dtype=np.float64, ndmin=2)
+        directions = np.array(directions, dtype=np.float64, ndmin=2)
+
+        centers = self._boxes[:, OrientedBoxes.Center]
+        axes = self._boxes[:, OrientedBoxes.Axes].reshape(-1, 3, 3)[None]
+        halves = self._boxes[:, OrientedBoxes.Halves][None]
+        scaled = halves * self._boxes[:, OrientedBoxes.Factor, None][None]
+
+        ## project center offsets and directions on the box axes, written out so
+        ## that results do not depend on how many rays or boxes are tested
+        point = (centers[None] - origins[:, None])[:, :, None, :]
+        e = point[..., 0] * axes[..., 0] + point[..., 1] * axes[..., 1] + point[..., 2] * axes[..., 2]
+        direction = directions[:, None, None, :]
+        f = direction[..., 0] * axes[..., 0] + direction[..., 1] * axes[..., 1] + direction[..., 2] * axes[..., 2]
+
+        ## slab distances, rays parallel to a slab must start inside it
+        parallel = np.abs(f) <= OrientedBoxes.Parallel
+        f = np.where(parallel, 1.0, f)
+        t1 = (e + scaled) / f
+        t2 = (e - scaled) / f
+        tMin = np.where(parallel, -np.inf, np.minimum(t1, t2)).max(axis=2)
+        tMax = np.where(parallel, np.inf, np.maximum(t1, t2)).min(axis=2)
+        outside = (parallel & (np.abs(e) > halves)).any(axis=2)
+
+        hits = ~outside & (tMin <= tMax) & (tMax >= 0.0)
+        distances = np.where(hits, np.where(tMin > 0.0, tMin, tMax), np.inf)
+        return hits, distances
@@ -0,0 +1,257 @@
+import json
+import time
+import collections
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+from OpenGL import GL
+
+##  Nested CPU and GPU timing scopes of the frames most recently rendered.
+class Profiler(QObject):
+
+    ## singleton
+    __instance = None
+
+    ## fields of a recorded scope
+    class Field:
+        Name = 0
+        Depth = 1
+        CPUStart = 2
+        CPUEnd = 3
+        QueryStart = 4
+        QueryEnd = 5
+        GPUStart = 6
+        GPUEnd = 7
+
+
+    class Scope:
+        """Times the code inside a with statement"""
+
+        def __init__(self, profiler, name, gpu):
+            self._profiler = profiler
+            self._name = name
+            self._gpu = gpu
+
+
+        def __enter__(self):
+            self._profiler.begin(self._name, self._gpu)
+            return self
+
+
+        def __exit__(self, *args):
+            self._profiler.end()
+            return False
+
+
+    class NullScope:
+        """Stands in for a scope while profiling is off"""
+
+        def __enter__(self):
+            return self
+
+
+        def __exit__(self, *args):
+            return False
+
+
+    def __new__(cls):
+        if Profiler.__instance is None:
+            Profiler.__instance = QObject.__new__(cls)
+            Profiler.__instance.initialize()
+        return Profiler.__instance
+
+
+    def initialize(self, frames=240, queries=1024):
+        """Create empty profiler keeping the last frames and using at most queries GPU timestamps"""
+        self.__instance._enabled = False
+        self.__instance._frames = collections.deque(maxlen=frames)
+        self.__instance._pending = collections.deque()
+        self.__instance._current = None
+        self.__instance._stack = []
+        self.__instance._frameNumber = 0
+        self.__instance._maxQueries = queries
+        self.__instance._queries = []
+        self.__instance._free = []
+        self.__instance._null = Profiler.NullScope()
+
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+
+    def setEnabled(self, state):
+        """Turn recording of frames on or off"""
+        self._enabled = state
+
+
+    def isRecording(self):
+        """Returns whether a frame is being recorded"""
+        return self._current is not None
+
+
+    def acquireQuery(self):
+        """Returns a free timestamp query, None once all of them are in flight"""
+        if not self._free:
+            if len(self._queries) >= self._maxQueries:
+                return None
+            count = min(64, self._maxQueries - len(self._queries))
+            ids = [int(each) for each in np.atleast_1d(GL.glGenQueries(count))]
+            self._queries.extend(ids)
+            self._free.extend(ids)
+        return self._free.pop()
+
+
+    def beginFrame(self):
+        """Start recording a frame, finished frames are read back first"""
+        self.collect()
+        if not self._enabled:
+            return
+        self._current = {'frame': self._frameNumber, 'scopes': []}
+        self._frameNumber += 1
+        self._stack = []
+        self.begin("frame")
+
+
+    def endFrame(self):
+        """Finish the frame, it is kept once its GPU times are available"""
+        if self._current is None:
+            return
+        while self._stack:
+            self.end()
+        self._pending.append(self._current)
+        self._current = None
+
+
+    def scope(self, name, gpu=True):
+        """Returns a context manager timing a named scope, nested in the enclosing one"""
+        if self._current is None:
+            return self._null
+        return Profiler.Scope(self, name, gpu)
+
+
+    def begin(self, name, gpu=True):
+        """Open a named scope"""
+        if self._current is None:
+            return
+        query = self.acquireQuery() if gpu else None
+        if query is not None:
+            GL.glQueryCounter(query, GL.GL_TIMESTAMP)
+        record = [name, len(self._stack), time.perf_counter_ns(), None, query, None, None, None]
+        self._current['scopes'].append(record)
+        self._stack.append(record)
+
+
+    def end(self):
+        """Close the innermost scope"""
+        if self._current is None or not self._stack:
+            return
+        record = self._stack.pop()
+        record[Profiler.Field.CPUEnd] = time.perf_counter_ns()
+        if record[Profiler.Field.QueryStart] is not None:
+            query = self.acquireQuery()
+            if query is None:
+                self._free.append(record[Profiler.Field.QueryStart])
+                record[Profiler.Field.QueryStart] = None
+            else:
+                GL.glQueryCounter(query, GL.GL_TIMESTAMP)
+                record[Profiler.Field.QueryEnd] = query
+
+
+    def collect(self):
+        """Read back GPU times of finished frames without waiting, oldest first"""
+        while self._pending:
+            frame = self._pending[0]
+            queries = [query for record in frame['scopes'] for query in record[Profiler.Field.QueryStart:Profiler.Field.QueryEnd + 1] if query is not None]
+            if queries and not GL.glGetQueryObjectiv(queries[-1], GL.GL_QUERY_RESULT_AVAILABLE):
+                break
+
+            for record in frame['scopes']:
+                if record[Profiler.Field.QueryEnd] is not None:
+                    record[Profiler.Field.GPUStart] = int(GL.glGetQueryObjectui64v(record[Profiler.Field.QueryStart], GL.GL_QUERY_RESULT))
+                    record[Profiler.Field.GPUEnd] = int(GL.glGetQueryObjectui64v(record[Profiler.Field.QueryEnd], GL.GL_QUERY_RESULT))
+                record[Profiler.Field.QueryStart] = record[Profiler.Field.QueryEnd] = None
+            self._free.extend(queries)
+            self._frames.append(self._pending.popleft())
+
+
+    def frames(self):
+        """Returns the recorded frames, oldest first"""
+        return list(self._frames)
+
+
+    def clear(self):
+        """Forget recorded frames"""
+        self._frames.clear()
+
+
+    def summary(self):
+        """Returns mean CPU and GPU milliseconds per scope name over the recorded frames"""
+        totals = collections.OrderedDict()
+        for frame in self._frames:
+            for record in frame['scopes']:
+                total = totals.setdefault(record[Profiler.Field.Name], [0, 0.0, 0, 0.0])
+                total[0] += 1
+                total[1] += (record[Profiler.Field.CPUEnd] - record[Profiler.Field.CPUStart]) / 1000000.0
+                if record[Profiler.Field.GPUStart] is not None:
+                    total[2] += 1
+                    total[3] += (record[Profiler.Field.GPUEnd] - record[Profiler.Field.GPUStart]) / 1000000.0
+
+        return collections.OrderedDict((name, {
+            'count': count,
+            'cpu': cpu / count,
+            'gpu': gpu / gpuCount if gpuCount > 0 else None
+        }) for name, (count, cpu, gpuCount, gpu) in totals.items())
+
+
+    def traceEvents(self):
+        """Returns the recorded frames as Chrome trace events, CPU and GPU on separate threads"""
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'CPU'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 1, 'args': {'name': 'GPU'}}
+        ]
+
+        origin = None
+        for frame in self._frames:
+            scopes = frame['scopes']
+            if origin is None:
+                origin = scopes[0][Profiler.Field.CPUStart]
+
+            ## GPU clock is unrelated to the CPU one, GPU work is lined up with the start of its frame
+            frameStart = scopes[0][Profiler.Field.CPUStart]
+            gpuOrigin = scopes[0][Profiler.Field.GPUStart]
+
+            for record in scopes:
+                args = {'frame': frame['frame'], 'depth': record[Profiler.Field.Depth]}
+                events.append({
+                    'name': record[Profiler.Field.Name], 'cat': 'cpu', 'ph': 'X', 'pid': 0, 'tid': 0,
+                    'ts': (record[Profiler.Field.CPUStart] - origin) / 1000.0,
+                    'dur': (record[Profiler.Field.CPUEnd] - record[Profiler.Field.CPUStart]) / 1000.0,
+                    'args': args})
+
+                if record[Profiler.Field.GPUStart] is not None and gpuOrigin is not None:
+                    events.append({
+                        'name': record[Profiler.Field.Name], 'cat': 'gpu', 'ph': 'X', 'pid': 0, 'tid': 1,
+                        'ts': (frameStart - origin + record[Profiler.Field.GPUStart] - gpuOrigin) / 1000.0,
+                        'dur': (record[Profiler.Field.GPUEnd] - record[Profiler.Field.GPUStart]) / 1000.0,
+                        'args': args})
+
+        return events
+
+
+    def exportChromeTrace(self, filename):
+        """Write the recorded frames to a file loadable by chrome://tracing or Perfetto"""
+        with open(filename, "w") as stream:
+            json.dump({'traceEvents': self.traceEvents(), 'displayTimeUnit': 'ms'}, stream)
+
+
+    def destroy(self):
+        """Free query objects, frames still waiting for their GPU times are dropped"""
+        if self._queries:
+            GL.glDeleteQueries(len(self._queries), self._queries)
+        self._queries = []
+        self._free = []
+        self._pending.clear()
+        self._current = None
+        self._stack = []
@@ -0,0 +1,111 @@
+import math
+
+from PyQt5.QtCore import QObject, QTimer, QElapsedTimer, Qt
+
+##  Repaints a widget only when asked to, never faster than a frame rate cap.
+class RedrawScheduler(QObject):
+
+    ## initialization
+    def __init__(self, widget, **kwargs):
+        """Initialize scheduler repainting widget."""
+        super(RedrawScheduler, self).__init__(widget)
+
+        self._widget = widget
+        self._interval = 0.0
+        self.setMaxFrameRate(kwargs.get("frame_rate", 60.0))
+
+        ## predicate telling whether something keeps moving after a frame
+        self._continuous = kwargs.get("continuous", None)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._widget.update)
+
+        ## state that changes without telling anyone is compared at a slow rate
+        self._watches = []
+        self._watchTimer = QTimer(self)
+        self._watchTimer.setInterval(kwargs.get("watch_interval", 100))
+        self._watchTimer.timeout.connect(self.check)
+
+        self._clock = QElapsedTimer()
+        self._clock.start()
+        self._lastFrame = None
+        self._pending = False
+        self._frames = 0
+        self._requests = 0
+        self._skipped = 0
+
+
+    @property
+    def maxFrameRate(self):
+        """Returns the frame rate cap, 0 when uncapped"""
+        return 1000.0 / self._interval if self._interval > 0.0 else 0.0
+
+
+    def setMaxFrameRate(self, rate):
+        """Sets the highest number of frames per second, 0 for no cap"""
+        self._interval = 1000.0 / rate if rate > 0.0 else 0.0
+
+
+    def isPending(self):
+        """Returns whether a frame has been asked for and not drawn yet"""
+        return self._pending
+
+
+    def requestRedraw(self):
+        """Ask for a frame, requests arriving before it is drawn are merged into it"""
+        self._requests += 1
+        if self._pending:
+            self._skipped += 1
+            return
+        self._pending = True
+
+        ## wait for the rest of the frame interval when the last frame was recent
+        delay = 0.0
+        if self._lastFrame is not None:
+            delay = max(0.0, self._interval - (self._clock.elapsed() - self._lastFrame))
+        self._timer.start(int(math.ceil(delay)))
+
+
+    def frameStarted(self):
+        """Called when the widget starts painting, whoever asked for it"""
+        self._timer.stop()
+        self._pending = False
+        self._lastFrame = self._clock.elapsed()
+
+
+    def frameFinished(self):
+        """Called when the widget is done painting, keeps drawing while something moves"""
+        self._frames += 1
+        if self._continuous is not None and self._continuous():
+            self.requestRedraw()
+
+
+    def watch(self, stamp):
+        """Redraw whenever the value returned by stamp changes"""
+        self._watches.append([stamp, stamp()])
+        if not self._watchTimer.isActive():
+            self._watchTimer.start()
+
+
+    def check(self):
+        """Compare watched state with what was last drawn"""
+        changed = False
+        for each in self._watches:
+            value = each[0]()
+            if value != each[1]:
+                each[1] = value
+                changed = True
+        if changed:
+            self.requestRedraw()
+
+
+    def statistics(self):
+        """Returns frames drawn, redraws asked for and requests merged into a pending frame"""
+        return {
+            'frames': self._frames,
+            'requests': self._requests,
+            'skipped': self._skipped,
+            'max_frame_rate': self.maxFrameRate
+        }
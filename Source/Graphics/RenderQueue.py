@@ -0,0 +1,243 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtGui import QVector4D
+
+from OpenGL import GL
+from Source.Graphics.Actor import Actor
+from Source.Graphics.InstanceBatch import InstanceBatch
+from Source.Graphics.Profiler import Profiler
+
+##  Collects the draw items of a frame and renders them sorted by GL state.
+class RenderQueue(QObject):
+
+    ## order in which render types are drawn
+    Order = {
+        Actor.RenderType.Solid: 0,
+        Actor.RenderType.NoType: 1,
+        Actor.RenderType.Transparent: 2,
+        Actor.RenderType.Overlay: 3
+    }
+
+
+    ## profiler scope names of each pass
+    PassNames = ("first pass", "second pass")
+
+
+    ## initialization
+    def __init__(self, scene, **kwargs):
+        """Initialize render queue."""
+        super(RenderQueue, self).__init__()
+
+        self._scene = scene
+        self._instancing = kwargs.get("instancing", True)
+        self._items = []
+        self._batches = dict()
+        self._statistics = {}
+
+
+    @property
+    def instancing(self):
+        return self._instancing
+
+
+    def setInstancing(self, state):
+        """Sets batching of parts sharing a mesh into instanced draws on or off"""
+        self._instancing = state
+
+
+    def clear(self):
+        """Drop all queued items"""
+        self._items = []
+
+
+    def submit(self, part, draw_style, passNumber):
+        """Queue part to be drawn with draw style in the given pass"""
+        if part.isVisible():
+            self._items.append((part, draw_style, passNumber))
+
+
+    def statistics(self):
+        """Returns counters of the last flushed frame"""
+        return self._statistics
+
+
+    def sortKey(self, renderType, passNumber, shader, mesh, material, distance):
+        """Returns the key ordering an item, minimizing state changes"""
+        rank = RenderQueue.Order.get(renderType, 1)
+
+        ## blending needs strict back-to-front order
+        if renderType == Actor.RenderType.Transparent:
+            return (rank, -distance, passNumber)
+
+        ## everything else is grouped by state, front-to-back inside each group
+        return (rank, passNumber, id(shader), id(mesh), id(material), distance)
+
+
+    def distance(self, viewMatrix, part):
+        """Returns distance of the part's origin along the view direction"""
+        return -(viewMatrix * QVector4D(part.position(), 1.0)).z()
+
+
+    def collect(self, viewMatrix):
+        """Resolve shaders of queued items and turn them into sortable draw items"""
+        lighting = self._scene.lighting
+        shading = self._scene.shading
+        items = []
+        instances = dict()
+
+        for part, draw_style, passNumber in self._items:
+
+            ## defer parts sharing a mesh to instanced draws
+            if self._instancing and passNumber == 0:
+                shader = part.instancedShader(draw_style, lighting, shading)
+                if shader is not None:
+                    instances.setdefault((part.mesh, shader, type(part)), []).append((part, draw_style))
+                    continue
+
+            part.selectShader(draw_style, lighting, shading, passNumber)
+            key = self.sortKey(part.renderType, passNumber, part.activeShader, part.mesh, part.activeMaterial,
+                self.distance(viewMatrix, part))
+            items.append((key, len(items), part, None, draw_style, passNumber))
+
+        for (mesh, shader, cls), parts in instances.items():
+
+            ## not worth batching a single part
+            if len(parts) < 2:
+                for part, draw_style in parts:
+                    part.selectShader(draw_style, lighting, shading, 0)
+                    key = self.sortKey(part.renderType, 0, part.activeShader, part.mesh, part.activeMaterial,
+                        self.distance(viewMatrix, part))
+                    items.append((key, len(items), part, None, draw_style, 0))
+                continue
+
+            parts, draw_styles = zip(*parts)
+            key = self.sortKey(Actor.RenderType.Solid, 0, shader, mesh, None,
+                min(self.distance(viewMatrix, each) for each in parts))
+            items.append((key, len(items), parts[0], parts, draw_styles[0], 0))
+
+        items.sort(key=lambda item: item[:2])
+        return items
+
+
+    def batch(self, mesh, shader, parts, batches):
+        """Returns the instance batch for mesh and shader filled with the parts' data"""
+        key = (mesh, shader)
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            batch = InstanceBatch(mesh)
+            batch.create()
+        batches[key] = batch
+        batch.upload(np.array([each.instanceData() for each in parts], dtype=np.float32))
+        return batch
+
+
+    def setPassState(self, passNumber):
+        """Set polygon offset state used by each pass"""
+        if passNumber == 0:
+            GL.glEnable(GL.GL_POLYGON_OFFSET_FILL)
+            if self._scene.drawStyle == self._scene.DrawStyle.SolidWithEdges:
+                GL.glPolygonOffset(1, 4)
+        else:
+            GL.glDisable(GL.GL_POLYGON_OFFSET_FILL)
+            GL.glPolygonOffset(0, 0)
+
+
+    def flush(self):
+        """Render all queued items and empty the queue"""
+        shaderBinds = vaoBinds = drawCalls = triangles = 0
+        batches = dict()
+        profiler = Profiler()
+        recording = profiler.isRecording()
+
+        with profiler.scope("collect", gpu=False):
+            items = self.collect(self._scene.viewMatrix)
+
+        shader = vao = state = passNumber = None
+        for key, index, part, instances, draw_style, itemPass in items:
+
+            if itemPass != passNumber:
+                if recording:
+                    if passNumber is not None:
+                        profiler.end()
+                    profiler.begin(RenderQueue.PassNames[itemPass])
+                passNumber = itemPass
+                self.setPassState(passNumber)
+
+            if (draw_style, part.renderType) != state:
+                state = (draw_style, part.renderType)
+                part.setRenderState(draw_style)
+
+            if recording:
+                profiler.begin(part.name if instances is None else "{} x{}".format(type(part).__name__, len(instances)))
+
+            if instances is not None:
+
+                ## one draw call for all parts sharing the mesh
+                instancedShader = part.instancedShader(draw_style, self._scene.lighting, self._scene.shading)
+                if instancedShader is not shader:
+                    shader = instancedShader
+                    shader.bind()
+                    shaderBinds += 1
+
+                batch = self.batch(part.mesh, shader, instances, batches)
+                batch.bind()
+                vao = batch
+                vaoBinds += 1
+                part.renderInstanced(batch.count)
+                drawCalls += 1
+                triangles += part.numberOfTriangles * batch.count
+
+            else:
+
+                if part.activeShader is not shader:
+                    shader = part.activeShader
+                    shader.bind()
+                    shaderBinds += 1
+                part.setUniformBindings()
+
+                if part.texture() is not None:
+                    part.texture().bind()
+
+                if part.vertexArray is not vao:
+                    vao = part.vertexArray
+                    vao.bind()
+                    vaoBinds += 1
+
+                if part.isPending():
+                    part.renderPlaceholder()
+                else:
+                    part.render()
+                    triangles += part.numberOfTriangles
+                drawCalls += 1
+
+                if part.texture() is not None:
+                    part.texture().release()
+
+            if recording:
+                profiler.end()
+
+        ## close the last pass scope
+        if recording and passNumber is not None:
+            profiler.end()
+
+        ## leave no state behind
+        if vao is not None:
+            vao.release()
+        if shader is not None:
+            shader.release()
+        GL.glDisable(GL.GL_POLYGON_OFFSET_FILL)
+
+        ## free batches no longer in use
+        for each in self._batches.values():
+            each.destroy()
+        self._batches = batches
+
+        self._statistics = {
+            'items': len(self._items),
+            'shader_binds': shaderBinds,
+            'vao_binds': vaoBinds,
+            'draw_calls': drawCalls,
+            'triangles': triangles
+        }
+        self.clear()
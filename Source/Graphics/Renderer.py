@@ -15,9 +15,16 @@ from Source.Graphics.Actor import Actor
 from Source.Graphics.Group import Group
 from Source.Graphics.Gnomon import Gnomon
 from Source.Graphics.World import World
+from Source.Graphics.TimerQueryRing import TimerQueryRing
+from Source.Graphics.Profiler import Profiler
+from Source.Graphics.FrameCapture import FrameCapture
+from Source.Graphics.RedrawScheduler import RedrawScheduler
+from Source.Graphics.BufferUpload import BufferUpload
+from Source.Graphics.AssetLoader import AssetLoader
 
 from Source.Graphics.Cone import Cone
 from Source.Graphics.Icosahedron import Icosahedron
+from Source.Graphics.MeshActor import MeshActor
 
 class Renderer(QOpenGLWidget):
 
@@ -32,10 +39,29 @@ class Renderer(QOpenGLWidget):
         self._lighting = kwargs.get("lighting", True)
         self._antialiasing = kwargs.get("antialiasing", False)
         self._statistics = kwargs.get("statistics", True)
+        self._prediction = kwargs.get("prediction", False)
+
+        ## GPU timings are read back this many frames late
+        self._timerQueries = TimerQueryRing(size=kwargs.get("queries", 4))
+
+        ## nested scopes of recent frames
+        Profiler().setEnabled(self._statistics)
+
+        ## not recording frames
+        self._capture = None
+
+        ## geometry built in the background is uploaded at the start of frames, a budget of bytes at a time
+        self._assets = AssetLoader(self, budget=kwargs.get("upload_budget", 32 * 1024 * 1024))
+        self._assets.failed.connect(self.assetFailed)
 
         ## define home orientation
         self._home_rotation = QQuaternion.fromAxisAndAngle(QVector3D(1.0, 0.0, 0.0), 25.0) * QQuaternion.fromAxisAndAngle(QVector3D(0.0, 1.0, 0.0), -50.0)
 
+        ## frames are drawn when something changed, or while the trackball spins
+        self._scheduler = RedrawScheduler(self, frame_rate=kwargs.get("frame_rate", 60.0),
+            continuous=lambda: self.isAnimating() and self._trackball.isSpinning())
+        self._scheduler.watch(Material.revision)
+
         ## define scene trackball
         self._trackball = Trackball(velocity=0.05, axis=QVector3D(0.0, 1.0, 0.0), mode=Trackball.TrackballMode.Planar, rotation=self._home_rotation, paused=True)
         
@@ -113,17 +139,10 @@ class Renderer(QOpenGLWidget):
             ## initialize gnomon
             self._gnomon.initialize()
 
-            ## timer for immediate update
-            self._timer = QTimer(self)
-            self._timer.setTimerType(Qt.PreciseTimer)
-            self._timer.timeout.connect(self.updateScene)
-            self._timer.start()
-
             ## timer for measuring elapsed time
             self._elapsed_timer = QElapsedTimer()
             self._elapsed_timer.restart()
             self._frameElapsed = 0
-            self._gpuElapsed = 0
 
             self._initialized = True
 
@@ -145,18 +164,105 @@ class Renderer(QOpenGLWidget):
             ## initialize gnomon
             self._gnomon.initialize()
 
-        ## initialize OpenGL timer
-        self._query = GL.glGenQueries(1)
+        ## timer queries live in this context, free them before it goes away
+        self.context().aboutToBeDestroyed.connect(self.cleanupGL)
+
+
+    def cleanupGL(self):
+        """Free OpenGL objects owned by the renderer before its context is destroyed"""
+        self.makeCurrent()
+        self._assets.shutdown()
+        self._timerQueries.destroy()
+        Profiler().destroy()
+        self.stopCapture()
+        self.doneCurrent()
 
 
     def clear(self):
         """Clear scene"""
+        self.makeCurrent()
         self._world.clear()
-        self.update()
+        self.doneCurrent()
+        self.requestRedraw()
+
+
+    def openMesh(self, filename):
+        """Add the mesh of an OBJ, PLY or STL file to the scene, read in the background, returns its actor"""
+        self.makeCurrent()
+        try:
+            actor = MeshActor(self._world, filename, loader=self._assets)
+            self._world.addActor(actor)
+        finally:
+            self.doneCurrent()
+        self.requestRedraw()
+        return actor
+
+
+    def assetFailed(self, actor, message):
+        """Drop an actor whose geometry could not be built, called while painting"""
+        if actor in self._world.actors():
+            self._world.removeActor(actor)
+
+        ## no dialogs from inside paintGL
+        if hasattr(self._parent, "loadFailed"):
+            QTimer.singleShot(0, lambda: self._parent.loadFailed(actor, message))
+
+
+    def assetStatistics(self):
+        """Returns actors waiting for their geometry and bytes uploaded for them"""
+        return self._assets.statistics()
 
 
     def renderTimeEstimates(self):
-        return [self._frameElapsed, self._gpuElapsed]
+        """Returns last frame time followed by mean, median, 95th percentile and maximum of recent GPU times"""
+        gpu = self._timerQueries.statistics()
+        return [self._frameElapsed, gpu['mean'], gpu['p50'], gpu['p95'], gpu['max']]
+
+
+    def profileSummary(self):
+        """Returns mean CPU and GPU time of each profiled scope over recent frames"""
+        return Profiler().summary()
+
+
+    def exportTrace(self, filename):
+        """Write recently profiled frames as Chrome trace events"""
+        Profiler().exportChromeTrace(filename)
+
+
+    def startCapture(self, directory, format=FrameCapture.Format.PNG):
+        """Record every rendered frame into directory"""
+        self.stopCapture()
+        self._capture = FrameCapture(directory, format)
+        self.requestRedraw()
+
+
+    def stopCapture(self):
+        """Stop recording, frames still in flight are written before returning"""
+        if self._capture is None:
+            return
+        self.makeCurrent()
+        self._capture.finish()
+        self._capture = None
+
+
+    def isCapturing(self):
+        """Returns whether rendered frames are recorded"""
+        return self._capture is not None
+
+
+    def captureStatistics(self):
+        """Returns frame capture counters, empty when not recording"""
+        return self._capture.statistics() if self._capture is not None else {}
+
+
+    def renderStatistics(self):
+        """Returns draw and culling counters of the last world frame"""
+        return self._world.renderStatistics()
+
+
+    def uploadStatistics(self):
+        """Returns bytes sent to GPU buffers by the last frame and overall"""
+        return BufferUpload().statistics()
 
 
     @property
@@ -183,55 +289,90 @@ class Renderer(QOpenGLWidget):
         return self._animating
 
 
-    def updateScene(self):
-        """Schedule an update to the scene"""
-        if self.isAnimating():
-            self.update()
+    def requestRedraw(self):
+        """Schedule a new frame, merged with other requests and kept under the frame rate cap"""
+        self._scheduler.requestRedraw()
+
+
+    def setPrediction(self, state):
+        """Sets extrapolation of the trackball rotation to the expected display time on or off"""
+        self._prediction = state
+
+
+    def displayLatency(self):
+        """Returns the expected milliseconds between drawing and display, last paint time plus half a refresh"""
+        screen = QGuiApplication.primaryScreen()
+        rate = screen.refreshRate() if screen is not None and screen.refreshRate() > 0.0 else 60.0
+        return self._frameElapsed + 500.0 / rate
+
+
+    def maxFrameRate(self):
+        return self._scheduler.maxFrameRate
+
+
+    def setMaxFrameRate(self, rate):
+        """Sets the highest number of frames drawn per second, 0 for no cap"""
+        self._scheduler.setMaxFrameRate(rate)
+
+
+    def frameStatistics(self):
+        """Returns frames drawn, redraws asked for and redraws merged into pending frames"""
+        return self._scheduler.statistics()
 
 
     def renderScene(self):
         """Draw main scene"""
 
-        ## set scene rotation
-        self._world.camera.setRotation(self._trackball.rotation().inverted())
-        self._gnomon.camera.setRotation(self._trackball.rotation().inverted())
+        ## geometry finished in the background since the last frame
+        with Profiler().scope("upload", gpu=False):
+            self._assets.upload()
+
+        ## set scene rotation, ahead to when the frame shows up if predicting
+        rotation = self._trackball.rotation(self.displayLatency() if self._prediction else 0.0).inverted()
+        self._world.camera.setRotation(rotation)
+        self._gnomon.camera.setRotation(rotation)
 
         self._world.render()
 
         ## render gnomon
-        self._gnomon.render()
+        with Profiler().scope("gnomon"):
+            self._gnomon.render()
 
     
     def paintGL(self):
         """Draw scene"""
+        self._scheduler.frameStarted()
+        self._elapsed_timer.restart()
 
         ## record render time statistics
         if self._statistics:
 
-            ## begin GPU time query
-            GL.glBeginQuery(GL.GL_TIME_ELAPSED, self._query)
+            ## time this frame on the GPU, results arrive a few frames later
+            self._timerQueries.begin()
+            Profiler().beginFrame()
 
             ## render scene
             self.renderScene()
 
-            ## finish GPU time query
-            GL.glEndQuery(GL.GL_TIME_ELAPSED)
-
-            ## record render time statistics, need to stall the CPU a bit
-            ready = False 
-            while not ready:
-                ready = GL.glGetQueryObjectiv(self._query, GL.GL_QUERY_RESULT_AVAILABLE)
-            self._gpuElapsed = GL.glGetQueryObjectuiv(self._query, GL.GL_QUERY_RESULT ) / 1000000.0
-
-            ## delete query object
-            #GL.glDeleteQueries( self._query )
+            ## finish GPU time query, skipped if no query was free
+            Profiler().endFrame()
+            self._timerQueries.end()
 
         else:
 
             ## render scene
             self.renderScene()
 
-        self._frameElapsed = self._elapsed_timer.restart()
+        ## read back this frame while the next ones render
+        if self._capture is not None:
+            ratio = self.devicePixelRatio()
+            self._capture.capture(self.defaultFramebufferObject(), int(self.width() * ratio), int(self.height() * ratio))
+
+        self._frameElapsed = self._elapsed_timer.nsecsElapsed() / 1000000.0
+        BufferUpload().endFrame()
+
+        ## keep going while the trackball spins
+        self._scheduler.frameFinished()
 
 
     def resizeGL(self, width, height):
@@ -262,12 +403,11 @@ class Renderer(QOpenGLWidget):
             self._trackball.press(self._pixelPosToViewPos(event.localPos()), QQuaternion())
             self._trackball.start()
             event.accept()
-            if not self.isAnimating():
-                self.update()
+            self.requestRedraw()
 
         elif event.buttons() & Qt.RightButton:
             self.pan(self._pixelPosToViewPos(event.localPos()), state='start')
-            self.update()
+            self.requestRedraw()
 
 
     def mouseMoveEvent(self, event):
@@ -280,12 +420,11 @@ class Renderer(QOpenGLWidget):
         if event.buttons() & Qt.LeftButton:
             self._trackball.move(self._pixelPosToViewPos(event.localPos()), QQuaternion())
             event.accept()
-            if not self.isAnimating():
-                self.update()
+            self.requestRedraw()
 
         elif event.buttons() & Qt.RightButton:
             self.pan(self._pixelPosToViewPos(event.localPos()), state='move')
-            self.update()
+            self.requestRedraw()
 
 
     def mouseReleaseEvent(self, event):
@@ -300,7 +439,7 @@ class Renderer(QOpenGLWidget):
             event.accept()
             if not self.isAnimating():
                 self._trackball.stop()
-                self.update()
+            self.requestRedraw()
 
 
     def wheelEvent(self, event):
@@ -309,7 +448,7 @@ class Renderer(QOpenGLWidget):
         self.zoom(-event.angleDelta().y() / 950.0)
         event.accept()
         ## scene is dirty, please update
-        self.update()
+        self.requestRedraw()
 
 
     def zoom(self, diffvalue):
@@ -341,37 +480,37 @@ class Renderer(QOpenGLWidget):
     def viewFront(self):
         """Make camera face the front side of the scene"""
         self._trackball.reset(QQuaternion())
-        self.update()
+        self.requestRedraw()
         
 
     def viewBack(self):
         """Make camera face the back side of the scene"""
         self._trackball.reset(QQuaternion.fromAxisAndAngle(QVector3D(0.0, 1.0, 0.0), 180.0))
-        self.update()
+        self.requestRedraw()
 
 
     def viewLeft(self):
         """Make camera face the left side of the scene"""
         self._trackball.reset(QQuaternion.fromAxisAndAngle(QVector3D(0.0, 1.0, 0.0), -90.0))
-        self.update()
+        self.requestRedraw()
 
 
     def viewRight(self):
         """Make camera face the right side of the scene"""
         self._trackball.reset(QQuaternion.fromAxisAndAngle(QVector3D(0.0, 1.0, 0.0), 90.0))
-        self.update()
+        self.requestRedraw()
 
 
     def viewTop(self):
         """Make camera face the top side of the scene"""
         self._trackball.reset(QQuaternion.fromAxisAndAngle(QVector3D(1.0, 0.0, 0.0), 90.0))
-        self.update()
+        self.requestRedraw()
 
 
     def viewBottom(self):
         """Make camera face the bottom side of the scene"""
         self._trackball.reset(QQuaternion.fromAxisAndAngle(QVector3D(1.0, 0.0, 0.0), -90.0))
-        self.update()
+        self.requestRedraw()
 
     
     def createGridLines(self):
@@ -385,7 +524,7 @@ class Renderer(QOpenGLWidget):
         """Switch world's. camera lens"""
         self._world.setCameraLens(lens)
         self._gnomon.setCameraLens(lens)
-        self.update()
+        self.requestRedraw()
 
 
     def storeCamera(self):
@@ -397,49 +536,51 @@ class Renderer(QOpenGLWidget):
         """Recall camera parameters"""
         self._world.recallCamera()
         self._trackball.reset(self._world.camera.rotation.inverted())
-        self.update()
+        self.requestRedraw()
 
 
     def resetCamera(self):
         """Reset world's camera parameters"""
         self._world.resetCamera()
         self._trackball.reset(self._home_rotation)
-        self.update()
+        self.requestRedraw()
 
 
     def drawStyleChanged(self, index):
         self._world.setDrawStyle(Scene.DrawStyle.Styles[index])
-        self.update()
+        self.requestRedraw()
 
 
     def lightingChanged(self, state):
         self._world.setLighting(state)
-        self.update()
+        self.requestRedraw()
 
     
     def shadingChanged(self, index):
         self._world.setShading(Scene.Shading.Types[index])
-        self.update()
+        self.requestRedraw()
 
 
     def headLightChanged(self, state):
         self._world.light.setHeadLight(state)
-        self.update()
+        self.requestRedraw()
 
 
     def directionalLightChanged(self, state):
         self._world.light.setDirectional(state)
-        self.update()
+        self.requestRedraw()
 
     
     def enableProfiling(self, enable):
         self._statistics = enable
+        Profiler().setEnabled(enable)
 
 
     def enableAnimation(self, enable):
         self.setAnimating(enable)
         if not enable:
             self._trackball.stop()
+        self.requestRedraw()
 
 
     def _pixelPosToViewPos(self, point):
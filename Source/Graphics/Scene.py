@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 from PyQt5.QtCore import QObject
 from PyQt5.QtGui import QVector3D, QVector4D, QMatrix4x4, QQuaternion
@@ -12,6 +13,12 @@ from Source.Graphics.Actor import Actor
 from Source.Graphics.Group import Group
 from Source.Graphics.Floor import Floor
 from Source.Graphics.Background import Background
+from Source.Graphics.RenderQueue import RenderQueue
+from Source.Graphics.UniformBuffer import UniformBuffer
+from Source.Graphics.BoundingVolumeHierarchy import BoundingVolumeHierarchy
+from Source.Graphics.OrientedBoxes import OrientedBoxes
+from Source.Graphics.Frustum import Frustum
+from Source.Graphics.Profiler import Profiler
 
 ##  Base scene class
 class Scene(QObject):
@@ -30,6 +37,10 @@ class Scene(QObject):
         Types = [Flat, Smooth]
 
 
+    ## number of pick candidates intersected per kernel call
+    PickBatch = 8
+
+
     def __init__(self, viewer, **kwargs):
         """Initialize camera object."""
         super(Scene, self).__init__()
@@ -46,6 +57,24 @@ class Scene(QObject):
         self._light = kwargs.get("light", None) 
         self._lighting = kwargs.get("lighting", True) 
         self._shading = kwargs.get("shading", Scene.Shading.Smooth)
+        self._queue = RenderQueue(self, instancing=kwargs.get("instancing", True))
+        self._culling = kwargs.get("culling", True)
+        self._cullStatistics = {'drawn': 0, 'culled': 0, 'coarser': 0}
+        self._version = 0
+
+        ## camera and light state of the frame being rendered
+        self._viewMatrix = QMatrix4x4()
+        self._projectionMatrix = QMatrix4x4()
+        self._lightPosition = QVector4D()
+        self._frustum = None
+        self._frameBuffer = UniformBuffer(52 * np.dtype(np.float32).itemsize)
+
+        ## pick volumes of actors and group parts, with the order pick visits them in
+        self._bvh = BoundingVolumeHierarchy()
+        self._pickables = dict()
+        self._pickItems = dict()
+        self._order = dict()
+        self._serial = 0
 
 
     @property
@@ -64,9 +93,30 @@ class Scene(QObject):
         return self._viewer
 
 
+    @property
+    def version(self):
+        """Counter increased whenever the scene looks different"""
+        return self._version
+
+
+    def invalidate(self):
+        """Note that the scene changed and ask the viewer for a new frame"""
+        self._version += 1
+        if self._viewer is not None:
+            self._viewer.requestRedraw()
+
+
     def clear(self):
         """Clear actors from scene"""
+        for each in self._actors.values():
+            each.destroy()
         self._actors.clear()
+        self._frameBuffer.destroy()
+        self._bvh.clear()
+        self._pickables.clear()
+        self._pickItems.clear()
+        self._order.clear()
+        self.invalidate()
 
 
     def actor(self, index):
@@ -98,7 +148,13 @@ class Scene(QObject):
 
     def addActor(self, actor, select=False):
         """Add actor to the list"""
+        if actor.name in self._actors:
+            self.removeBounds(self._actors[actor.name])
+        else:
+            self._order[actor.name] = self._serial
+            self._serial += 1
         self._actors[actor.name] = actor
+        self.insertBounds(actor)
         if select:
             self.selectActor(actor)
 
@@ -106,12 +162,15 @@ class Scene(QObject):
     def addSystemActor(self, actor):
         """Add actor to the system list"""
         self._systemActors[actor.name] = actor
+        self.invalidate()
 
 
     def removeActor(self, actor):
         """Removes a specific actor from scene"""
         if actor.name is not None:
             actor = self._actors.pop(actor.name)
+            self.removeBounds(actor)
+            del self._order[actor.name]
             if actor == self.selectedActor():
                 if len(self._actors) > 0:
                     selectable_actors = [key for (key, actor) in self._actors.items() if actor.isSelectable()]
@@ -122,13 +181,15 @@ class Scene(QObject):
                         self.selectActor(None)
                 else:
                     self.selectActor(None)
+            actor.destroy()
             del actor
+            self.invalidate()
 
 
     def removeSystemActor(self, actor):
         """Removes a specific system actor from scene"""
         if actor.name is not None:
-            del self._systemActors[actor.name]
+            self._systemActors.pop(actor.name).destroy()
 
 
     def highlightedActor(self):
@@ -159,9 +220,15 @@ class Scene(QObject):
             self._selectedActor.setSelected(True)
 
 
+    @property
+    def drawStyle(self):
+        return self._draw_style
+
+
     def setDrawStyle(self, style):
         """Sets the drawing style"""
         self._draw_style = style
+        self.invalidate()
 
 
     def setCamera(self, camera):
@@ -192,6 +259,7 @@ class Scene(QObject):
     def setLighting(self, state):
         """Sets light calculations on or off"""
         self._lighting = state
+        self.invalidate()
 
 
     @property
@@ -202,6 +270,34 @@ class Scene(QObject):
     def setShading(self, type):
         """Sets shading type"""
         self._shading = type
+        self.invalidate()
+
+
+    @property
+    def instancing(self):
+        return self._queue.instancing
+
+
+    def setInstancing(self, state):
+        """Sets batching of actors sharing a mesh into instanced draws on or off"""
+        self._queue.setInstancing(state)
+        self.invalidate()
+
+
+    @property
+    def culling(self):
+        return self._culling
+
+
+    def setCulling(self, state):
+        """Sets skipping of actors outside the view frustum on or off"""
+        self._culling = state
+        self.invalidate()
+
+
+    def renderStatistics(self):
+        """Returns drawn, culled and coarsened parts, triangles, shader binds, vao binds and draw calls of the last frame"""
+        return dict(self._cullStatistics, **self._queue.statistics())
 
 
     def initialize(self):
@@ -258,35 +354,218 @@ class Scene(QObject):
             direction=QVector3D(ray_direction[0], ray_direction[1], ray_direction[2]))
 
 
-    def pick(self, point):
-        """Finds closest intersection if it exists"""
+    def insertBounds(self, actor):
+        """Register the pick volumes of an actor of this scene, or of all parts of a group"""
+        if self._actors.get(actor.name, None) is not actor:
+            return
+        self.removeBounds(actor)
+
+        ## groups are picked through their parts, except the first one
+        order = self._order[actor.name]
+        if isinstance(actor, Group):
+            items = [(part, (actor, part, (order, index))) for index, part in enumerate(actor.parts[1:], 1)]
+        else:
+            items = [(actor, (actor, None, (order, 0)))]
+
+        for item, entry in items:
+            self._pickables[item] = entry
+            self._bvh.insert(item, item.pickBounds())
+        self._pickItems[actor] = [item for item, entry in items]
+        self.invalidate()
+
+
+    def removeBounds(self, actor):
+        """Unregister the pick volumes of an actor or group"""
+        for item in self._pickItems.pop(actor, []):
+            del self._pickables[item]
+            self._bvh.remove(item)
+
+
+    def updateBounds(self, actor):
+        """Move the pick volume of an actor or group part after its transform changed"""
+        if actor in self._pickables:
+            self._bvh.update(actor, actor.pickBounds())
+        self.invalidate()
+
+
+    def pickStatistics(self):
+        """Returns counters of the pick hierarchy"""
+        return self._bvh.statistics()
+
+
+    def isPickable(self, item):
+        """Returns whether a registered actor or part can currently be picked"""
+        owner, part, order = self._pickables[item]
+        return owner.isPickable() and (part is None or part.isPickable())
+
+
+    def resolvePick(self, hits):
+        """Returns (actor, part) closest among (item, distance) hits, ties resolved as in pickLinear"""
         result = (None, None)
         distance = math.inf
 
-        ## compute ray
-        ray = self.ray(point)
-        
-        ## inspect all actors
-        for each in self.actors():
-
-            ## inspect actor
-            if each.isPickable():
-                #print("inspecting actor: ", each.name)
-                hit = each.intersect(ray)
-                if hit[0] and hit[1] < distance:
-                    result = (each, None); distance = hit[1]
-
-                ## inspect group
-                if isinstance(each, Group):
-                    #print("inspecting group: ", each.name)
-                    for part in each.parts[1:]:
-                        if part.isPickable():
-                            #print("   inspecting part: ", part)
-                            hit = part.intersect(ray)
-                            if hit[0] and hit[1] <= distance:
-                                result = (each, part); distance = hit[1]
-        
-        return result 
+        ## replay the hits in scene order
+        for item, hit in sorted(hits, key=lambda each: self._pickables[each[0]][2]):
+            owner, part, order = self._pickables[item]
+            if part is None:
+                if hit < distance:
+                    result = (owner, None); distance = hit
+            elif hit <= distance:
+                result = (owner, part); distance = hit
+
+        return result
+
+
+    def pick(self, point):
+        """Finds closest intersection if it exists"""
+        return self.pickRay(self.ray(point))
+
+
+    def pickRay(self, ray):
+        """Finds closest intersection of ray, testing only actors whose bounds it crosses"""
+        origin = ray.origin()
+        direction = ray.direction()
+        origin = (origin.x(), origin.y(), origin.z())
+        direction = (direction.x(), direction.y(), direction.z())
+
+        hits = []
+        best = math.inf
+        batch = []
+        candidates = self._bvh.traverse(origin, direction)
+        while True:
+            near, item = next(candidates, (math.inf, None))
+
+            ## test candidates in batches, until the next one starts beyond the closest hit
+            if len(batch) == Scene.PickBatch or (item is None or near > best) and len(batch) > 0:
+                found, distances = OrientedBoxes([each.pickBox() for each in batch]).intersect(origin, direction)
+                for index in np.flatnonzero(found[0]):
+                    hits.append((batch[index], distances[0, index]))
+                    best = min(best, distances[0, index])
+                batch = []
+
+            if item is None or near > best:
+                break
+            if self.isPickable(item):
+                batch.append(item)
+
+        return self.resolvePick(hits)
+
+
+    def pickRays(self, origins, directions):
+        """Finds closest intersection of each ray, given as arrays of origins and directions"""
+        origins = np.array(origins, dtype=np.float64, ndmin=2)
+        directions = np.array(directions, dtype=np.float64, ndmin=2)
+
+        ## actors crossed by any of the rays are tested against all of them at once
+        items = []
+        for origin, direction in zip(origins.tolist(), directions.tolist()):
+            items.extend(item for near, item in self._bvh.traverse(origin, direction))
+        items = [each for each in OrderedDict.fromkeys(items) if self.isPickable(each)]
+        if len(items) == 0:
+            return [(None, None)] * len(origins)
+
+        found, distances = OrientedBoxes([each.pickBox() for each in items]).intersect(origins, directions)
+        return [self.resolvePick([(items[index], distances[row, index]) for index in np.flatnonzero(found[row])])
+            for row in range(len(origins))]
+
+
+    def pickRectangle(self, first, second, samples=16):
+        """Returns the distinct (actor, part) seen through a grid of samples x samples rays spanning a rectangle"""
+        points = [QVector4D(x, y, 0.0, 0.0)
+            for y in np.linspace(first.y(), second.y(), samples).tolist()
+            for x in np.linspace(first.x(), second.x(), samples).tolist()]
+        origins, directions = self.rays(points)
+        results = [each for each in self.pickRays(origins, directions) if each[0] is not None]
+        return list(OrderedDict.fromkeys(results))
+
+
+    def rays(self, points):
+        """Returns origins and directions of the rays through points, as arrays, see ray"""
+        inverseProjectionMatrix = np.array(self._camera.projectionMatrix.inverted()[0].data(), dtype=np.float64).reshape(4, 4)
+        inverseViewMatrix = np.array(self._camera.viewMatrix.inverted()[0].data(), dtype=np.float64).reshape(4, 4)
+
+        ## row vectors times the column major data apply the matrices
+        ends = []
+        for depth in (-1.0, 0.0):
+            end = np.array([(point.x(), point.y(), depth, 1.0) for point in points], dtype=np.float64)
+            end = end.dot(inverseProjectionMatrix); end /= end[:, 3:]
+            end = end.dot(inverseViewMatrix); end /= end[:, 3:]
+            ends.append(end[:, :3])
+
+        directions = ends[1] - ends[0]
+        directions /= np.linalg.norm(directions, axis=1)[:, None]
+        return ends[0], directions
+
+
+    def pickLinear(self, ray):
+        """Finds closest intersection of ray by testing every actor"""
+        items = [each for each in self._pickables if self.isPickable(each)]
+        if len(items) == 0:
+            return (None, None)
+
+        origin = ray.origin()
+        direction = ray.direction()
+        found, distances = OrientedBoxes([each.pickBox() for each in items]).intersect(
+            (origin.x(), origin.y(), origin.z()), (direction.x(), direction.y(), direction.z()))
+        return self.resolvePick([(items[index], distances[0, index]) for index in np.flatnonzero(found[0])])
+
+
+    def updateFrameState(self):
+        """Compute camera and light state once for the frame about to be rendered"""
+        self._viewMatrix = self._camera.viewMatrix
+        self._projectionMatrix = self._camera.projectionMatrix
+
+        ## light position in view space
+        if self._light.headlight:
+            if self._light.directional:
+                self._lightPosition = QVector4D(0.0, 0.0, 1.0, 0.0)
+            else:
+                self._lightPosition = QVector4D(0.0, 0.0, 0.0, 1.0)
+        else:
+            self._lightPosition = self._viewMatrix * self._light.position
+
+        ## view volume in world space
+        self._frustum = Frustum(self._projectionMatrix * self._viewMatrix)
+
+        ## one upload serves every shader drawn by this scene
+        self._frameBuffer.write(self.frameBlock())
+        self._frameBuffer.bind(UniformBuffer.Binding.Frame)
+
+
+    @property
+    def viewMatrix(self):
+        """Returns the view matrix of the frame being rendered"""
+        return self._viewMatrix
+
+
+    @property
+    def projectionMatrix(self):
+        """Returns the projection matrix of the frame being rendered"""
+        return self._projectionMatrix
+
+
+    @property
+    def lightPosition(self):
+        """Returns the view space light position of the frame being rendered"""
+        return self._lightPosition
+
+
+    @property
+    def frustum(self):
+        """Returns the view frustum of the frame being rendered"""
+        return self._frustum
+
+
+    def frameBlock(self):
+        """Returns camera and light laid out as the std140 frame block"""
+        data = np.zeros(52, dtype=np.float32)
+        data[0:16] = self._viewMatrix.data()
+        data[16:32] = self._projectionMatrix.data()
+        data[32:36] = (self._lightPosition.x(), self._lightPosition.y(), self._lightPosition.z(), self._lightPosition.w())
+        for offset, color in ((36, self._light.attenuation), (40, self._light.ambientColor),
+                (44, self._light.diffuseColor), (48, self._light.specularColor)):
+            data[offset:offset + 3] = (color.x(), color.y(), color.z())
+        return data
 
 
     def renderPart(self, part, draw_style, passNumber):
@@ -363,7 +642,73 @@ class Scene(QObject):
         pass
 
 
+    def visibleParts(self):
+        """Returns the visible parts of all visible actors"""
+        parts = []
+        for actor in self.actors():
+            if actor.isVisible():
+                parts.extend(each for each in (actor.parts if isinstance(actor, Group) else [actor]) if each.isVisible())
+        return parts
+
+
+    def cull(self, parts):
+        """Returns the parts whose bounds overlap the view frustum, parts of unknown extent are kept"""
+        if not self._culling:
+            return parts
+
+        bounds = [each.worldBounds() for each in parts]
+        known = [index for index, each in enumerate(bounds) if each is not None]
+        inside = np.ones(len(parts), dtype=bool)
+        if len(known) > 0:
+            inside[known] = self._frustum.intersects([bounds[index][0] for index in known], [bounds[index][1] for index in known])
+        return [each for each, keep in zip(parts, inside) if keep]
+
+
+    def projectedSizes(self, parts):
+        """Returns the on screen diameter in pixels of the spheres enclosing the world bounds of parts"""
+        bounds = [each.worldBounds() for each in parts]
+        centers = np.array([each[0] for each in bounds], dtype=np.float64).reshape(-1, 3)
+        radii = np.linalg.norm(np.array([each[1] for each in bounds], dtype=np.float64).reshape(-1, 3), axis=1)
+
+        ## clip space w is the view depth under a perspective projection and one under an orthographic one
+        projection = np.array(self._projectionMatrix.data(), dtype=np.float64).reshape(4, 4).T
+        clip = np.hstack((centers, np.ones((len(centers), 1)))).dot((projection.dot(np.array(self._viewMatrix.data(), dtype=np.float64).reshape(4, 4).T)).T)
+        height = self._viewer.height() * self._viewer.devicePixelRatio()
+        return radii * projection[1, 1] * height / np.maximum(clip[:, 3], 1e-6)
+
+
+    def selectDetail(self, parts):
+        """Switch parts having levels of detail to the one matching their size on screen, returns the number drawn coarser than their finest"""
+        parts = [each for each in parts if each.detailCount() > 1 and not each.isPending() and each.worldBounds() is not None]
+        if len(parts) == 0:
+            return 0
+
+        for part, pixels in zip(parts, self.projectedSizes(parts)):
+            part.setDetail(part.selectDetail(pixels))
+        return sum(1 for each in parts if each.detail > 0)
+
+
+    def submit(self, part):
+        """Queue both passes of a part"""
+        draw_style = Scene.DrawStyle.Solid if self._draw_style == Scene.DrawStyle.SolidWithEdges else self._draw_style
+
+        ## first pass with current draw style
+        self._queue.submit(part, draw_style, 0)
+
+        ## second pass draws the edges
+        if self._draw_style == Scene.DrawStyle.SolidWithEdges:
+            self._queue.submit(part, Scene.DrawStyle.Wireframe, 1)
+
+
     def render(self):
+        """Render scene, timed under a scope named after the scene class"""
+        with Profiler().scope(type(self).__name__ + ".render"):
+            self.renderScene()
+
+
+    def renderScene(self):
+        """Draw system actors in order, then the visible actors sorted by state"""
+        profiler = Profiler()
 
         ## set viewport region
         self.setViewportRegion()
@@ -371,24 +716,47 @@ class Scene(QObject):
         ## clear buffers
         GL.glClear(GL.GL_DEPTH_BUFFER_BIT)
 
-        for each in self.systemActors() + self.actors():
+        ## camera and light do not change while the frame is drawn
+        self.updateFrameState()
+
+        ## system actors are drawn in order, they layer on top of each other
+        for each in self.systemActors():
 
             if isinstance(each, Background):
 
                 ## render background
-                self.renderBackground(each)
+                with profiler.scope("background"):
+                    self.renderBackground(each)
             
             elif isinstance(each, Floor):
 
                 ## render grid floor
-                self.renderGridFloor(each)
+                with profiler.scope("grid"):
+                    self.renderGridFloor(each)
 
             else:
                 ## render first pass of the scene
-                self.renderFirstPass(each)
+                with profiler.scope("first pass"):
+                    self.renderFirstPass(each)
 
                 ## render second pass of the scene
-                self.renderSecondPass(each)
+                with profiler.scope("second pass"):
+                    self.renderSecondPass(each)
+
+        ## actors outside the view are dropped before any GL call
+        with profiler.scope("cull", gpu=False):
+            parts = self.visibleParts()
+            drawn = self.cull(parts)
+
+        ## curved primitives far away are drawn with fewer triangles
+        with profiler.scope("lod", gpu=False):
+            coarser = self.selectDetail(drawn)
+        self._cullStatistics = {'drawn': len(drawn), 'culled': len(parts) - len(drawn), 'coarser': coarser}
+
+        ## actors are sorted to minimize state changes
+        for each in drawn:
+            self.submit(each)
 
+        self._queue.flush()
 
 
@@ -1,6 +1,8 @@
 from PyQt5.QtCore import QObject
 from PyQt5.QtGui import QOpenGLShader, QOpenGLShaderProgram
 
+from Source.Graphics.UniformBuffer import UniformBuffer
+
 ## singleton shader class 
 class Shaders(QObject):
 
@@ -76,19 +78,51 @@ class Shaders(QObject):
 		self.__instance._texturedFlatShader.addShaderFromSourceCode(QOpenGLShader.Fragment, Shaders.texturedFragmentFlatShader())
 		self.__instance._texturedFlatShader.link()	
 
+		## create instanced Phong mesh shader
+		self.__instance._instancedMaterialPhongShader = QOpenGLShaderProgram()
+		self.__instance._instancedMaterialPhongShader.addShaderFromSourceCode(QOpenGLShader.Vertex, Shaders.instancedMaterialPhongVertexShader())
+		self.__instance._instancedMaterialPhongShader.addShaderFromSourceCode(QOpenGLShader.Fragment, Shaders.instancedMaterialPhongFragmentShader())
+		self.__instance._instancedMaterialPhongShader.link()
+
+		## create instanced Phong mesh flat shader
+		self.__instance._instancedMaterialPhongFlatShader = QOpenGLShaderProgram()
+		self.__instance._instancedMaterialPhongFlatShader.addShaderFromSourceCode(QOpenGLShader.Vertex, Shaders.instancedMaterialPhongVertexFlatShader())
+		self.__instance._instancedMaterialPhongFlatShader.addShaderFromSourceCode(QOpenGLShader.Fragment, Shaders.instancedMaterialPhongFragmentFlatShader())
+		self.__instance._instancedMaterialPhongFlatShader.link()
+
+		## camera, light and material come from uniform blocks shared by all programs
+		for each in (self.__instance._backgroundShader, self.__instance._wireframeMaterialShader,
+			self.__instance._uniformMaterialShader, self.__instance._attributeColorShader,
+			self.__instance._uniformMaterialPhongShader, self.__instance._attributeColorPhongShader,
+			self.__instance._uniformMaterialPhongFlatShader, self.__instance._attributeColorPhongFlatShader,
+			self.__instance._texturedShader, self.__instance._texturedFlatShader,
+			self.__instance._instancedMaterialPhongShader, self.__instance._instancedMaterialPhongFlatShader):
+			UniformBuffer.bindBlocks(each)
+
 
 	@classmethod
 	def uniformMaterialPhongVertexFlatShader(cls):
 		vertexShaderSource = """
 		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		layout(location = 0) in vec3 position;
 		layout(location = 1) in vec3 normal;
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
 		uniform mat3 normalMatrix;
-		uniform vec4 lightPosition;
-		uniform vec3 lightAttenuation;
 
 		flat out vec4 vertexNormal;
 		smooth out vec4 vertexPosition;
@@ -117,18 +151,31 @@ class Shaders(QObject):
 	def uniformMaterialPhongFragmentFlatShader(cls):
 		fragmentShaderSource = """
 		#version 330
-		struct Material {
-			vec3 emission;
+
+		struct Light {
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
-			float shininess;
-		}; 
+			vec3 specular;
+		};
 
-		struct Light {
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		struct Material {
+			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
 			vec3 specular;
+			float shininess;
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
 		};
 
 		flat in vec4 vertexNormal;
@@ -136,9 +183,6 @@ class Shaders(QObject):
 		smooth in vec3 lightDirection;
 		smooth in float attenuation;
 
-		uniform Material material;
-		uniform Light light;
-
 		out vec4 fragColor;
 
 		void main()
@@ -168,15 +212,26 @@ class Shaders(QObject):
 	def attributeMaterialPhongVertexFlatShader(cls):
 		vertexShaderSource = """
 		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		layout(location = 0) in vec3 position;
 		layout(location = 1) in vec3 normal;
 		layout(location = 2) in vec3 color;
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
 		uniform mat3 normalMatrix;
-		uniform vec4 lightPosition;
-		uniform vec3 lightAttenuation;
 
 		flat out vec4 vertexNormal;
 		smooth out vec4 vertexPosition;
@@ -207,18 +262,31 @@ class Shaders(QObject):
 	def attributeMaterialPhongFragmentFlatShader(cls):
 		fragmentShaderSource = """
 		#version 330
-		struct Material {
-			vec3 emission;
+
+		struct Light {
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
-			float shininess;
-		}; 
+			vec3 specular;
+		};
 
-		struct Light {
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		struct Material {
+			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
 			vec3 specular;
+			float shininess;
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
 		};
 
 		flat in vec4 vertexNormal;
@@ -227,9 +295,6 @@ class Shaders(QObject):
 		smooth in float attenuation;
 		smooth in vec3 vertexColor;
 
-		uniform Material material;
-		uniform Light light;
-
 		out vec4 fragColor;
 
 		void main()
@@ -259,14 +324,25 @@ class Shaders(QObject):
 	def uniformMaterialPhongVertexShader(cls):
 		vertexShaderSource = """
 		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		layout(location = 0) in vec3 position;
 		layout(location = 1) in vec3 normal;
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
 		uniform mat3 normalMatrix;
-		uniform vec4 lightPosition;
-		uniform vec3 lightAttenuation;
 
 		smooth out vec4 vertexNormal;
 		smooth out vec4 vertexPosition;
@@ -295,18 +371,31 @@ class Shaders(QObject):
 	def uniformMaterialPhongFragmentShader(cls):
 		fragmentShaderSource = """
 		#version 330
-		struct Material {
-			vec3 emission;
+
+		struct Light {
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
-			float shininess;
-		}; 
+			vec3 specular;
+		};
 
-		struct Light {
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		struct Material {
+			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
 			vec3 specular;
+			float shininess;
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
 		};
 
 		smooth in vec4 vertexNormal;
@@ -314,9 +403,6 @@ class Shaders(QObject):
 		smooth in vec3 lightDirection;
 		smooth in float attenuation;
 
-		uniform Material material;
-		uniform Light light;
-
 		out vec4 fragColor;
 
 		void main()
@@ -346,15 +432,26 @@ class Shaders(QObject):
 	def attributeMaterialPhongVertexShader(cls):
 		vertexShaderSource = """
 		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		layout(location = 0) in vec3 position;
 		layout(location = 1) in vec3 normal;
 		layout(location = 2) in vec3 color;
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
 		uniform mat3 normalMatrix;
-		uniform vec4 lightPosition;
-		uniform vec3 lightAttenuation;
 
 		smooth out vec4 vertexNormal;
 		smooth out vec4 vertexPosition;
@@ -385,18 +482,31 @@ class Shaders(QObject):
 	def attributeMaterialPhongFragmentShader(cls):
 		fragmentShaderSource = """
 		#version 330
-		struct Material {
-			vec3 emission;
+
+		struct Light {
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
-			float shininess;
-		}; 
+			vec3 specular;
+		};
 
-		struct Light {
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		struct Material {
+			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
 			vec3 specular;
+			float shininess;
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
 		};
 
 		smooth in vec4 vertexNormal;
@@ -405,9 +515,6 @@ class Shaders(QObject):
 		smooth in float attenuation;
 		smooth in vec3 vertexColor;
 
-		uniform Material material;
-		uniform Light light;
-
 		out vec4 fragColor;
 
 		void main()
@@ -454,21 +561,36 @@ class Shaders(QObject):
 	def uniformMaterialVertexShader(cls):
 		vertexShaderSource = """
 		#version 330
-		
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		struct Material {
 			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
+			vec3 specular;
 			float shininess;
-		}; 
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
+		};
 
 		layout(location = 0) in vec3 position;
 		
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
-		uniform Material material;
 
 		smooth out vec4 vertexColor;
 
@@ -485,16 +607,27 @@ class Shaders(QObject):
 	def texturedVertexShader(cls):
 		vertexShaderSource = """
 		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		layout(location = 0) in vec3 position;
 		layout(location = 1) in vec3 normal;
 		layout(location = 2) in vec3 color;
 		layout(location = 3) in vec2 texcoord;
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
 		uniform mat3 normalMatrix;
-		uniform vec4 lightPosition;
-		uniform vec3 lightAttenuation;
 
 		smooth out vec4 vertexNormal;
 		smooth out vec4 vertexPosition;
@@ -525,16 +658,27 @@ class Shaders(QObject):
 	def texturedVertexFlatShader(cls):
 		vertexShaderSource = """
 		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		layout(location = 0) in vec3 position;
 		layout(location = 1) in vec3 normal;
 		layout(location = 2) in vec3 color;
 		layout(location = 3) in vec2 texcoord;
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
 		uniform mat3 normalMatrix;
-		uniform vec4 lightPosition;
-		uniform vec3 lightAttenuation;
 
 		flat out vec4 vertexNormal;
 		smooth out vec4 vertexPosition;
@@ -565,28 +709,43 @@ class Shaders(QObject):
 	def wireframeMaterialVertexShader(cls):
 		vertexShaderSource = """
 		#version 330
-		
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		struct Material {
 			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
+			vec3 specular;
 			float shininess;
-		}; 
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
+		};
 
 		layout(location = 0) in vec3 position;
 		
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
-		uniform Material wireframe_material;
 
 		smooth out vec4 vertexColor;
 
 		void main()
 		{
 		    gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(position, 1.0);
-		    vertexColor = vec4(wireframe_material.diffuse, 1.0);
+		    vertexColor = vec4(material.diffuse, 1.0);
 		}
 		"""
 		return vertexShaderSource
@@ -596,11 +755,24 @@ class Shaders(QObject):
 	def attributeColorTransformVertexShader(cls):
 		vertexShaderSource = """
 		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
 		layout(location = 0) in vec3 position;
 		layout(location = 2) in vec3 color;
 		uniform mat4 modelMatrix;
-		uniform mat4 viewMatrix;
-		uniform mat4 projectionMatrix;
 		smooth out vec4 vertexColor;
 
 		void main()
@@ -631,18 +803,31 @@ class Shaders(QObject):
 	def texturedFragmentShader(cls):
 		fragmentShaderSource = """
 		#version 330
-		struct Material {
-			vec3 emission;
+
+		struct Light {
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
-			float shininess;
-		}; 
+			vec3 specular;
+		};
 
-		struct Light {
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		struct Material {
+			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
 			vec3 specular;
+			float shininess;
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
 		};
 
 		smooth in vec4 vertexNormal;
@@ -653,8 +838,6 @@ class Shaders(QObject):
 
 		uniform float selected;
 		uniform sampler2D texObject;
-		uniform Material material;
-		uniform Light light;
 
 		out vec4 fragColor;
 
@@ -686,18 +869,31 @@ class Shaders(QObject):
 	def texturedFragmentFlatShader(cls):
 		fragmentShaderSource = """
 		#version 330
-		struct Material {
-			vec3 emission;
+
+		struct Light {
 			vec3 ambient;
 			vec3 diffuse;
-			vec3 specular;    
-			float shininess;
-		}; 
+			vec3 specular;
+		};
 
-		struct Light {
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		struct Material {
+			vec3 emission;
 			vec3 ambient;
 			vec3 diffuse;
 			vec3 specular;
+			float shininess;
+		};
+
+		layout(std140) uniform MaterialBlock {
+			Material material;
 		};
 
 		flat in vec4 vertexNormal;
@@ -708,8 +904,6 @@ class Shaders(QObject):
 
 		uniform float selected;
 		uniform sampler2D texObject;
-		uniform Material material;
-		uniform Light light;
 
 		out vec4 fragColor;
 
@@ -737,6 +931,230 @@ class Shaders(QObject):
 		return fragmentShaderSource
 
 
+	@classmethod
+	def instancedMaterialPhongVertexShader(cls):
+		vertexShaderSource = """
+		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		layout(location = 0) in vec3 position;
+		layout(location = 1) in vec3 normal;
+		layout(location = 4) in mat4 instanceModelMatrix;
+		layout(location = 8) in mat3 instanceNormalMatrix;
+		layout(location = 11) in vec3 instanceEmission;
+		layout(location = 12) in vec3 instanceAmbient;
+		layout(location = 13) in vec3 instanceDiffuse;
+		layout(location = 14) in vec4 instanceSpecular;
+
+		smooth out vec4 vertexNormal;
+		smooth out vec4 vertexPosition;
+		smooth out vec3 lightDirection;
+		smooth out float attenuation;
+		flat out vec3 materialEmission;
+		flat out vec3 materialAmbient;
+		flat out vec3 materialDiffuse;
+		flat out vec4 materialSpecular;
+
+		void main()
+		{
+		    vertexPosition = viewMatrix * instanceModelMatrix * vec4(position, 1.0);
+		    vertexNormal = viewMatrix * vec4(instanceNormalMatrix * normal, 0.0);
+		    if (lightPosition.w == 0.0) {
+				lightDirection = normalize(lightPosition.xyz);
+				attenuation = 1.0;
+			} else {
+		    	lightDirection = normalize(lightPosition.xyz - vertexPosition.xyz);
+		    	float distance = length(lightPosition.xyz - vertexPosition.xyz);
+		    	attenuation = 1.0 / (lightAttenuation.x + lightAttenuation.y * distance + lightAttenuation.z * distance * distance);
+		    }
+		    materialEmission = instanceEmission;
+		    materialAmbient = instanceAmbient;
+		    materialDiffuse = instanceDiffuse;
+		    materialSpecular = instanceSpecular;
+		    gl_Position = projectionMatrix * vertexPosition;
+		}
+		"""
+		return vertexShaderSource
+
+
+	@classmethod
+	def instancedMaterialPhongFragmentShader(cls):
+		fragmentShaderSource = """
+		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		smooth in vec4 vertexNormal;
+		smooth in vec4 vertexPosition;
+		smooth in vec3 lightDirection;
+		smooth in float attenuation;
+		flat in vec3 materialEmission;
+		flat in vec3 materialAmbient;
+		flat in vec3 materialDiffuse;
+		flat in vec4 materialSpecular;
+
+		out vec4 fragColor;
+
+		void main()
+		{
+			// ambient term
+			vec3 ambient = materialAmbient * light.ambient;
+
+			// diffuse term
+			vec3 N = normalize(vertexNormal.xyz);
+			vec3 L = normalize(lightDirection);
+			vec3 diffuse = light.diffuse * materialDiffuse * max(dot(N, L), 0.0);
+
+			// specular term
+			vec3 E = normalize(-vertexPosition.xyz);
+	 		vec3 R = normalize(-reflect(L, N)); 
+			vec3 specular = light.specular * materialSpecular.rgb * pow(max(dot(R, E), 0.0), materialSpecular.w);
+
+			// final intensity
+			vec3 intensity = materialEmission + clamp(ambient + attenuation * (diffuse + specular), 0.0, 1.0);
+			fragColor = vec4(intensity, 1.0);
+		}
+		"""
+		return fragmentShaderSource
+
+
+	@classmethod
+	def instancedMaterialPhongVertexFlatShader(cls):
+		vertexShaderSource = """
+		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		layout(location = 0) in vec3 position;
+		layout(location = 1) in vec3 normal;
+		layout(location = 4) in mat4 instanceModelMatrix;
+		layout(location = 8) in mat3 instanceNormalMatrix;
+		layout(location = 11) in vec3 instanceEmission;
+		layout(location = 12) in vec3 instanceAmbient;
+		layout(location = 13) in vec3 instanceDiffuse;
+		layout(location = 14) in vec4 instanceSpecular;
+
+		flat out vec4 vertexNormal;
+		smooth out vec4 vertexPosition;
+		smooth out vec3 lightDirection;
+		smooth out float attenuation;
+		flat out vec3 materialEmission;
+		flat out vec3 materialAmbient;
+		flat out vec3 materialDiffuse;
+		flat out vec4 materialSpecular;
+
+		void main()
+		{
+		    vertexPosition = viewMatrix * instanceModelMatrix * vec4(position, 1.0);
+		    vertexNormal = viewMatrix * vec4(instanceNormalMatrix * normal, 0.0);
+		    if (lightPosition.w == 0.0) {
+				lightDirection = normalize(lightPosition.xyz);
+				attenuation = 1.0;
+			} else {
+		    	lightDirection = normalize(lightPosition.xyz - vertexPosition.xyz);
+		    	float distance = length(lightPosition.xyz - vertexPosition.xyz);
+		    	attenuation = 1.0 / (lightAttenuation.x + lightAttenuation.y * distance + lightAttenuation.z * distance * distance);
+		    }
+		    materialEmission = instanceEmission;
+		    materialAmbient = instanceAmbient;
+		    materialDiffuse = instanceDiffuse;
+		    materialSpecular = instanceSpecular;
+		    gl_Position = projectionMatrix * vertexPosition;
+		}
+		"""
+		return vertexShaderSource
+
+
+	@classmethod
+	def instancedMaterialPhongFragmentFlatShader(cls):
+		fragmentShaderSource = """
+		#version 330
+
+		struct Light {
+			vec3 ambient;
+			vec3 diffuse;
+			vec3 specular;
+		};
+
+		layout(std140) uniform FrameBlock {
+			mat4 viewMatrix;
+			mat4 projectionMatrix;
+			vec4 lightPosition;
+			vec3 lightAttenuation;
+			Light light;
+		};
+
+		flat in vec4 vertexNormal;
+		smooth in vec4 vertexPosition;
+		smooth in vec3 lightDirection;
+		smooth in float attenuation;
+		flat in vec3 materialEmission;
+		flat in vec3 materialAmbient;
+		flat in vec3 materialDiffuse;
+		flat in vec4 materialSpecular;
+
+		out vec4 fragColor;
+
+		void main()
+		{
+			// ambient term
+			vec3 ambient = materialAmbient * light.ambient;
+
+			// diffuse term
+			vec3 N = normalize(vertexNormal.xyz);
+			vec3 L = normalize(lightDirection);
+			vec3 diffuse = light.diffuse * materialDiffuse * max(dot(N, L), 0.0);
+
+			// specular term
+			vec3 E = normalize(-vertexPosition.xyz);
+	 		vec3 R = normalize(-reflect(L, N)); 
+			vec3 specular = light.specular * materialSpecular.rgb * pow(max(dot(R, E), 0.0), materialSpecular.w);
+
+			// final intensity
+			vec3 intensity = materialEmission + clamp(ambient + attenuation * (diffuse + specular), 0.0, 1.0);
+			fragColor = vec4(intensity, 1.0);
+		}
+		"""
+		return fragmentShaderSource
+
+
 	def backgroundShader(self):
 		return self.__instance._backgroundShader
 
@@ -777,3 +1195,19 @@ class Shaders(QObject):
 		return self.__instance._texturedFlatShader
 
 
+	def instancedMaterialPhongShader(self):
+		return self.__instance._instancedMaterialPhongShader
+
+
+	def instancedMaterialPhongFlatShader(self):
+		return self.__instance._instancedMaterialPhongFlatShader
+
+
+	def instancedShader(self, shader):
+		"""Returns the instanced variant of a shader, None if there is none"""
+		if shader is self.__instance._uniformMaterialPhongShader:
+			return self.__instance._instancedMaterialPhongShader
+		if shader is self.__instance._uniformMaterialPhongFlatShader:
+			return self.__instance._instancedMaterialPhongFlatShader
+		return None
+
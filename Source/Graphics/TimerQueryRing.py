@@ -0,0 +1,110 @@
+import collections
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+from OpenGL import GL
+
+##  Ring of GPU timer queries read back a few frames late, so that measuring never stalls the pipeline.
+class TimerQueryRing(QObject):
+
+    ## initialization
+    def __init__(self, size=4, window=120):
+        """Initialize ring of size queries keeping the last window timings."""
+        super(TimerQueryRing, self).__init__()
+
+        self._size = size
+        self._ids = None
+        self._pending = collections.deque()
+        self._current = None
+        self._next = 0
+        self._timings = collections.deque(maxlen=window)
+        self._skipped = 0
+
+
+    @property
+    def size(self):
+        """Returns the number of queries in the ring"""
+        return self._size
+
+
+    def isCreated(self):
+        """Returns whether the query objects exist"""
+        return self._ids is not None
+
+
+    def create(self):
+        """Allocate query objects"""
+        self._ids = [int(each) for each in np.atleast_1d(GL.glGenQueries(self._size))]
+        self._pending.clear()
+        self._current = None
+        self._next = 0
+
+
+    def destroy(self):
+        """Free query objects, timings gathered so far are kept"""
+        if self.isCreated():
+            GL.glDeleteQueries(self._size, self._ids)
+        self._ids = None
+        self._pending.clear()
+        self._current = None
+
+
+    def begin(self):
+        """Start timing on the next free query, returns False if all of them are still in flight"""
+        if not self.isCreated():
+            self.create()
+
+        ## gather what is ready, the slot about to be reused must have been read back
+        self.collect()
+        slot = self._ids[self._next]
+        if slot in self._pending:
+            self._skipped += 1
+            return False
+
+        GL.glBeginQuery(GL.GL_TIME_ELAPSED, slot)
+        self._current = slot
+        self._next = (self._next + 1) % self._size
+        return True
+
+
+    def end(self):
+        """Stop timing started by begin"""
+        if self._current is None:
+            return
+        GL.glEndQuery(GL.GL_TIME_ELAPSED)
+        self._pending.append(self._current)
+        self._current = None
+
+
+    def collect(self):
+        """Read back finished queries without waiting, oldest first"""
+        while self._pending:
+            slot = self._pending[0]
+            if not GL.glGetQueryObjectiv(slot, GL.GL_QUERY_RESULT_AVAILABLE):
+                break
+            elapsed = GL.glGetQueryObjectui64v(slot, GL.GL_QUERY_RESULT)
+            self._timings.append(int(elapsed) / 1000000.0)
+            self._pending.popleft()
+
+
+    def latest(self):
+        """Returns the most recent GPU time read back in milliseconds"""
+        return self._timings[-1] if self._timings else 0.0
+
+
+    def statistics(self):
+        """Returns mean, median, 95th percentile and maximum of the recent GPU times in milliseconds"""
+        if not self._timings:
+            return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0, 'samples': 0, 'skipped': self._skipped}
+
+        timings = np.array(self._timings)
+        p50, p95 = np.percentile(timings, [50.0, 95.0])
+        return {
+            'mean': float(timings.mean()),
+            'p50': float(p50),
+            'p95': float(p95),
+            'max': float(timings.max()),
+            'samples': len(timings),
+            'skipped': self._skipped
+        }
@@ -1,7 +1,8 @@
 import math
+from collections import deque
 import numpy as np
 
-from PyQt5.QtCore import QObject, QTime, QLineF, QPointF
+from PyQt5.QtCore import QObject, QElapsedTimer, QLineF, QPointF
 from PyQt5.QtGui import QVector3D, QQuaternion
 
 ## The Trackball object
@@ -13,6 +14,13 @@ class Trackball(QObject):
         Spherical = 1
     
 
+    ## motion samples older than this many milliseconds do not count towards the velocity
+    Window = 80.0
+
+    ## a drag held still this long before release does not spin
+    Rest = 50.0
+
+
     ## initialization
     def __init__(self, **kwargs):
         """Initialize trackball"""
@@ -23,8 +31,13 @@ class Trackball(QObject):
         self._axis = kwargs.get("axis", QVector3D(0.0, 1.0, 0.0))
         self._mode = kwargs.get("mode", self.TrackballMode.Spherical)
 
+        ## nanosecond clock and recent (time, rotation vector in degrees) samples of the drag
+        self._clock = QElapsedTimer()
+        self._clock.start()
+        self._history = deque(maxlen=kwargs.get("history", 16))
+
         self._lastPos = QPointF()
-        self._lastTime = QTime.currentTime()
+        self._lastTime = self._clock.nsecsElapsed()
         self._paused = kwargs.get("paused", False)
         self._pressed = False
 
@@ -35,12 +48,18 @@ class Trackball(QObject):
         return self._mode
 
 
+    def now(self):
+        """Returns the trackball clock in nanoseconds"""
+        return self._clock.nsecsElapsed()
+
+
     def reset(self, quat=QQuaternion()):
         """Reset trackball"""
         self._rotation = quat
         self._angularVelocity = 0.0
         self._lastPos = QPointF()
-        self._lastTime = QTime.currentTime()
+        self._lastTime = self.now()
+        self._history.clear()
         self._pressed = False
         self._paused = False
 
@@ -49,9 +68,11 @@ class Trackball(QObject):
         """Press trackball"""
         self._rotation = self.rotation()
         self._pressed = True
-        self._lastTime = QTime.currentTime()
+        self._lastTime = self.now()
         self._lastPos = point
         self._angularVelocity = 0.0
+        self._history.clear()
+        self._history.append((self._lastTime, QVector3D()))
 
 
     def move(self, point, quat):
@@ -59,18 +80,15 @@ class Trackball(QObject):
         if not self._pressed:
             return
 
-        currentTime = QTime.currentTime()
-        msecs = self._lastTime.msecsTo(currentTime)
-        if msecs <= 20:
+        currentTime = self.now()
+        if currentTime <= self._lastTime:
             return
 
         if self._mode == self.TrackballMode.Planar:
 
             delta = QLineF(self._lastPos, point)
-            self._angularVelocity = 180.0 * delta.length() / (math.pi * msecs)
-            self._axis = QVector3D(-delta.dy(), delta.dx(), 0.0).normalized()
-            self._axis = quat.rotatedVector(self._axis)
-            self._rotation = QQuaternion.fromAxisAndAngle(self._axis, 180.0 / math.pi * delta.length()) * self._rotation
+            axis = QVector3D(-delta.dy(), delta.dx(), 0.0).normalized()
+            angle = 180.0 / math.pi * delta.length()
 
         elif self._mode == self.TrackballMode.Spherical:
 
@@ -88,27 +106,61 @@ class Trackball(QObject):
             else:
                 currentPos3D.normalize()
 
-            self._axis = QVector3D.crossProduct(lastPos3D, currentPos3D)
-            angle = 180.0 / math.pi * math.asin(math.sqrt(QVector3D.dotProduct(self._axis, self._axis)))
+            axis = QVector3D.crossProduct(lastPos3D, currentPos3D)
+            angle = 180.0 / math.pi * math.asin(min(1.0, math.sqrt(QVector3D.dotProduct(axis, axis))))
+            axis.normalize()
 
-            self._angularVelocity = angle / msecs
-            self._axis.normalize()
-            self._axis = quat.rotatedVector(self._axis)
-            self._rotation = QQuaternion.fromAxisAndAngle(self._axis, angle) * self._rotation
+        ## apply every event right away, the history only drives the velocity and keeps the last motion
+        axis = quat.rotatedVector(axis)
+        if angle > 0.0:
+            self._rotation = QQuaternion.fromAxisAndAngle(axis, angle) * self._rotation
+            self._history.append((currentTime, axis * angle))
+            self.estimateVelocity(currentTime)
 
         self._lastPos = point
         self._lastTime = currentTime
 
 
+    def estimateVelocity(self, currentTime):
+        """Average the rotation of the samples inside the window into an axis and degrees per millisecond"""
+        samples = list(self._history)
+        total = QVector3D()
+        since = None
+
+        ## each sample is the rotation since the one before, the latest always counts
+        for index in range(len(samples) - 1, 0, -1):
+            if since is not None and (currentTime - samples[index - 1][0]) / 1000000.0 > Trackball.Window:
+                break
+            total += samples[index][1]
+            since = samples[index - 1][0]
+
+        if since is None or currentTime <= since or total.length() == 0.0:
+            self._angularVelocity = 0.0
+            return
+        self._axis = total.normalized()
+        self._angularVelocity = total.length() / ((currentTime - since) / 1000000.0)
+
+
+    def isResting(self, currentTime):
+        """Returns whether the drag has not moved for longer than the rest time"""
+        return not self._history or (currentTime - self._history[-1][0]) / 1000000.0 > Trackball.Rest
+
+
     def release(self, point, quat):
         """Release trackball"""
         self.move(point, quat)
         self._pressed = False
 
+        ## no spin when the drag came to rest before the button was let go
+        currentTime = self.now()
+        if self.isResting(currentTime):
+            self._angularVelocity = 0.0
+        self._lastTime = currentTime
+
 
     def start(self):
         """Start trackball"""
-        self._lastTime = QTime.currentTime()
+        self._lastTime = self.now()
         self._paused = False
 
 
@@ -118,13 +170,28 @@ class Trackball(QObject):
         self._paused = True
 
 
-    def rotation(self):
-        """Returns rotation quarternion"""
-        if self._paused or self._pressed:
+    def isSpinning(self):
+        """Returns whether the rotation keeps changing on its own"""
+        return not self._paused and not self._pressed and self._angularVelocity != 0.0
+
+
+    def velocity(self):
+        """Returns rotation axis and angular velocity in degrees per millisecond"""
+        return QVector3D(self._axis), self._angularVelocity
+
+
+    def rotation(self, ahead=0.0):
+        """Returns rotation quarternion, extrapolated ahead milliseconds when dragging or spinning"""
+        if self._paused:
             return self._rotation
 
-        currentTime = QTime.currentTime()
-    
-        angle = self._angularVelocity * self._lastTime.msecsTo(currentTime)
-        return QQuaternion.fromAxisAndAngle(self._axis, angle) * self._rotation
+        if self._pressed:
+            ## a drag held still settles back where the mouse is
+            if ahead <= 0.0 or self._angularVelocity == 0.0 or self.isResting(self.now()):
+                return self._rotation
+            elapsed = ahead
+        else:
+            elapsed = (self.now() - self._lastTime) / 1000000.0 + ahead
 
+        angle = self._angularVelocity * elapsed
+        return QQuaternion.fromAxisAndAngle(self._axis, angle) * self._rotation
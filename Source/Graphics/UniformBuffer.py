@@ -0,0 +1,89 @@
+import numpy as np
+
+from PyQt5.QtCore import QObject
+
+from OpenGL import GL
+
+##  GPU buffer backing a std140 uniform block.
+class UniformBuffer(QObject):
+
+    ## binding points of the uniform blocks declared by the shaders
+    class Binding:
+        Frame = 0       ## camera and light, uploaded once per frame
+        Material = 1    ## material of the actor being drawn
+        Blocks = {"FrameBlock": Frame, "MaterialBlock": Material}
+
+
+    ## initialization
+    def __init__(self, size):
+        """Initialize uniform buffer."""
+        super(UniformBuffer, self).__init__()
+
+        self._size = size
+        self._id = None
+        self._data = None
+        self._version = None
+
+
+    @property
+    def size(self):
+        """Returns the size of this buffer in bytes"""
+        return self._size
+
+
+    def isCreated(self):
+        """Returns whether the GPU buffer exists"""
+        return self._id is not None
+
+
+    def create(self):
+        """Allocate GPU buffer"""
+        self._id = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, self._id)
+        GL.glBufferData(GL.GL_UNIFORM_BUFFER, self._size, None, GL.GL_DYNAMIC_DRAW)
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, 0)
+        self._data = None
+        self._version = None
+
+
+    def write(self, data, version=None):
+        """Upload a float32 array laid out as std140, skipped if version or contents did not change"""
+        if not self.isCreated():
+            self.create()
+        elif version is not None:
+            if version == self._version:
+                return False
+        elif self._data is not None and np.array_equal(self._data, data):
+            return False
+
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, self._id)
+        GL.glBufferSubData(GL.GL_UNIFORM_BUFFER, 0, data.nbytes, data)
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, 0)
+
+        ## versioned data is tracked by its version alone
+        self._version = version
+        self._data = data.copy() if version is None else None
+        return True
+
+
+    def bind(self, binding):
+        """Attach this buffer to a uniform block binding point"""
+        GL.glBindBufferBase(GL.GL_UNIFORM_BUFFER, binding, self._id)
+
+
+    def destroy(self):
+        """Free GPU buffer"""
+        if self.isCreated():
+            GL.glDeleteBuffers(1, [self._id])
+        self._id = None
+        self._data = None
+        self._version = None
+
+
+    @classmethod
+    def bindBlocks(cls, program):
+        """Assign the binding points of the uniform blocks used by a linked shader program"""
+        for name, binding in UniformBuffer.Binding.Blocks.items():
+            index = GL.glGetUniformBlockIndex(program.programId(), name)
+            if index != GL.GL_INVALID_INDEX:
+                GL.glUniformBlockBinding(program.programId(), index, binding)
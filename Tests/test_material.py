@@ -0,0 +1,33 @@
+import unittest
+
+from PyQt5.QtGui import QVector3D
+
+from Source.Graphics.Material import Material
+
+## Shared preset materials
+class MaterialTest(unittest.TestCase):
+
+    def testPresetIsShared(self):
+        self.assertIs(Material.gold(), Material.gold())
+        self.assertTrue(Material.gold().isPreset())
+
+
+    def testPresetCannotBeModified(self):
+        with self.assertRaises(RuntimeError):
+            Material.gold().diffuseColor = QVector3D(1.0, 0.0, 0.0)
+        with self.assertRaises(RuntimeError):
+            Material.gold().shininess = 1.0
+
+
+    def testCopyCanBeModified(self):
+        gold = Material.gold()
+        material = gold.copy()
+        material.diffuseColor = QVector3D(1.0, 0.0, 0.0)
+        self.assertFalse(material.isPreset())
+        self.assertEqual(material.specularColor, gold.specularColor)
+        self.assertNotEqual(gold.diffuseColor, material.diffuseColor)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from Source.Graphics.MeshLoader import MeshLoader
+
+## Reading OBJ files and their caches
+class MeshLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        """Create a directory for the mesh files"""
+        self.directory = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        """Remove the mesh files and their caches"""
+        shutil.rmtree(self.directory)
+
+
+    def writeFile(self, name, text):
+        """Write text into a file of the test directory, returns its name"""
+        filename = os.path.join(self.directory, name)
+        with open(filename, "w") as stream:
+            stream.write(text)
+        return filename
+
+
+    def testIndentedAndTabSeparatedLines(self):
+        filename = self.writeFile("square.obj",
+            "v 0 0 0\n  v\t1 0 0\n\tv  1 1 0\nv\t0 1 0\nvn 0 0 1\nvt 0 0\n# f 9 9 9\nf 1 2 3\n  f\t1 3 4")
+        geometry = MeshLoader.parseOBJ(filename)
+        np.testing.assert_array_equal(geometry['vertices'], [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]])
+        np.testing.assert_array_equal(geometry['indices'], [[0, 1, 2], [0, 2, 3]])
+
+
+    def testCacheKeepsOptimization(self):
+        text = "".join("v {} {} 0\n".format(x, y) for y in range(6) for x in range(6))
+        text += "".join("f {0} {1} {2}\nf {1} {3} {2}\n".format(x + 6 * y + 1, x + 6 * y + 2, x + 6 * y + 7, x + 6 * y + 8)
+            for y in range(5) for x in range(5))
+        filename = self.writeFile("grid.obj", text)
+
+        original = MeshLoader.load(filename, cache=False, optimize=False)
+        MeshLoader.load(filename, optimize=True)
+        cached = MeshLoader.load(filename, optimize=False)
+        np.testing.assert_array_equal(cached['indices'], original['indices'])
+        np.testing.assert_array_equal(cached['vertices'], original['vertices'])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+
+from Source.Graphics.MeshOptimizer import MeshOptimizer
+
+## Welding vertices and ordering triangles for the vertex cache
+class MeshOptimizerTest(unittest.TestCase):
+
+    def quad(self):
+        """Returns two triangles drawn as arrays, the corners of the diagonal repeated"""
+        corners = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=np.float32)
+        return {'vertices': corners, 'normals': np.tile(np.float32([0, 0, 1]), (6, 1)), 'indices': np.arange(6).reshape(-1, 3)}
+
+
+    def testWeldMergesEqualVertices(self):
+        welded = MeshOptimizer.weld(self.quad())
+        self.assertEqual(len(welded['vertices']), 4)
+        self.assertEqual(welded['indices'].shape, (2, 3))
+
+
+    def testWeldKeepsTexcoords(self):
+        geometry = self.quad()
+        geometry['texcoords'] = np.array([[0, 0], [1, 0], [1, 1], [0, 0], [0.5, 1], [0, 1]], dtype=np.float32)
+        welded = MeshOptimizer.weld(geometry)
+
+        ## the corner with different texture coordinates stays split
+        self.assertEqual(len(welded['vertices']), 5)
+        self.assertEqual(welded['texcoords'].shape, (5, 2))
+        np.testing.assert_array_equal(welded['texcoords'][welded['indices'].reshape(-1)], geometry['texcoords'])
+
+
+    def testWeldRejectsUnknownAttributes(self):
+        geometry = dict(self.quad(), tangents=np.zeros((6, 3), dtype=np.float32))
+        with self.assertRaises(ValueError):
+            MeshOptimizer.weld(geometry)
+
+
+    def triangles(self, geometry):
+        """Returns the triangles as corner positions, each starting at its smallest corner to keep the winding"""
+        result = set()
+        for triangle in geometry['vertices'][geometry['indices'].reshape(-1, 3)].tolist():
+            corners = [tuple(each) for each in triangle]
+            start = corners.index(min(corners))
+            result.add(tuple(corners[start:] + corners[:start]))
+        return result
+
+
+    def testReorderKeepsTriangles(self):
+        geometry = MeshOptimizer.weld(self.quad())
+        reordered = MeshOptimizer.reorder(geometry)
+        self.assertEqual(self.triangles(reordered), self.triangles(geometry))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+
+from Source.Graphics.Icosahedron import Icosahedron
+from Source.Graphics.MeshSimplifier import MeshSimplifier
+
+## Levels of detail made by edge collapses
+class MeshSimplifierTest(unittest.TestCase):
+
+    def cube(self, n):
+        """Returns a unit cube of n by n quads per side, each side with its own flat normals"""
+        vertices, normals, indices = [], [], []
+        u = np.linspace(-0.5, 0.5, n + 1)
+        s, t = np.meshgrid(u, u, indexing='ij')
+        for axis in range(3):
+            for sign in (-1.0, 1.0):
+                points = np.zeros((n + 1, n + 1, 3))
+                points[..., axis] = 0.5 * sign
+                points[..., (axis + 1) % 3] = s
+                points[..., (axis + 2) % 3] = t
+                normal = np.zeros(3)
+                normal[axis] = sign
+
+                corner = (np.arange(n)[:, np.newaxis] * (n + 1) + np.arange(n)).reshape(-1) + len(vertices) * (n + 1) ** 2
+                quads = np.stack((corner, corner + n + 1, corner + n + 2, corner + 1), axis=1)
+                triangles = np.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]))
+                vertices.append(points.reshape(-1, 3))
+                normals.append(np.tile(normal, ((n + 1) ** 2, 1)))
+                indices.append(triangles if sign > 0.0 else triangles[:, ::-1])
+        return np.concatenate(vertices).astype(np.float32), np.concatenate(normals).astype(np.float32), np.concatenate(indices)
+
+
+    def edgeCounts(self, level):
+        """Returns the triangles and the number of triangles on each edge, vertices at the same point taken as one"""
+        points = MeshSimplifier.groups(level['vertices'])
+        triangles = points[level['indices'].astype(np.int64)]
+        edges = np.sort(np.concatenate((triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]])), axis=1)
+        return points, triangles, np.unique(edges, axis=0, return_counts=True)[1]
+
+
+    def assertClosed(self, level):
+        """Every edge between two triangles, and the surface a sphere by its Euler characteristic"""
+        points, triangles, counts = self.edgeCounts(level)
+        self.assertTrue(np.all(counts == 2))
+        self.assertEqual(points.max() + 1 - len(counts) + len(triangles), 2)
+
+
+    def assertWatertight(self, level):
+        """No edge open, hard edges split into vertices of their own sides must not crack"""
+        counts = self.edgeCounts(level)[2]
+        self.assertTrue(np.all(counts % 2 == 0))
+
+
+    def testSphereStaysClosed(self):
+        vertices, indices = Icosahedron.tessellate(4)
+        levels = MeshSimplifier.chain(vertices, indices, minimum=256, normals=vertices)
+        self.assertGreater(len(levels), 2)
+        for previous, level in zip(levels[1:], levels[2:]):
+            self.assertLess(len(level['indices']), len(previous['indices']))
+        for level in levels[1:]:
+            self.assertClosed(level)
+
+
+    def testHardEdgesKeepFlatNormals(self):
+        vertices, normals, indices = self.cube(12)
+        levels = MeshSimplifier.chain(vertices, indices, minimum=64, normals=normals)
+        self.assertGreater(len(levels), 2)
+        for level in levels[1:]:
+            self.assertWatertight(level)
+
+            ## slivers left along an edge of the cube have no area to shade
+            vertices, triangles = level['vertices'], level['indices'].astype(np.int64)
+            areas = np.linalg.norm(np.cross(vertices[triangles[:, 1]] - vertices[triangles[:, 0]], vertices[triangles[:, 2]] - vertices[triangles[:, 0]]), axis=1)
+            shaded = np.unique(triangles[areas > 1e-9])
+            np.testing.assert_allclose(np.abs(level['normals'][shaded]).max(axis=1), 1.0, atol=1e-4)
+            np.testing.assert_allclose(level['vertices'].min(axis=0), -0.5, atol=1e-4)
+            np.testing.assert_allclose(level['vertices'].max(axis=0), 0.5, atol=1e-4)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,110 @@
+import math
+import unittest
+import numpy as np
+
+from PyQt5.QtGui import QMatrix4x4, QVector3D
+
+from Source.Graphics.OrientedBoxes import OrientedBoxes
+
+## Packed oriented boxes against the slab test actors used to run one at a time
+class OrientedBoxesTest(unittest.TestCase):
+
+    def setUp(self):
+        """Create rotated, scaled and translated boxes"""
+        random = np.random.RandomState(7)
+        self.transforms = []
+        for index in range(6):
+            xform = QMatrix4x4()
+            xform.translate(*random.uniform(-3.0, 3.0, 3))
+            xform.rotate(float(random.uniform(0.0, 360.0)), *random.uniform(-1.0, 1.0, 3))
+            xform.scale(*random.uniform(0.5, 2.5, 3))
+            self.transforms.append(xform)
+        self.factors = [1.0, 1.5, 1.0, 0.8, 1.0, 2.0]
+        self.boxes = OrientedBoxes([OrientedBoxes.pack(xform, factor) for xform, factor in zip(self.transforms, self.factors)])
+
+
+    def slab(self, xform, factor, origin, direction):
+        """Returns hit and distance of one ray and one box, as Actor.intersect computed them"""
+        tMin = -math.inf
+        tMax = math.inf
+        point = QVector3D(xform[0, 3], xform[1, 3], xform[2, 3]) - origin
+        for i in range(3):
+            axis = QVector3D(xform[0, i], xform[1, i], xform[2, i]).normalized()
+            half = QVector3D(xform[i, 0], xform[i, 1], xform[i, 2]).length() / 2.0
+            e = QVector3D.dotProduct(axis, point)
+            f = QVector3D.dotProduct(axis, direction)
+            if abs(f) > 10E-6:
+                t1, t2 = sorted(((e + half * factor) / f, (e - half * factor) / f))
+                tMin = max(tMin, t1)
+                tMax = min(tMax, t2)
+                if tMin > tMax or tMax < 0:
+                    return (False, math.inf)
+            elif -e - half > 0.0 or -e + half < 0.0:
+                return (False, math.inf)
+        return (True, tMin if tMin > 0 else tMax)
+
+
+    def check(self, origins, directions):
+        """Compare every ray with every box against the slab test"""
+        hits, distances = self.boxes.intersect(origins, directions)
+        self.assertEqual(hits.shape, (len(origins), self.boxes.count))
+        self.assertEqual(distances.shape, (len(origins), self.boxes.count))
+        for ray, (origin, direction) in enumerate(zip(origins, directions)):
+            for box, (xform, factor) in enumerate(zip(self.transforms, self.factors)):
+                hit, distance = self.slab(xform, factor, QVector3D(*origin), QVector3D(*direction))
+                self.assertEqual(bool(hits[ray, box]), hit, (ray, box))
+                if hit:
+                    self.assertAlmostEqual(float(distances[ray, box]), distance, places=4)
+                else:
+                    self.assertEqual(float(distances[ray, box]), math.inf)
+
+
+    def testRandomRays(self):
+        random = np.random.RandomState(11)
+        origins = random.uniform(-8.0, 8.0, (40, 3))
+        targets = random.uniform(-3.0, 3.0, (40, 3))
+        directions = targets - origins
+        directions /= np.linalg.norm(directions, axis=1)[:, np.newaxis]
+        self.check(origins, directions)
+
+
+    def testRaysStartingInside(self):
+        random = np.random.RandomState(13)
+        origins = np.array([[xform[0, 3], xform[1, 3], xform[2, 3]] for xform in self.transforms])
+        directions = random.normal(size=origins.shape)
+        directions /= np.linalg.norm(directions, axis=1)[:, np.newaxis]
+        hits, distances = self.boxes.intersect(origins, directions)
+        self.assertTrue(np.all(np.diag(hits)))
+        self.assertTrue(np.all(np.diag(distances) > 0.0))
+        self.check(origins, directions)
+
+
+    def testRaysParallelToSlabs(self):
+        origins = []
+        directions = []
+        for xform in self.transforms:
+            center = np.array([xform[0, 3], xform[1, 3], xform[2, 3]])
+            axes = [np.array([xform[0, i], xform[1, i], xform[2, i]]) for i in range(3)]
+            axes = [each / np.linalg.norm(each) for each in axes]
+
+            ## along an axis of the box, through it and well beside it
+            for offset in (0.0, 10.0):
+                origins.append(center - 6.0 * axes[0] + offset * axes[1])
+                directions.append(axes[0])
+        self.check(np.array(origins), np.array(directions))
+
+        hits, distances = self.boxes.intersect(np.array(origins), np.array(directions))
+        boxes = np.arange(self.boxes.count)
+        self.assertTrue(np.all(hits[2 * boxes, boxes]))
+        self.assertFalse(np.any(hits[2 * boxes + 1, boxes]))
+
+
+    def testSingleRay(self):
+        hits, distances = self.boxes.intersect((0.0, 0.0, 10.0), (0.0, 0.0, -1.0))
+        self.assertEqual(hits.shape, (1, self.boxes.count))
+        self.assertEqual(distances.shape, (1, self.boxes.count))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QQuaternion
+
+from Source.Graphics.Trackball import Trackball
+
+## Trackball spin after release, driven by a clock the test moves by hand
+class TrackballTest(unittest.TestCase):
+
+    def setUp(self):
+        """Create trackball reading the test clock"""
+        self.time = 0
+        self.trackball = Trackball()
+        self.trackball.now = lambda: self.time
+
+
+    def advance(self, milliseconds):
+        """Move the test clock forward"""
+        self.time += int(milliseconds * 1000000)
+
+
+    def drag(self, steps=5, interval=10.0):
+        """Press, then move right by a small step every interval milliseconds"""
+        self.trackball.press(QPointF(0.0, 0.0))
+        for step in range(1, steps + 1):
+            self.advance(interval)
+            self.trackball.move(QPointF(0.02 * step, 0.0), QQuaternion())
+        return QPointF(0.02 * steps, 0.0)
+
+
+    def testReleaseWhileMovingSpins(self):
+        point = self.drag()
+        self.advance(10.0)
+        self.trackball.release(point + QPointF(0.02, 0.0), QQuaternion())
+        self.assertTrue(self.trackball.isSpinning())
+
+
+    def testReleaseAfterRestDoesNotSpin(self):
+        point = self.drag()
+        self.advance(Trackball.Rest + 10.0)
+        self.trackball.move(point, QQuaternion())
+        self.trackball.release(point, QQuaternion())
+        self.assertFalse(self.trackball.isSpinning())
+        self.assertEqual(self.trackball.velocity()[1], 0.0)
+
+
+    def testShortPauseStillSpins(self):
+        point = self.drag()
+        self.advance(Trackball.Rest / 2.0)
+        self.trackball.release(point, QQuaternion())
+        self.assertTrue(self.trackball.isSpinning())
+
+
+    def testHeldDragIsNotExtrapolated(self):
+        self.drag()
+        held = self.trackball.rotation()
+        self.assertNotEqual(self.trackball.rotation(ahead=16.0), held)
+        self.advance(Trackball.Rest + 10.0)
+        self.assertEqual(self.trackball.rotation(ahead=16.0), held)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import os
 import sys
 import platform
 import argparse
@@ -7,11 +8,70 @@ from OpenGL import GL
 from PyQt5 import Qt, QtCore
 from Source.GUI.MainWindow import MainWindow
 
+def headlessScene(renderer, name):
+	"""Add the actors of a named test scene to the offscreen renderer's world"""
+	from PyQt5.QtGui import QMatrix4x4
+	from Source.Graphics.Cone import Cone
+	from Source.Graphics.Cube import Cube
+	from Source.Graphics.Cylinder import Cylinder
+	from Source.Graphics.Icosahedron import Icosahedron
+
+	world = renderer.world
+	if name == "cone":
+		xform = QMatrix4x4()
+		xform.rotate(-90.0, 0.0, 0.0, 1.0)
+		world.addActor(Cone(world, resolution=24, height=1.0, radius=0.5, transform=xform))
+	elif name == "cube":
+		world.addActor(Cube(world))
+	elif name == "cylinder":
+		world.addActor(Cylinder(world, resolution=24, height=1.0, radius=0.5))
+	elif name == "icosahedron":
+		world.addActor(Icosahedron(world, level=3, radius=0.75))
+
+
+def renderHeadless(args):
+	"""Render frames of a turntable camera path to files without opening a window"""
+	from PyQt5.QtGui import QVector3D, QQuaternion
+	from Source.Graphics.OffscreenRenderer import OffscreenRenderer
+
+	width, height = [int(each) for each in args.size.lower().split("x")]
+	renderer = OffscreenRenderer(width, height, gnomon=not args.no_gnomon)
+	renderer.initialize()
+	headlessScene(renderer, args.scene)
+	if args.mesh:
+		from Source.Graphics.MeshActor import MeshActor
+		renderer.world.addActor(MeshActor(renderer.world, args.mesh))
+
+	## turn the scene about its vertical axis, starting from the home orientation
+	home = renderer.rotation
+	directory = os.path.dirname(args.output)
+	if directory and not os.path.isdir(directory):
+		os.makedirs(directory)
+
+	for frame in range(args.frames):
+		angle = args.orbit * frame / float(args.frames)
+		renderer.setRotation(home * QQuaternion.fromAxisAndAngle(QVector3D(0.0, 1.0, 0.0), angle))
+		renderer.render()
+		renderer.save(args.output.format(frame), args.format)
+
+	renderer.destroy()
+	print("Rendered {} frames of {}x{} to {}".format(args.frames, width, height, args.output))
+
+
 def main():
 
 	parser = argparse.ArgumentParser()
 	parser.add_argument("--glversion", help="use specific OpenGL version")
 	parser.add_argument("--glsamples", help="use specific number of samples for rendering")
+	parser.add_argument("--headless", action="store_true", help="render frames to files without opening a window")
+	parser.add_argument("--frames", type=int, default=1, help="number of frames rendered in headless mode")
+	parser.add_argument("--size", default="800x600", help="frame size in headless mode, as WIDTHxHEIGHT")
+	parser.add_argument("--output", default="frame_{:04d}.png", help="file name pattern of headless frames, formatted with the frame number")
+	parser.add_argument("--format", choices=["png", "raw"], default="png", help="write frames as PNG images or raw RGBA bytes")
+	parser.add_argument("--orbit", type=float, default=360.0, help="degrees the scene turns over all headless frames")
+	parser.add_argument("--scene", choices=["cone", "cube", "cylinder", "icosahedron", "empty"], default="cone", help="test scene rendered in headless mode")
+	parser.add_argument("--mesh", help="OBJ, PLY or STL file added to the headless scene")
+	parser.add_argument("--no-gnomon", action="store_true", help="leave the gnomon out of headless frames")
 
 	args = parser.parse_args()
 
@@ -49,6 +109,13 @@ def main():
 	## set default format
 	Qt.QSurfaceFormat.setDefaultFormat(glformat)
 
+	## without a window, use the offscreen platform unless another one was asked for
+	if args.headless:
+		os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+		app = Qt.QGuiApplication(sys.argv)
+		renderHeadless(args)
+		return
+
 	## create Qt app
 	app = Qt.QApplication(sys.argv)
 	